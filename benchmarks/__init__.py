@@ -0,0 +1 @@
+"""Benchmarks of the ingestion pipeline, run against local stand-ins for MyTardis"""
@@ -0,0 +1,153 @@
+"""Benchmark of the HTTP transport settings of the REST client under concurrent load.
+
+Many threads share one MyTardisRESTFactory and fetch pages of datafiles from a fake
+MyTardis server. The scenarios compare the default requests connection pool (10
+connections per host), a pool sized to the number of threads, no keep-alive, and gzip
+compression of the responses. For each, the throughput, the number of TCP connections
+the server accepted and the number of bytes it sent are reported.
+
+Example:
+
+    python -m benchmarks.bench_connections --threads 32 --requests 4000
+"""
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from benchmarks.bench_validation import make_datafile_json
+from benchmarks.fake_mytardis import FakeMyTardisServer, FakeServerOptions
+from src.config.config import (
+    AuthConfig,
+    ConnectionConfig,
+    FlowControlConfig,
+    TransportConfig,
+)
+from src.mytardis_client.mt_rest import GetRequestMetaParams, MyTardisRESTFactory
+
+# requests' default number of connections kept per host
+DEFAULT_POOL_SIZE = 10
+
+
+@dataclass
+class ConnectionResult:
+    """The outcome of one transport scenario"""
+
+    scenario: str
+    requests: int
+    seconds: float
+    requests_per_second: float
+    server_connections: int
+    server_bytes_sent: int
+
+
+def make_scenarios(threads: int) -> dict[str, tuple[TransportConfig, bool]]:
+    """The transport settings compared, and whether the server compresses responses"""
+    return {
+        f"pool-{DEFAULT_POOL_SIZE}": (
+            TransportConfig(pool_maxsize=DEFAULT_POOL_SIZE),
+            False,
+        ),
+        f"pool-{threads}": (TransportConfig(), False),
+        "no-keep-alive": (TransportConfig(keep_alive=False), False),
+        "gzip": (TransportConfig(), True),
+    }
+
+
+def run_connection_benchmark(  # pylint: disable=too-many-arguments
+    scenario: str,
+    transport: TransportConfig,
+    gzip_responses: bool,
+    threads: int,
+    num_requests: int,
+    page_size: int = 10,
+    latency: float = 0.002,
+) -> ConnectionResult:
+    """Make 'num_requests' GET requests for pages of datafiles from 'threads' threads"""
+
+    options = FakeServerOptions(latency=latency, gzip_responses=gzip_responses)
+    with FakeMyTardisServer(options) as server:
+        for i in range(page_size):
+            server.api.store.add("dataset_file", make_datafile_json(i))
+
+        connection = ConnectionConfig(
+            hostname=server.url,
+            transport=transport,
+            flow_control=FlowControlConfig(adaptive=False, max_concurrency=threads),
+        )
+        mt_rest = MyTardisRESTFactory(
+            AuthConfig(username="benchmark", api_key="benchmark"),
+            connection,
+            use_cache=False,
+        )
+
+        def fetch_page(i: int) -> None:
+            # Distinct limits keep identical in-flight requests from being coalesced
+            mt_rest.get_json(
+                "/dataset_file",
+                meta_params=GetRequestMetaParams(limit=page_size + i, offset=0),
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(fetch_page, range(num_requests)))
+        seconds = time.perf_counter() - start
+
+        return ConnectionResult(
+            scenario=scenario,
+            requests=num_requests,
+            seconds=seconds,
+            requests_per_second=num_requests / seconds if seconds else 0.0,
+            server_connections=server.api.stats.connections,
+            server_bytes_sent=server.api.stats.bytes_sent,
+        )
+
+
+def main(
+    threads: Annotated[int, typer.Option(help="Number of concurrent threads")] = 32,
+    requests: Annotated[int, typer.Option(help="Number of requests made")] = 2000,
+    page_size: Annotated[int, typer.Option(help="Datafiles per response")] = 10,
+    latency: Annotated[
+        float, typer.Option(help="Seconds of latency injected per request")
+    ] = 0.002,
+    output: Annotated[
+        Optional[Path], typer.Option(help="Path of a JSON file to write results to")
+    ] = None,
+) -> None:
+    """Compare HTTP transport settings under concurrent load on a fake MyTardis"""
+
+    # Pool overflow is expected in the scenario using the default pool size
+    logging.basicConfig(level=logging.ERROR)
+
+    results = []
+    for scenario, (transport, gzip_responses) in make_scenarios(threads).items():
+        result = run_connection_benchmark(
+            scenario,
+            transport,
+            gzip_responses,
+            threads,
+            requests,
+            page_size=page_size,
+            latency=latency,
+        )
+        results.append(result)
+        typer.echo(
+            f"{result.scenario}: {result.requests} requests in {result.seconds:.2f}s "
+            f"({result.requests_per_second:.0f} requests/s), "
+            f"{result.server_connections} connections, "
+            f"{result.server_bytes_sent} B sent by the server"
+        )
+
+    if output is not None:
+        with output.open("w", encoding="utf-8") as file:
+            json.dump([asdict(result) for result in results], file, indent=4)
+
+
+if __name__ == "__main__":
+    typer.run(main)
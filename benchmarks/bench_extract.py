@@ -0,0 +1,171 @@
+"""Benchmark of the profile extractors against synthetic data trees.
+
+A tree of the requested shape is generated for each profile (see
+'benchmarks.data_trees'), then timed through the profile's extractor, with the
+pipeline tracer enabled so that the time spent walking the tree and computing
+checksums is reported separately from the rest of the parsing.
+
+Example:
+
+    python -m benchmarks.bench_extract --profile abi --files-per-dataset 1000 --sparse
+"""
+
+import json
+import logging
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+from benchmarks.data_trees import (
+    FileSizes,
+    Profile,
+    TreeShape,
+    generate_abi_music_tree,
+    generate_idw_tree,
+    generate_ro_crate_tree,
+)
+from src.extraction.manifest import IngestionManifest
+from src.profiles.abi_music.parsing import ABIMusicExtractor
+from src.profiles.idw.metadata_extraction import IDWMetadataExtractor
+from src.profiles.ro_crate.ro_crate_parser import ROCrateExtractor
+from src.utils.tracing import get_tracer, span
+
+
+@dataclass
+class ExtractionResult:
+    """The outcome of benchmarking one extractor"""
+
+    profile: str
+    files_on_disk: int
+    bytes_on_disk: int
+    datafiles_extracted: int
+    seconds: float
+    files_per_second: float
+    megabytes_per_second: float
+    stages: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+def generate_tree(
+    profile: Profile, root: Path, shape: TreeShape, zarr_chunks_per_dataset: int = 0
+) -> Path:
+    """Generate a tree for 'profile' and return the path to pass to its extractor"""
+    if profile == Profile.ABI_MUSIC:
+        generate_abi_music_tree(root, shape, zarr_chunks_per_dataset)
+        return root
+    if profile == Profile.RO_CRATE:
+        generate_ro_crate_tree(root, shape)
+        return root
+    return generate_idw_tree(root, shape)
+
+
+def run_extractor(profile: Profile, source: Path) -> IngestionManifest:
+    """Run the extractor of 'profile' on 'source'"""
+    if profile == Profile.ABI_MUSIC:
+        return ABIMusicExtractor().extract(source)
+    if profile == Profile.RO_CRATE:
+        return ROCrateExtractor().extract(source)
+    return IDWMetadataExtractor().extract(source)
+
+
+def run_extract_benchmark(
+    profile: Profile,
+    shape: TreeShape,
+    zarr_chunks_per_dataset: int = 0,
+    tree_root: Optional[Path] = None,
+) -> ExtractionResult:
+    """Generate a tree (in a temporary directory unless 'tree_root' is given) and
+    time the extraction of its metadata"""
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = tree_root or Path(temp_dir) / profile.value
+        source = generate_tree(profile, root, shape, zarr_chunks_per_dataset)
+
+        files = [path for path in root.rglob("*") if path.is_file()]
+        num_bytes = sum(path.stat().st_size for path in files)
+
+        tracer = get_tracer()
+        tracer.reset()
+        tracer.enable()
+        try:
+            start = time.perf_counter()
+            with span("extract"):
+                manifest = run_extractor(profile, source)
+            seconds = time.perf_counter() - start
+        finally:
+            tracer.disable()
+
+    return ExtractionResult(
+        profile=profile.value,
+        files_on_disk=len(files),
+        bytes_on_disk=num_bytes,
+        datafiles_extracted=len(manifest.get_datafiles()),
+        seconds=seconds,
+        files_per_second=len(files) / seconds if seconds else 0.0,
+        megabytes_per_second=num_bytes / 1e6 / seconds if seconds else 0.0,
+        stages=tracer.summary(),
+    )
+
+
+def main(
+    profile: Annotated[
+        Optional[list[Profile]],
+        typer.Option(help="Profiles to benchmark. Defaults to all of them"),
+    ] = None,
+    projects: int = 1,
+    experiments_per_project: int = 2,
+    datasets_per_experiment: int = 5,
+    files_per_dataset: int = 100,
+    depth: int = 1,
+    files_per_directory: int = 50,
+    size_distribution: str = "fixed",
+    mean_size: int = 4096,
+    sparse: bool = False,
+    zarr_chunks_per_dataset: int = 0,
+    output: Annotated[
+        Optional[Path], typer.Option(help="Path of a JSON file to write results to")
+    ] = None,
+) -> None:
+    """Benchmark the extractors of the ingestion profiles on synthetic trees"""
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if size_distribution not in ("fixed", "uniform", "lognormal"):
+        raise typer.BadParameter(f"Unknown size distribution '{size_distribution}'")
+
+    shape = TreeShape(
+        projects=projects,
+        experiments_per_project=experiments_per_project,
+        datasets_per_experiment=datasets_per_experiment,
+        files_per_dataset=files_per_dataset,
+        depth=depth,
+        files_per_directory=files_per_directory,
+        file_sizes=FileSizes(kind=size_distribution, mean=mean_size),  # type: ignore[arg-type]
+        sparse=sparse,
+    )
+
+    results = []
+    for selected in profile or list(Profile):
+        result = run_extract_benchmark(selected, shape, zarr_chunks_per_dataset)
+        results.append(result)
+        typer.echo(
+            f"{result.profile}: {result.datafiles_extracted} datafiles from "
+            f"{result.files_on_disk} files in {result.seconds:.2f}s "
+            f"({result.files_per_second:.1f} files/s, "
+            f"{result.megabytes_per_second:.1f} MB/s)"
+        )
+        for path, stats in result.stages.items():
+            typer.echo(
+                f"    {path}: {stats['count']:.0f} x, total {stats['total_s']:.3f}s"
+            )
+
+    if output is not None:
+        with output.open("w", encoding="utf-8") as file:
+            json.dump([asdict(result) for result in results], file, indent=4)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,245 @@
+"""End-to-end benchmark of IngestionFactory.ingest against a fake MyTardis server.
+
+Synthetic manifests of the requested sizes are ingested through the real client
+code path (HTTP, retries, pydantic validation, the Overseer cache) into an
+in-process stand-in for the MyTardis API. Datafiles are not transferred. The
+throughput and the number of requests made are reported per scenario.
+
+Example:
+
+    python -m benchmarks.bench_ingest --scale 1k --scale 100k --latency 0.002
+
+Passing '--min-throughput' makes the run fail if any scenario ingests fewer objects
+per second, so that the benchmark can gate changes in CI.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Annotated, Any, Optional
+
+import typer
+
+from benchmarks.fake_mytardis import FakeMyTardisServer, FakeServerOptions
+from benchmarks.synthetic import BENCHMARK_INSTITUTION, ManifestShape, make_manifest
+from src.blueprints.datafile import Datafile
+from src.config.config import (
+    AuthConfig,
+    ConfigFromEnv,
+    ConnectionConfig,
+    FilesystemStorageBoxConfig,
+    GeneralConfig,
+    SchedulerConfig,
+    SchemaConfig,
+)
+from src.conveyor.conveyor import Conveyor
+from src.ingestion_factory.factory import IngestionFactory
+from src.mytardis_client.mt_rest import MyTardisRESTFactory
+
+logger = logging.getLogger(__name__)
+
+SCALES: dict[str, int] = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+
+class NullConveyor(Conveyor):
+    """A conveyor which creates replicas but does not transfer anything"""
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self, store: FilesystemStorageBoxConfig
+    ) -> None:
+        self._store = store
+
+    def transfer(self, data_root: Path, dfs: list[Datafile]) -> None:
+        """Skip the transfer"""
+
+
+@dataclass
+class BenchmarkResult:
+    """The outcome of one benchmark scenario"""
+
+    scenario: str
+    datafiles: int
+    objects: int
+    failed_objects: int
+    seconds: float
+    objects_per_second: float
+    client_requests: int
+    client_retries: int
+    client_errors: int
+    server_requests: int
+    server_injected_errors: int
+
+
+def make_config(url: str, storage_dir: Path, max_workers: int = 8) -> ConfigFromEnv:
+    """Configuration for ingesting into the fake server"""
+    return ConfigFromEnv(
+        general=GeneralConfig(default_institution=BENCHMARK_INSTITUTION),
+        auth=AuthConfig(username="benchmark", api_key="benchmark"),
+        connection=ConnectionConfig(hostname=url, fields_param="fields"),
+        default_schema=SchemaConfig(
+            project="https://benchmark.test/project",
+            experiment="https://benchmark.test/experiment",
+            dataset="https://benchmark.test/dataset",
+            datafile="https://benchmark.test/datafile",
+        ),
+        storage=FilesystemStorageBoxConfig(
+            storage_name="benchmark", target_root_dir=storage_dir
+        ),
+        scheduler=SchedulerConfig(max_workers=max_workers),
+    )
+
+
+def run_ingest_benchmark(
+    scenario: str,
+    shape: ManifestShape,
+    options: FakeServerOptions,
+    use_cache: bool = True,
+    max_workers: int = 8,
+) -> BenchmarkResult:
+    """Ingest a synthetic manifest of the given shape into a fake server"""
+
+    manifest = make_manifest(shape)
+    num_objects = sum(
+        len(objects)
+        for objects in (
+            manifest.get_projects(),
+            manifest.get_experiments(),
+            manifest.get_datasets(),
+            manifest.get_datafiles(),
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as work_dir, FakeMyTardisServer(
+        options
+    ) as server:
+        config = make_config(server.url, Path(work_dir), max_workers)
+        mt_rest = MyTardisRESTFactory(
+            config.auth, config.connection, use_cache=use_cache
+        )
+        factory = IngestionFactory(
+            config=config, mt_rest=mt_rest, conveyor=NullConveyor(config.storage)
+        )
+
+        # The factory writes its results to the working directory
+        previous_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            start = time.perf_counter()
+            factory.ingest(manifest)
+            seconds = time.perf_counter() - start
+        finally:
+            os.chdir(previous_dir)
+
+        with (Path(work_dir) / "ingestion_result.json").open(encoding="utf-8") as file:
+            failed_objects = sum(
+                result["num_error"] for result in json.load(file).values()
+            )
+
+        endpoints: list[dict[str, Any]] = mt_rest.metrics.snapshot()["endpoints"]
+        return BenchmarkResult(
+            scenario=scenario,
+            datafiles=shape.datafiles,
+            objects=num_objects,
+            failed_objects=failed_objects,
+            seconds=seconds,
+            objects_per_second=num_objects / seconds if seconds else 0.0,
+            client_requests=sum(entry["requests"] for entry in endpoints),
+            client_retries=sum(entry["retries"] for entry in endpoints),
+            client_errors=sum(entry["errors"] for entry in endpoints),
+            server_requests=server.api.stats.total,
+            server_injected_errors=server.api.stats.injected_errors,
+        )
+
+
+def main(
+    scale: Annotated[
+        Optional[list[str]],
+        typer.Option(help=f"Number of datafiles to ingest. One of {list(SCALES)}"),
+    ] = None,
+    datafiles_per_dataset: Annotated[int, typer.Option()] = 1000,
+    latency: Annotated[
+        float, typer.Option(help="Seconds of latency injected per request")
+    ] = 0.0,
+    latency_jitter: Annotated[
+        float, typer.Option(help="Maximum seconds of random extra latency")
+    ] = 0.0,
+    error_rate: Annotated[
+        float, typer.Option(help="Fraction of requests answered with a 502")
+    ] = 0.0,
+    max_page_size: Annotated[
+        int, typer.Option(help="Maximum objects per page returned by the server")
+    ] = 1000,
+    use_cache: Annotated[
+        bool, typer.Option(help="Use the client's HTTP response cache")
+    ] = True,
+    max_workers: Annotated[
+        int, typer.Option(help="Number of objects the factory ingests at once")
+    ] = 8,
+    output: Annotated[
+        Optional[Path], typer.Option(help="Path of a JSON file to write results to")
+    ] = None,
+    min_throughput: Annotated[
+        Optional[float],
+        typer.Option(help="Fail if any scenario ingests fewer objects per second"),
+    ] = None,
+) -> None:
+    """Benchmark the ingestion of synthetic manifests into a fake MyTardis"""
+
+    logging.basicConfig(level=logging.WARNING)
+
+    scales = scale or ["1k"]
+    for name in scales:
+        if name not in SCALES:
+            raise typer.BadParameter(f"Unknown scale '{name}'. Options: {list(SCALES)}")
+
+    options = FakeServerOptions(
+        latency=latency,
+        latency_jitter=latency_jitter,
+        error_rate=error_rate,
+        max_page_size=max_page_size,
+    )
+
+    results = []
+    for name in scales:
+        shape = ManifestShape(
+            datafiles=SCALES[name], datafiles_per_dataset=datafiles_per_dataset
+        )
+        result = run_ingest_benchmark(
+            name, shape, options, use_cache=use_cache, max_workers=max_workers
+        )
+        results.append(result)
+        typer.echo(
+            f"{result.scenario}: {result.objects} objects "
+            f"({result.failed_objects} failed) in {result.seconds:.2f}s "
+            f"({result.objects_per_second:.1f} objects/s), "
+            f"{result.client_requests} requests ({result.client_retries} retries, "
+            f"{result.client_errors} errors), "
+            f"{result.server_requests} reached the server"
+        )
+
+    if output is not None:
+        with output.open("w", encoding="utf-8") as file:
+            json.dump([asdict(result) for result in results], file, indent=4)
+
+    if min_throughput is not None:
+        slow = [r for r in results if r.objects_per_second < min_throughput]
+        if slow:
+            for result in slow:
+                typer.echo(
+                    f"{result.scenario}: throughput {result.objects_per_second:.1f} "
+                    f"objects/s is below the minimum of {min_throughput}",
+                    err=True,
+                )
+            raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,177 @@
+"""Benchmark of the construction of models between the stages of the pipeline.
+
+Each datafile passes through three models: RawDatafile (built by the extractors),
+RefinedDatafile (built by the Smelter) and Datafile (built by the Crucible), plus a
+Parameter per metadata entry. This measures, per million datafiles, the cost of
+building the later models with validation, and with pydantic's unvalidated
+'model_construct()', to show what a trusted construction path could save. It also
+compares validating the parameters of a datafile one at a time with validating them
+in a single call, as Smelter.extract_parameters does.
+
+Example:
+
+    python -m benchmarks.bench_models --datafiles 100000
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Annotated, Any, Callable
+
+import typer
+from pydantic import TypeAdapter
+
+from benchmarks.synthetic import ManifestShape, make_manifest
+from src.blueprints.common_models import Parameter
+from src.blueprints.datafile import Datafile, RawDatafile, RefinedDatafile
+from src.mytardis_client.endpoints import URI
+
+DATASET_URI = URI("/api/v1/dataset/1/")
+
+_PARAMETER_LIST_ADAPTER = TypeAdapter(list[Parameter])
+
+
+@dataclass
+class ModelResult:
+    """The cost of one way of building one stage's models"""
+
+    stage: str
+    approach: str
+    datafiles: int
+    seconds: float
+    seconds_per_million: float
+
+
+def make_raw_datafiles(num_datafiles: int) -> list[RawDatafile]:
+    """Raw datafiles with a few metadata entries each, as an extractor would give"""
+    datafiles = make_manifest(
+        ManifestShape(datafiles=num_datafiles, datafiles_per_dataset=1000)
+    ).get_datafiles()
+    for i, datafile in enumerate(datafiles):
+        datafile.metadata = {"exposure": i * 0.5, "operator": "bnch001", "frame": i}
+    return datafiles
+
+
+def _refined_fields(raw: RawDatafile) -> dict[str, Any]:
+    return {
+        "filename": raw.filename,
+        "directory": raw.directory,
+        "md5sum": raw.md5sum,
+        "mimetype": raw.mimetype,
+        "size": raw.size,
+        "users": raw.users,
+        "groups": raw.groups,
+        "dataset": raw.dataset,
+        "parameter_sets": None,
+    }
+
+
+def _datafile_fields(refined: RefinedDatafile) -> dict[str, Any]:
+    return {
+        "filename": refined.filename,
+        "directory": refined.directory,
+        "md5sum": refined.md5sum,
+        "mimetype": refined.mimetype,
+        "size": refined.size,
+        "users": refined.users,
+        "groups": refined.groups,
+        "dataset": DATASET_URI,
+        "parameter_sets": refined.parameter_sets,
+        "replicas": [],
+    }
+
+
+def _parameters_per_key(raw: RawDatafile) -> list[Parameter]:
+    return [Parameter(name=k, value=v) for k, v in (raw.metadata or {}).items()]
+
+
+def _parameters_batched(raw: RawDatafile) -> list[Parameter]:
+    return _PARAMETER_LIST_ADAPTER.validate_python(
+        [{"name": k, "value": v} for k, v in (raw.metadata or {}).items()]
+    )
+
+
+def _parameters_constructed(raw: RawDatafile) -> list[Parameter]:
+    return [
+        Parameter.model_construct(name=k, value=v)
+        for k, v in (raw.metadata or {}).items()
+    ]
+
+
+def _time(
+    stage: str, approach: str, items: list[Any], build: Callable[[Any], Any]
+) -> ModelResult:
+    start = time.perf_counter()
+    for item in items:
+        build(item)
+    seconds = time.perf_counter() - start
+    return ModelResult(
+        stage=stage,
+        approach=approach,
+        datafiles=len(items),
+        seconds=seconds,
+        seconds_per_million=seconds * 1_000_000 / len(items) if items else 0.0,
+    )
+
+
+def run_model_benchmark(num_datafiles: int) -> list[ModelResult]:
+    """Time each approach to building each stage's models"""
+
+    raw_datafiles = make_raw_datafiles(num_datafiles)
+    refined_datafiles = [
+        RefinedDatafile(**_refined_fields(raw)) for raw in raw_datafiles
+    ]
+
+    return [
+        _time(
+            "refined",
+            "validated",
+            raw_datafiles,
+            lambda raw: RefinedDatafile(**_refined_fields(raw)),
+        ),
+        _time(
+            "refined",
+            "model_construct",
+            raw_datafiles,
+            lambda raw: RefinedDatafile.model_construct(**_refined_fields(raw)),
+        ),
+        _time(
+            "prepared",
+            "validated",
+            refined_datafiles,
+            lambda refined: Datafile(**_datafile_fields(refined)),
+        ),
+        _time(
+            "prepared",
+            "model_construct",
+            refined_datafiles,
+            lambda refined: Datafile.model_construct(**_datafile_fields(refined)),
+        ),
+        _time("parameters", "per-key", raw_datafiles, _parameters_per_key),
+        _time("parameters", "batched", raw_datafiles, _parameters_batched),
+        _time("parameters", "model_construct", raw_datafiles, _parameters_constructed),
+    ]
+
+
+def main(
+    datafiles: Annotated[int, typer.Option(help="Number of datafiles")] = 50_000,
+    as_json: Annotated[bool, typer.Option(help="Print the results as JSON")] = False,
+) -> None:
+    """Compare ways of building the models of each stage of the pipeline"""
+
+    results = run_model_benchmark(datafiles)
+
+    if as_json:
+        typer.echo(json.dumps([asdict(result) for result in results], indent=4))
+        return
+
+    for result in results:
+        typer.echo(
+            f"{result.stage} ({result.approach}): {result.seconds:.2f}s for "
+            f"{result.datafiles} datafiles, "
+            f"{result.seconds_per_million:.1f}s per million"
+        )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,146 @@
+"""Benchmark of the validation of GET response pages.
+
+Compares validating a page of '/dataset_file' objects one object at a time from the
+decoded JSON (the approach used before cached page adapters) with validating the whole
+page directly from the response bytes with 'get_page_adapter()'.
+
+Example:
+
+    python -m benchmarks.bench_validation --page-size 500 --pages 200
+"""
+
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import typer
+
+from src.mytardis_client.mt_rest import GetResponseMeta, get_page_adapter
+from src.mytardis_client.response_data import IngestedDatafile
+
+
+def make_datafile_json(i: int) -> dict[str, Any]:
+    """A '/dataset_file' object as returned by MyTardis, with replicas and a
+    parameter set"""
+    return {
+        "id": i,
+        "resource_uri": f"/api/v1/dataset_file/{i}/",
+        "dataset": "/api/v1/dataset/1/",
+        "created_time": "2024-03-01T10:00:00.000000",
+        "modification_time": "2024-03-01T10:00:00.000000",
+        "deleted": False,
+        "deleted_time": None,
+        "directory": f"data/run-{i // 1000}",
+        "filename": f"image-{i:08d}.tif",
+        "identifiers": None,
+        "md5sum": f"{i:032x}",
+        "mimetype": "image/tiff",
+        "public_access": False,
+        "size": 4_194_304,
+        "version": 1,
+        "parameter_sets": [
+            {"id": i, "resource_uri": f"/api/v1/datafileparameterset/{i}/"}
+        ],
+        "replicas": [
+            {
+                "id": 2 * i + r,
+                "resource_uri": f"/api/v1/replica/{2 * i + r}/",
+                "created_time": "2024-03-01T10:00:00.000000",
+                "datafile": f"/api/v1/dataset_file/{i}/",
+                "last_verified_time": "2024-03-02T10:00:00.000000",
+                "location": f"storage-{r}",
+                "uri": f"data/run-{i // 1000}/image-{i:08d}.tif",
+                "verified": True,
+            }
+            for r in range(2)
+        ],
+    }
+
+
+def make_page(page_size: int) -> bytes:
+    """The body of a GET response containing 'page_size' datafiles"""
+    return json.dumps(
+        {
+            "meta": {
+                "limit": page_size,
+                "offset": 0,
+                "total_count": page_size,
+                "next": None,
+                "previous": None,
+            },
+            "objects": [make_datafile_json(i) for i in range(page_size)],
+        }
+    ).encode()
+
+
+def validate_per_object(content: bytes) -> list[IngestedDatafile]:
+    """Decode the page, then validate each object from Python data"""
+    response_json = json.loads(content)
+    GetResponseMeta.model_validate(response_json["meta"])
+    return [IngestedDatafile.model_validate(obj) for obj in response_json["objects"]]
+
+
+def validate_page(content: bytes) -> list[IngestedDatafile]:
+    """Validate the whole page from the JSON bytes"""
+    page = get_page_adapter(IngestedDatafile).validate_json(content)
+    return page.objects  # type: ignore[return-value]
+
+
+@dataclass
+class ValidationResult:
+    """The outcome of benchmarking one validation approach"""
+
+    approach: str
+    objects: int
+    seconds: float
+    objects_per_second: float
+
+
+def run_validation_benchmark(page_size: int, pages: int) -> list[ValidationResult]:
+    """Time both approaches on 'pages' pages of 'page_size' datafiles"""
+
+    content = make_page(page_size)
+    assert validate_page(content) == validate_per_object(content)  # nosec
+
+    results = []
+    for name, validate in (
+        ("per-object", validate_per_object),
+        ("page-adapter", validate_page),
+    ):
+        start = time.perf_counter()
+        for _ in range(pages):
+            validate(content)
+        seconds = time.perf_counter() - start
+        objects = page_size * pages
+        results.append(
+            ValidationResult(
+                approach=name,
+                objects=objects,
+                seconds=seconds,
+                objects_per_second=objects / seconds if seconds else 0.0,
+            )
+        )
+    return results
+
+
+def main(page_size: int = 500, pages: int = 100, as_json: bool = False) -> None:
+    """Compare the validation of GET response pages one object at a time with the
+    validation of whole pages from bytes"""
+
+    results = run_validation_benchmark(page_size, pages)
+
+    if as_json:
+        typer.echo(json.dumps([asdict(result) for result in results], indent=4))
+        return
+
+    for result in results:
+        typer.echo(
+            f"{result.approach}: {result.objects} objects in {result.seconds:.2f}s "
+            f"({result.objects_per_second:.0f} objects/s)"
+        )
+    typer.echo(f"Speed-up: {results[0].seconds / results[1].seconds:.2f}x")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,450 @@
+"""Generation of synthetic on-disk data trees for benchmarking the extractors.
+
+Each generator writes a tree with the layout expected by one of the profiles:
+
+- ABI MuSIC: project/experiment directories with 'project.json' and
+  'experiment.json', dataset directories with '<dataset>.json' and a timestamped
+  data directory, and optionally a Zarr store per dataset (with its JSON sidecar).
+- RO-Crate: an 'ro-crate-metadata.json' describing projects, experiments
+  (DataCatalogs) and nested datasets, with some files listed in the crate and the
+  rest only present on disk.
+- IDW: an 'ingestion.yaml' listing every object, next to the data files.
+
+The number of objects, the nesting depth of the files within each dataset and the
+distribution of file sizes are configurable. Files can be written as sparse files,
+so that large trees can be generated quickly and without using much disk space
+(their checksums still have to read every byte).
+
+Example:
+
+    python -m benchmarks.data_trees abi /tmp/abi-tree --datasets-per-experiment 20
+"""
+
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Annotated, Any, Literal
+
+import typer
+import yaml
+
+from src.blueprints.datafile import RawDatafile
+from src.blueprints.dataset import RawDataset
+from src.blueprints.experiment import RawExperiment
+from src.blueprints.project import RawProject
+
+# Importing the IDW extractor registers the YAML representers for the dataclasses
+from src.profiles.idw import metadata_extraction as _  # noqa: F401
+
+_WRITE_BLOCK_SIZE = 1024 * 1024
+
+_PRINCIPAL_INVESTIGATOR = "bnch001"
+_INSTRUMENT = "benchmark-instrument"
+
+
+@dataclass
+class FileSizes:
+    """A distribution of file sizes, in bytes
+
+    Attributes:
+        kind: 'fixed' (always 'mean'), 'uniform' (between 0 and 2 * 'mean') or
+            'lognormal' (median 'mean', long tail)
+        mean: the typical size of a file
+        maximum: upper bound on the size of any file
+    """
+
+    kind: Literal["fixed", "uniform", "lognormal"] = "fixed"
+    mean: int = 4096
+    maximum: int = 1 << 30
+
+    def sample(self, rng: random.Random) -> int:
+        """Draw a file size"""
+        if self.kind == "fixed":
+            size = self.mean
+        elif self.kind == "uniform":
+            size = rng.randint(0, 2 * self.mean)
+        else:
+            size = int(rng.lognormvariate(0, 1) * self.mean)
+        return max(0, min(size, self.maximum))
+
+
+@dataclass
+class TreeShape:
+    """The shape of a synthetic data tree
+
+    Attributes:
+        projects: number of projects
+        experiments_per_project: number of experiments in each project
+        datasets_per_experiment: number of datasets in each experiment
+        files_per_dataset: number of data files in each dataset
+        depth: number of directory levels the files of a dataset are spread over
+        files_per_directory: number of files in each directory of a dataset
+        file_sizes: distribution of data file sizes
+        sparse: write data files as sparse files rather than filling them
+        seed: seed for the random number generator
+    """
+
+    projects: int = 1
+    experiments_per_project: int = 2
+    datasets_per_experiment: int = 5
+    files_per_dataset: int = 100
+    depth: int = 1
+    files_per_directory: int = 50
+    file_sizes: FileSizes = field(default_factory=FileSizes)
+    sparse: bool = False
+    seed: int = 0
+
+    @property
+    def total_files(self) -> int:
+        """The number of data files in the tree"""
+        return (
+            self.projects
+            * self.experiments_per_project
+            * self.datasets_per_experiment
+            * self.files_per_dataset
+        )
+
+
+class _TreeWriter:
+    """Writes the data files of a tree, with a shared random number generator"""
+
+    def __init__(self, shape: TreeShape) -> None:
+        self.shape = shape
+        self.rng = random.Random(shape.seed)
+        self._block = self.rng.randbytes(_WRITE_BLOCK_SIZE)
+
+    def write_file(self, path: Path, size: int) -> None:
+        """Write a file of 'size' bytes at 'path'"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as file:
+            if self.shape.sparse:
+                file.truncate(size)
+                return
+            # Vary the start of each file so that checksums differ
+            offset = self.rng.randrange(_WRITE_BLOCK_SIZE)
+            remaining = size
+            while remaining > 0:
+                chunk = self._block[offset : offset + remaining]
+                file.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+
+    def dataset_file_paths(self, dataset_dir: Path) -> list[Path]:
+        """Paths of the data files of one dataset, spread over 'depth' levels"""
+        shape = self.shape
+        paths = []
+        for i in range(shape.files_per_dataset):
+            directory = dataset_dir
+            bucket = i // shape.files_per_directory
+            for level in range(shape.depth - 1, 0, -1):
+                directory = directory / f"d{level}-{bucket % shape.files_per_directory}"
+                bucket //= shape.files_per_directory
+            paths.append(directory / f"file-{i:06d}.dat")
+        return paths
+
+    def write_dataset_files(self, dataset_dir: Path) -> list[Path]:
+        """Write the data files of one dataset"""
+        paths = self.dataset_file_paths(dataset_dir)
+        for path in paths:
+            self.write_file(path, self.shape.file_sizes.sample(self.rng))
+        return paths
+
+
+def _write_json(path: Path, data: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=4), encoding="utf-8")
+
+
+def generate_abi_music_tree(
+    root: Path, shape: TreeShape, zarr_chunks_per_dataset: int = 0
+) -> None:
+    """Generate a tree in the layout of the ABI MuSIC profile.
+
+    If 'zarr_chunks_per_dataset' is non-zero, each dataset also gets a Zarr store
+    with that many chunk files, under '<root>/<project>-<experiment>-<dataset>/'.
+    """
+    writer = _TreeWriter(shape)
+    start_time = datetime(2024, 1, 1)
+    dataset_number = 0
+
+    for p in range(shape.projects):
+        project = f"project-{p}"
+        project_dir = root / project
+        _write_json(
+            project_dir / "project.json",
+            {
+                "project_name": f"Benchmark project {p}",
+                "project_description": "A project generated for benchmarking",
+                "principal_investigator": _PRINCIPAL_INVESTIGATOR,
+                "project_ids": [project],
+                "groups": [],
+                "users": [{"user": _PRINCIPAL_INVESTIGATOR, "admin": True}],
+            },
+        )
+
+        for e in range(shape.experiments_per_project):
+            experiment = f"experiment-{e}"
+            experiment_dir = project_dir / experiment
+            _write_json(
+                experiment_dir / "experiment.json",
+                {
+                    "experiment_name": f"Benchmark experiment {p}-{e}",
+                    "experiment_description": "An experiment generated for benchmarking",
+                    "project": project,
+                    "experiment_ids": [experiment],
+                },
+            )
+
+            for d in range(shape.datasets_per_experiment):
+                dataset = f"dataset-{p}-{e}-{d}"
+                dataset_dir = experiment_dir / dataset
+                timestamp = (start_time + timedelta(minutes=dataset_number)).strftime(
+                    r"%y%m%d-%H%M%S"
+                )
+                dataset_number += 1
+                config = {
+                    "Description": f"Benchmark dataset {dataset}",
+                    "Offsets": {"SQRT Offset": 10},
+                    "Basename": {
+                        "Project": project,
+                        "Sample": experiment,
+                        "Sequence": dataset,
+                    },
+                }
+                _write_json(dataset_dir / f"{dataset}.json", config)
+                writer.write_dataset_files(dataset_dir / timestamp)
+
+                if zarr_chunks_per_dataset:
+                    zarr_parent = root / f"{project}-{experiment}-{dataset}"
+                    _write_json(zarr_parent / f"{timestamp}.json", {"config": config})
+                    zarr_dir = zarr_parent / f"{timestamp}.zarr"
+                    _write_json(zarr_dir / ".zattrs", {"multiscales": []})
+                    for c in range(zarr_chunks_per_dataset):
+                        writer.write_file(
+                            zarr_dir / "0" / str(c // 100) / str(c % 100),
+                            writer.shape.file_sizes.sample(writer.rng),
+                        )
+
+
+def generate_ro_crate_tree(
+    root: Path, shape: TreeShape, listed_fraction: float = 0.5
+) -> None:
+    """Generate a tree in the layout of the RO-Crate profile.
+
+    Each experiment's datasets are nested one inside the other, and a fraction
+    'listed_fraction' of each dataset's files are listed in the crate metadata; the
+    remainder are only found on disk.
+    """
+    writer = _TreeWriter(shape)
+    graph: list[dict[str, Any]] = []
+    top_level_parts: list[dict[str, str]] = []
+
+    for p in range(shape.projects):
+        project_id = f"project-{p}"
+        graph.append(
+            {
+                "@id": project_id,
+                "@type": "Project",
+                "name": f"Benchmark project {p}",
+                "founder": _PRINCIPAL_INVESTIGATOR,
+                "description": "A project generated for benchmarking",
+            }
+        )
+
+        for e in range(shape.experiments_per_project):
+            experiment_id = f"experiment-{p}-{e}"
+            graph.append(
+                {
+                    "@id": experiment_id,
+                    "@type": "DataCatalog",
+                    "name": experiment_id,
+                    "project": project_id,
+                    "description": "An experiment generated for benchmarking",
+                }
+            )
+
+            parent: dict[str, Any] | None = None
+            dataset_path = Path()
+            for d in range(shape.datasets_per_experiment):
+                dataset_path = dataset_path / f"dataset-{p}-{e}-{d}"
+                dataset_id = dataset_path.as_posix() + "/"
+                dataset: dict[str, Any] = {
+                    "@id": dataset_id,
+                    "@type": "Dataset",
+                    "name": f"Benchmark dataset {p}-{e}-{d}",
+                    "includedInDataCatalog": experiment_id,
+                    "instrument": _INSTRUMENT,
+                    "hasPart": [],
+                }
+                graph.append(dataset)
+                if parent is None:
+                    top_level_parts.append({"@id": dataset_id})
+                else:
+                    parent["hasPart"].append({"@id": dataset_id})
+                parent = dataset
+
+                paths = writer.write_dataset_files(root / dataset_path / "files")
+                num_listed = int(len(paths) * listed_fraction)
+                for path in paths[:num_listed]:
+                    file_id = path.relative_to(root).as_posix()
+                    dataset["hasPart"].append({"@id": file_id})
+                    graph.append({"@id": file_id, "@type": "File", "name": path.name})
+
+    graph.append(
+        {
+            "@id": "./",
+            "@type": "Dataset",
+            "hasPart": top_level_parts,
+            "includedInDataCatalog": [],
+            "instrument": _INSTRUMENT,
+            "identifier": [
+                {
+                    "@id": "Crate_UUID",
+                    "@type": "PropertyValue",
+                    "name": "RO-CrateUUID",
+                    "value": uuid.UUID(int=writer.rng.getrandbits(128)).hex,
+                },
+                {
+                    "@id": "Crate_Name",
+                    "@type": "PropertyValue",
+                    "name": "RO-CrateName",
+                    "value": "benchmark-crate",
+                },
+            ],
+        }
+    )
+    graph.append(
+        {
+            "@id": "ro-crate-metadata.json",
+            "@type": "CreativeWork",
+            "about": {"@id": "./"},
+            "conformsTo": {"@id": "https://w3id.org/ro/crate/1.1"},
+        }
+    )
+
+    _write_json(
+        root / "ro-crate-metadata.json",
+        {"@context": "https://w3id.org/ro/crate/1.1/context", "@graph": graph},
+    )
+
+
+def generate_idw_tree(root: Path, shape: TreeShape) -> Path:
+    """Generate a tree in the layout of the IDW profile. Returns the path of the
+    'ingestion.yaml' file, which is what the IDW extractor takes as input."""
+    writer = _TreeWriter(shape)
+    objects: list[Any] = []
+
+    for p in range(shape.projects):
+        project_id = f"project-{p}"
+        objects.append(
+            RawProject(
+                name=f"Benchmark project {p}",
+                description="A project generated for benchmarking",
+                principal_investigator=_PRINCIPAL_INVESTIGATOR,
+                identifiers=[project_id],
+            )
+        )
+        for e in range(shape.experiments_per_project):
+            experiment_id = f"experiment-{p}-{e}"
+            objects.append(
+                RawExperiment(
+                    title=f"Benchmark experiment {p}-{e}",
+                    description="An experiment generated for benchmarking",
+                    identifiers=[experiment_id],
+                    projects=[project_id],
+                )
+            )
+            for d in range(shape.datasets_per_experiment):
+                dataset_id = f"dataset-{p}-{e}-{d}"
+                objects.append(
+                    RawDataset(
+                        description=f"Benchmark dataset {p}-{e}-{d}",
+                        identifiers=[dataset_id],
+                        experiments=[experiment_id],
+                        instrument=_INSTRUMENT,
+                    )
+                )
+                for path in writer.write_dataset_files(root / dataset_id):
+                    objects.append(
+                        RawDatafile(
+                            filename=path.name,
+                            directory=path.parent.relative_to(root),
+                            # The extractor recomputes the checksum of each file
+                            md5sum="",
+                            mimetype="application/octet-stream",
+                            size=path.stat().st_size,
+                            dataset=dataset_id,
+                        )
+                    )
+
+    yaml_path = root / "ingestion.yaml"
+    with yaml_path.open("w", encoding="utf-8") as file:
+        yaml.dump_all(objects, file)
+    return yaml_path
+
+
+class Profile(str, Enum):
+    """The profiles for which trees can be generated"""
+
+    ABI_MUSIC = "abi"
+    RO_CRATE = "ro-crate"
+    IDW = "idw"
+
+
+def main(
+    profile: Profile,
+    root: Annotated[Path, typer.Argument(help="Directory to generate the tree in")],
+    projects: int = 1,
+    experiments_per_project: int = 2,
+    datasets_per_experiment: int = 5,
+    files_per_dataset: int = 100,
+    depth: int = 1,
+    files_per_directory: int = 50,
+    size_distribution: Annotated[
+        str, typer.Option(help="One of 'fixed', 'uniform' or 'lognormal'")
+    ] = "fixed",
+    mean_size: int = 4096,
+    max_size: int = 1 << 30,
+    sparse: bool = False,
+    zarr_chunks_per_dataset: Annotated[
+        int, typer.Option(help="ABI MuSIC only: chunk files per Zarr store")
+    ] = 0,
+    seed: int = 0,
+) -> None:
+    """Generate a synthetic data tree for one of the ingestion profiles"""
+
+    if size_distribution not in ("fixed", "uniform", "lognormal"):
+        raise typer.BadParameter(f"Unknown size distribution '{size_distribution}'")
+
+    shape = TreeShape(
+        projects=projects,
+        experiments_per_project=experiments_per_project,
+        datasets_per_experiment=datasets_per_experiment,
+        files_per_dataset=files_per_dataset,
+        depth=depth,
+        files_per_directory=files_per_directory,
+        file_sizes=FileSizes(
+            kind=size_distribution,  # type: ignore[arg-type]
+            mean=mean_size,
+            maximum=max_size,
+        ),
+        sparse=sparse,
+        seed=seed,
+    )
+
+    if profile == Profile.ABI_MUSIC:
+        generate_abi_music_tree(root, shape, zarr_chunks_per_dataset)
+    elif profile == Profile.RO_CRATE:
+        generate_ro_crate_tree(root, shape)
+    else:
+        generate_idw_tree(root, shape)
+
+    typer.echo(f"Generated {shape.total_files} data files under {root}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,486 @@
+"""An in-process stand-in for the MyTardis (Tastypie) REST API, for benchmarking.
+
+The server implements just enough of the API for the ingestion pipeline to run
+end-to-end against it: paginated, filtered GETs (including filtering on
+identifiers and on related objects by ID), POSTs which create objects in the shape
+returned by the real API, and the introspection endpoint. Latency and 502 errors can
+be injected to approximate a loaded production server.
+
+Objects are kept in memory and indexed on every field, so lookups stay cheap even
+with millions of datafiles, and the benchmark measures the client rather than the
+server.
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+API_STUB = "/api/v1/"
+
+# Query parameters which control the response rather than filter the objects
+_META_PARAMS = ("limit", "offset", "format", "order_by", "fields")
+
+
+@dataclass
+class FakeServerOptions:
+    """Behaviour of the fake MyTardis server
+
+    Attributes:
+        latency: seconds to sleep before answering each request
+        latency_jitter: maximum extra seconds (uniformly distributed) added to 'latency'
+        error_rate: fraction of requests answered with a 502 Bad Gateway
+        default_page_size: number of objects per page when the request has no 'limit'
+        max_page_size: upper bound on the number of objects per page (Tastypie's
+            max_limit)
+        seed: seed for the random number generator used for jitter and errors
+        fields_param: query parameter which restricts the fields of returned objects
+            to a comma-separated list (not standard Tastypie; None to ignore it)
+        gzip_responses: compress response bodies for clients which accept gzip
+    """
+
+    latency: float = 0.0
+    latency_jitter: float = 0.0
+    error_rate: float = 0.0
+    default_page_size: int = 20
+    max_page_size: int = 1000
+    seed: int = 0
+    fields_param: Optional[str] = "fields"
+    gzip_responses: bool = False
+
+
+@dataclass
+class FakeServerStats:
+    """Counts of the requests the fake server has answered"""
+
+    requests: dict[tuple[str, str], int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+    injected_errors: int = 0
+    connections: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def total(self) -> int:
+        """Total number of requests received"""
+        return sum(self.requests.values())
+
+    def record_connection(self) -> None:
+        """Count a newly accepted connection"""
+        with self._lock:
+            self.connections += 1
+
+    def record_transfer(self, received: int, sent: int) -> None:
+        """Count the bytes of a request body received and a response body sent"""
+        with self._lock:
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+
+def _uri(endpoint: str, object_id: int) -> str:
+    return f"{API_STUB}{endpoint}/{object_id}/"
+
+
+def _tokens(value: Any) -> list[str]:
+    """The values a field can be matched against in a query string.
+
+    Related objects can be filtered on either by URI or by ID (the client sends IDs),
+    so both reduce to the ID here.
+    """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [token for item in value for token in _tokens(item)]
+    if isinstance(value, dict):
+        return [str(value["id"])] if "id" in value else []
+    if isinstance(value, bool):
+        return [str(value).lower()]
+    text = str(value)
+    if text.startswith(API_STUB) and text.endswith("/"):
+        return [text.rstrip("/").rsplit("/", 1)[-1]]
+    return [text]
+
+
+class FakeMyTardisStore:
+    """Thread-safe, indexed, in-memory storage of MyTardis objects"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._objects: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._index: dict[str, dict[str, dict[str, list[int]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(list))
+        )
+
+    def add(self, endpoint: str, obj: dict[str, Any]) -> dict[str, Any]:
+        """Store 'obj', assigning its ID and resource URI"""
+        with self._lock:
+            objects = self._objects[endpoint]
+            position = len(objects)
+            obj["id"] = position + 1
+            obj["resource_uri"] = _uri(endpoint, obj["id"])
+            objects.append(obj)
+
+            index = self._index[endpoint]
+            for key, value in obj.items():
+                for token in _tokens(value):
+                    index[key][token].append(position)
+                if key == "identifiers":
+                    for token in _tokens(value):
+                        index["identifier"][token].append(position)
+        return obj
+
+    def get(self, endpoint: str, object_id: int) -> Optional[dict[str, Any]]:
+        """Get an object by ID"""
+        with self._lock:
+            objects = self._objects.get(endpoint, [])
+            return objects[object_id - 1] if 0 < object_id <= len(objects) else None
+
+    def count(self, endpoint: str) -> int:
+        """The number of objects stored for 'endpoint'"""
+        with self._lock:
+            return len(self._objects.get(endpoint, []))
+
+    def query(
+        self, endpoint: str, filters: dict[str, list[str]]
+    ) -> list[dict[str, Any]]:
+        """Objects from 'endpoint' matching all of 'filters'"""
+        with self._lock:
+            objects = self._objects.get(endpoint, [])
+            if not filters:
+                return list(objects)
+
+            index = self._index[endpoint]
+            candidates: Optional[set[int]] = None
+            for key, values in filters.items():
+                for value in values:
+                    positions = set(index.get(key, {}).get(value, ()))
+                    candidates = (
+                        positions if candidates is None else candidates & positions
+                    )
+                    if not candidates:
+                        return []
+
+            return [objects[position] for position in sorted(candidates or ())]
+
+
+class FakeMyTardis:
+    """The behaviour of the fake API, independent of the HTTP transport"""
+
+    def __init__(self, options: FakeServerOptions) -> None:
+        self.options = options
+        self.store = FakeMyTardisStore()
+        self.stats = FakeServerStats()
+        self._random = random.Random(options.seed)
+        self._random_lock = threading.Lock()
+        self._creators: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+            "project": self._create_project,
+            "experiment": self._create_experiment,
+            "dataset": self._create_dataset,
+            "dataset_file": self._create_datafile,
+            "projectparameterset": self._create_parameter_set,
+            "experimentparameterset": self._create_parameter_set,
+            "datasetparameterset": self._create_parameter_set,
+        }
+        self._seed_reference_data()
+
+    def _seed_reference_data(self) -> None:
+        now = datetime(2000, 1, 1).isoformat()
+        self.store.add(
+            "institution",
+            {
+                "name": "Benchmark University",
+                "aliases": None,
+                "identifiers": ["benchmark-institution"],
+            },
+        )
+        facility = self.store.add(
+            "facility",
+            {
+                "name": "Benchmark Facility",
+                "created_time": now,
+                "modified_time": now,
+                "manager_group": {
+                    "id": 1,
+                    "name": "benchmark-managers",
+                    "resource_uri": _uri("group", 1),
+                },
+            },
+        )
+        self.store.add(
+            "instrument",
+            {
+                "name": "Benchmark Instrument",
+                "created_time": now,
+                "modified_time": now,
+                "facility": facility,
+                "identifiers": ["benchmark-instrument"],
+            },
+        )
+
+    def _roll(self) -> tuple[float, bool]:
+        """Draw the injected latency and whether to inject an error"""
+        with self._random_lock:
+            jitter = self._random.uniform(0, self.options.latency_jitter)
+            fail = self._random.random() < self.options.error_rate
+        return self.options.latency + jitter, fail
+
+    def handle(
+        self, method: str, path: str, query: str, body: bytes
+    ) -> tuple[int, Optional[dict[str, Any]]]:
+        """Answer a request, returning the status code and JSON body (if any)"""
+
+        if not path.startswith(API_STUB):
+            return HTTPStatus.NOT_FOUND, {"error": f"Unknown path {path}"}
+        endpoint = path[len(API_STUB) :].strip("/").split("/")[0]
+
+        with self._random_lock:
+            self.stats.requests[(method, endpoint)] += 1
+
+        delay, fail = self._roll()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._random_lock:
+                self.stats.injected_errors += 1
+            return HTTPStatus.BAD_GATEWAY, None
+
+        if method == "GET":
+            return self._get(endpoint, parse_qs(query))
+        if method == "POST":
+            return self._post(endpoint, json.loads(body or b"{}"))
+        return HTTPStatus.METHOD_NOT_ALLOWED, None
+
+    def _get(
+        self, endpoint: str, params: dict[str, list[str]]
+    ) -> tuple[int, Optional[dict[str, Any]]]:
+        if endpoint == "introspection":
+            return HTTPStatus.OK, self._page([self._introspection()], 1, 0, 1)
+
+        limit = int(params.get("limit", [self.options.default_page_size])[0])
+        limit = max(1, min(limit, self.options.max_page_size))
+        offset = int(params.get("offset", [0])[0])
+        filters = {k: v for k, v in params.items() if k not in _META_PARAMS}
+
+        matches = self.store.query(endpoint, filters)
+        objects = matches[offset : offset + limit]
+
+        if self.options.fields_param and (
+            fields := params.get(self.options.fields_param)
+        ):
+            selected = fields[0].split(",")
+            objects = [{k: obj[k] for k in selected if k in obj} for obj in objects]
+
+        return HTTPStatus.OK, self._page(objects, limit, offset, len(matches))
+
+    def _post(
+        self, endpoint: str, data: dict[str, Any]
+    ) -> tuple[int, Optional[dict[str, Any]]]:
+        creator = self._creators.get(endpoint)
+        if creator is None:
+            return HTTPStatus.METHOD_NOT_ALLOWED, None
+
+        obj = self.store.add(endpoint, creator(data))
+        if endpoint in ("project", "experiment", "dataset"):
+            return HTTPStatus.CREATED, obj
+        return HTTPStatus.CREATED, None
+
+    def _page(
+        self, objects: list[dict[str, Any]], limit: int, offset: int, total: int
+    ) -> dict[str, Any]:
+        return {
+            "meta": {
+                "limit": limit,
+                "next": None if offset + limit >= total else "next",
+                "offset": offset,
+                "previous": None if offset == 0 else "previous",
+                "total_count": total,
+            },
+            "objects": objects,
+        }
+
+    def _introspection(self) -> dict[str, Any]:
+        return {
+            "data_classification_enabled": True,
+            "experiment_only_acls": False,
+            "identified_objects": [
+                "dataset",
+                "experiment",
+                "facility",
+                "instrument",
+                "project",
+                "institution",
+            ],
+            "identifiers_enabled": True,
+            "profiled_objects": [],
+            "profiles_enabled": False,
+            "projects_enabled": True,
+            "resource_uri": "/api/v1/introspection/None/",
+        }
+
+    def _related(self, endpoint: str, uri: str) -> dict[str, Any]:
+        obj = self.store.get(endpoint, int(_tokens(uri)[0]))
+        if obj is None:
+            raise ValueError(f"No {endpoint} object with URI {uri}")
+        return obj
+
+    def _create_project(self, data: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "name": data["name"],
+            "description": data.get("description", ""),
+            "classification": data.get("data_classification", 25),
+            "identifiers": data.get("identifiers"),
+            "institution": data.get("institution", []),
+            "locked": False,
+            "principal_investigator": data["principal_investigator"],
+        }
+
+    def _create_experiment(self, data: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "title": data["title"],
+            "description": data.get("description", ""),
+            "classification": data.get("data_classification") or 25,
+            "identifiers": data.get("identifiers"),
+            "institution_name": data.get("institution_name", ""),
+            "projects": [
+                self._related("project", uri) for uri in data.get("projects", [])
+            ],
+        }
+
+    def _create_dataset(self, data: dict[str, Any]) -> dict[str, Any]:
+        now = datetime.now().isoformat()
+        return {
+            "description": data["description"],
+            "classification": data.get("data_classification") or 25,
+            "created_time": data.get("created_time") or now,
+            "modified_time": data.get("modified_time") or now,
+            "directory": data.get("directory"),
+            "experiments": data.get("experiments", []),
+            "identifiers": data.get("identifiers") or [],
+            "immutable": data.get("immutable", False),
+            "instrument": self._related("instrument", data["instrument"]),
+            "parameter_sets": [],
+            "public_access": False,
+        }
+
+    def _create_datafile(self, data: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "filename": data["filename"],
+            "directory": data.get("directory") or "",
+            "dataset": data["dataset"],
+            "md5sum": data["md5sum"],
+            "mimetype": data["mimetype"],
+            "size": data["size"],
+            "created_time": None,
+            "modification_time": None,
+            "deleted": False,
+            "deleted_time": None,
+            "identifiers": None,
+            "parameter_sets": [],
+            "public_access": False,
+            "replicas": [],
+            "version": 1,
+        }
+
+    def _create_parameter_set(self, data: dict[str, Any]) -> dict[str, Any]:
+        return {"schema": data.get("schema"), "parameters": data.get("parameters", [])}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Adapts HTTP requests to the FakeMyTardis instance attached to the server"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, so avoid stalling on delayed ACKs
+    disable_nagle_algorithm = True
+    server: "FakeMyTardisServer"
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        api = self.server.api
+        status, payload = api.handle(method, url.path, url.query, body)
+
+        content = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        compress = bool(
+            api.options.gzip_responses
+            and content
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        )
+        if compress:
+            content = gzip.compress(content, compresslevel=1)
+        api.stats.record_transfer(length, len(content))
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """Handle a GET request"""
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Handle a POST request"""
+        self._dispatch("POST")
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=W0622
+        """Silence the per-request logging of the base class"""
+
+
+class FakeMyTardisServer(ThreadingHTTPServer):
+    """A fake MyTardis API served over HTTP on localhost, from a background thread.
+
+    Use as a context manager:
+
+        with FakeMyTardisServer(FakeServerOptions(latency=0.005)) as server:
+            connection = ConnectionConfig(hostname=server.url)
+            ...
+    """
+
+    daemon_threads = True
+    # Allow for bursts of new connections from many client threads
+    request_queue_size = 128
+
+    def __init__(self, options: Optional[FakeServerOptions] = None) -> None:
+        super().__init__(("127.0.0.1", 0), _RequestHandler)
+        self.api = FakeMyTardis(options or FakeServerOptions())
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        """Count each connection, then handle it in its own thread"""
+        self.api.stats.record_connection()
+        super().process_request(request, client_address)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server"""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def __enter__(self) -> "FakeMyTardisServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,108 @@
+"""Generation of synthetic ingestion manifests for benchmarking.
+
+The manifests describe a regular hierarchy of projects, experiments, datasets and
+datafiles. No files exist on disk for them: they exercise the metadata path of the
+pipeline (smelt, crucible, overseer, forge) and are ingested with a conveyor that
+does not transfer anything.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.blueprints.datafile import RawDatafile
+from src.blueprints.dataset import RawDataset
+from src.blueprints.experiment import RawExperiment
+from src.blueprints.project import RawProject
+from src.extraction.manifest import IngestionManifest
+
+BENCHMARK_INSTITUTION = "benchmark-institution"
+BENCHMARK_INSTRUMENT = "benchmark-instrument"
+
+
+@dataclass
+class ManifestShape:
+    """The shape of a synthetic manifest
+
+    Attributes:
+        datafiles: total number of datafiles
+        datafiles_per_dataset: number of datafiles in each dataset
+        datasets_per_experiment: number of datasets in each experiment
+        experiments_per_project: number of experiments in each project
+        files_per_directory: number of datafiles in each directory of a dataset
+    """
+
+    datafiles: int = 1000
+    datafiles_per_dataset: int = 1000
+    datasets_per_experiment: int = 10
+    experiments_per_project: int = 10
+    files_per_directory: int = 100
+
+
+def _ceil_div(numerator: int, denominator: int) -> int:
+    return -(-numerator // denominator)
+
+
+def make_manifest(
+    shape: ManifestShape, data_root: Path = Path("/benchmark")
+) -> IngestionManifest:
+    """Generate a manifest with the given shape"""
+
+    num_datasets = _ceil_div(shape.datafiles, shape.datafiles_per_dataset)
+    num_experiments = _ceil_div(num_datasets, shape.datasets_per_experiment)
+    num_projects = _ceil_div(num_experiments, shape.experiments_per_project)
+
+    projects = [
+        RawProject(
+            name=f"Benchmark project {p}",
+            description="A project generated for benchmarking",
+            principal_investigator="bnch001",
+            identifiers=[f"bench-project-{p}"],
+            institution=[BENCHMARK_INSTITUTION],
+        )
+        for p in range(num_projects)
+    ]
+
+    experiments = [
+        RawExperiment(
+            title=f"Benchmark experiment {e}",
+            description="An experiment generated for benchmarking",
+            identifiers=[f"bench-experiment-{e}"],
+            projects=[f"bench-project-{e // shape.experiments_per_project}"],
+        )
+        for e in range(num_experiments)
+    ]
+
+    datasets = [
+        RawDataset(
+            description=f"Benchmark dataset {d}",
+            directory=Path(f"dataset-{d}"),
+            identifiers=[f"bench-dataset-{d}"],
+            experiments=[f"bench-experiment-{d // shape.datasets_per_experiment}"],
+            instrument=BENCHMARK_INSTRUMENT,
+        )
+        for d in range(num_datasets)
+    ]
+
+    datafiles = []
+    for f in range(shape.datafiles):
+        dataset = f // shape.datafiles_per_dataset
+        index_in_dataset = f % shape.datafiles_per_dataset
+        directory = index_in_dataset // shape.files_per_directory
+        datafiles.append(
+            RawDatafile(
+                filename=f"file-{index_in_dataset}.dat",
+                directory=Path(f"dataset-{dataset}/dir-{directory}"),
+                md5sum=f"{f:032x}",
+                mimetype="application/octet-stream",
+                size=1024,
+                dataset=f"bench-dataset-{dataset}",
+            )
+        )
+
+    return IngestionManifest(
+        source_data_root=data_root,
+        projects=projects,
+        experiments=experiments,
+        datasets=datasets,
+        datafiles=datafiles,
+    )
@@ -4,6 +4,7 @@ import logging
 import sys
 from datetime import datetime
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import Annotated, Optional, Tuple
 
 import typer
@@ -12,15 +13,23 @@ from src.blueprints.datafile import RawDatafile
 from src.cli.common import (
     LogFileOption,
     LogLevelOption,
-    ProfileNameOption,
+    ManifestDirOption,
+    ProfileOption,
     ProfileVersionOption,
     SourceDataPathArg,
     StorageBoxOption,
     get_config,
 )
 from src.config.config import ConfigFromEnv
+from src.extraction.manifest import IngestionManifest
+from src.extraction.packing import is_packed_archive, member_paths
 from src.inspector.inspector import Inspector
-from src.mytardis_client.response_data import IngestedDatafile, Replica
+from src.mytardis_client.response_data import (
+    IngestedDatafile,
+    IngestedDatafileStatus,
+    Replica,
+)
+from src.profiles.profile_base import IProfile
 from src.profiles.profile_register import load_profile
 from src.utils import log_utils
 from src.utils.timing import Timer
@@ -28,7 +37,9 @@ from src.utils.timing import Timer
 logger = logging.getLogger(__name__)
 
 
-def _get_oldest_replica(df: IngestedDatafile) -> Optional[Replica]:
+def _get_oldest_replica(
+    df: IngestedDatafile | IngestedDatafileStatus,
+) -> Optional[Replica]:
     """Given a Datafile, return the oldest verified replica."""
     replicas = [replica for replica in df.replicas if replica.verified]
     if len(replicas) == 0:
@@ -45,7 +56,9 @@ def _get_oldest_replica(df: IngestedDatafile) -> Optional[Replica]:
     )[0]
 
 
-def is_complete_df(df: IngestedDatafile, min_file_age: int = 0) -> bool:
+def is_complete_df(
+    df: IngestedDatafile | IngestedDatafileStatus, min_file_age: int = 0
+) -> bool:
     """Returns whether the datafile is complete - metadata ingested, file transferred,
     and at least one verified replica that exceeds minimum file page."""
     oldest_replica = _get_oldest_replica(df)
@@ -67,14 +80,14 @@ def filter_completed_dfs(
     """Inspects through a list of datafiles and returns two lists: one with the datafiles
     that have been ingested and verified, and another with the datafiles that have not been
     ingested or verified."""
-    # Query the API about the datafiles.
+    # Query the API about the datafiles, a dataset at a time.
     inspector = Inspector(config)
+    query_results = inspector.query_datafiles(datafiles)
     unverified_dfs = []
     verified_dfs = []
-    for df in datafiles:
+    for df, query_result in zip(datafiles, query_results):
         # Checks whether the datafile has completed ingestion, and group into two lists.
-        query_result = inspector.query_datafile(df)
-        if query_result is None:
+        if not query_result:
             # Could not find datafile.
             unverified_dfs.append(df)
             continue
@@ -90,6 +103,49 @@ def filter_completed_dfs(
     return verified_dfs, unverified_dfs
 
 
+def load_manifest(
+    source_data_path: Path,
+    profile: Optional[IProfile],
+    manifest_dir: Optional[Path],
+) -> IngestionManifest:
+    """Load the manifest of a data source, either from a previously extracted manifest
+    directory or by running the profile's extractor on the data source.
+
+    Loading a manifest avoids walking and checksumming the whole data source again.
+    The manifest must have been extracted from 'source_data_path', so that the
+    datafiles it lists are those of the data source. When extracting, any files the
+    profile produces, such as packed archives, are written to a temporary directory and
+    discarded, as only their checksums are needed.
+    """
+    if manifest_dir is not None:
+        logger.info("Loading list of datafiles from manifest in %s", manifest_dir)
+        manifest = IngestionManifest.deserialize(manifest_dir)
+        if manifest.get_data_root().resolve() != source_data_path.resolve():
+            raise typer.BadParameter(
+                f"The manifest in {manifest_dir} was extracted from "
+                f"{manifest.get_data_root()}, not {source_data_path}."
+            )
+        return manifest
+    if profile is None:
+        raise typer.BadParameter(
+            "Either a profile or a manifest directory must be given."
+        )
+    logger.info("Extracting list of datafiles from %s", source_data_path)
+    extractor = profile.get_extractor()
+    with TemporaryDirectory() as staging_dir:
+        extractor.staging_dir = Path(staging_dir)
+        return extractor.extract(source_data_path)
+
+
+def datafile_paths(manifest: IngestionManifest, datafile: RawDatafile) -> list[Path]:
+    """The paths of the files of a datafile: the datafile itself, and for a packed
+    archive, the files in the data source which were packed into it."""
+    path = manifest.get_datafile_path(datafile)
+    if is_packed_archive(datafile):
+        return [path] + member_paths(datafile, manifest.get_data_root())
+    return [path]
+
+
 def _delete_datafiles(df_paths: list[Path]) -> None:
     """Delete a list of files."""
     logger.info("Deleting datafiles.")
@@ -112,7 +168,7 @@ def _delete_datafiles(df_paths: list[Path]) -> None:
 # pylint: disable=too-many-locals
 def clean(
     source_data_path: SourceDataPathArg,
-    profile_name: ProfileNameOption,
+    profile_name: ProfileOption = None,
     storage: StorageBoxOption = None,
     profile_version: ProfileVersionOption = None,
     ask_first: Annotated[
@@ -135,16 +191,22 @@ def clean(
     ] = 0,
     log_file: LogFileOption = Path("clean.log"),
     log_level: LogLevelOption = "INFO",
+    manifest_dir: ManifestDirOption = None,
 ) -> None:
-    """Delete datafiles in source data source after ingestion is complete."""
+    """Delete datafiles in source data source after ingestion is complete.
+
+    If a profile is given, its cleanup code is run once the datafiles are deleted.
+    """
     log_utils.init_logging(file_name=str(log_file), level=log_level)
 
-    logger.info("Extracting list of datafiles using %s profile", profile_name)
-    profile = load_profile(profile_name, profile_version)
-    manifest = profile.get_extractor().extract(source_data_path)
+    profile = None
+    if profile_name is not None:
+        logger.info("Listing datafiles using %s profile", profile_name)
+        profile = load_profile(profile_name, profile_version)
+    manifest = load_manifest(source_data_path, profile, manifest_dir)
     # Print out all files
     df_paths = [
-        manifest.get_data_root() / df.filepath for df in manifest.get_datafiles()
+        path for df in manifest.get_datafiles() for path in datafile_paths(manifest, df)
     ]
     logger.info("The following datafiles are found in this data source.")
     for file in df_paths:
@@ -169,7 +231,9 @@ def clean(
     else:
         logger.info("Ingestion for this data source is complete.")
 
-    verified_df_paths = [manifest.get_data_root() / df.filepath for df in verified_dfs]
+    verified_df_paths = [
+        path for df in verified_dfs for path in datafile_paths(manifest, df)
+    ]
 
     if len(verified_dfs) != len(manifest.get_datafiles()):
         logger.error(
@@ -186,6 +250,7 @@ def clean(
     # Delete all datafiles.
     _delete_datafiles(verified_df_paths)
     # Call profile-specific cleanup code.
-    logger.info("Running profile-specific cleanup code.")
-    profile.cleanup(source_data_path)
+    if profile is not None:
+        logger.info("Running profile-specific cleanup code.")
+        profile.cleanup(source_data_path)
     logger.info("Finished deleting verified files.")
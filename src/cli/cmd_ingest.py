@@ -2,29 +2,72 @@
 
 import logging
 from pathlib import Path
-from typing import Annotated
+from tempfile import TemporaryDirectory
+from typing import Annotated, Optional
 
 import typer
 
 from src.cli.common import (
+    ChromeTraceFileOption,
+    FullSummaryOption,
     LogFileOption,
     LogLevelOption,
+    LogRateLimitOption,
+    MetricsFileOption,
     ProfileNameOption,
     ProfileVersionOption,
+    QueuedLoggingOption,
     SourceDataPathArg,
+    StatusFileOption,
     StorageBoxOption,
+    TraceFileOption,
     get_config,
 )
 from src.extraction.manifest import IngestionManifest
 from src.ingestion_factory.factory import IngestionFactory
+from src.ingestion_factory.failures import read_dead_letters
+from src.mytardis_client.mt_rest import MyTardisRESTFactory
 from src.profiles.profile_register import load_profile
 from src.utils import log_utils
 from src.utils.filesystem.filesystem_nodes import DirectoryNode
+from src.utils.progress import report_progress
 from src.utils.timing import Timer
+from src.utils.tracing import get_tracer, span
 
 logger = logging.getLogger(__name__)
 
 
+def report_request_metrics(
+    mt_rest: MyTardisRESTFactory, metrics_file: Optional[Path]
+) -> None:
+    """Log a summary of the requests made to MyTardis, and optionally write them to
+    'metrics_file' in Prometheus text format."""
+    mt_rest.metrics.log_summary(logger)
+    if metrics_file is not None:
+        mt_rest.metrics.write_prometheus(metrics_file)
+        logger.info("Request metrics written to %s", metrics_file)
+
+
+def start_tracing(
+    trace_file: Optional[Path], chrome_trace_file: Optional[Path]
+) -> None:
+    """Enable the pipeline tracer if any trace output has been requested"""
+    if trace_file is not None or chrome_trace_file is not None:
+        get_tracer().enable(record_events=chrome_trace_file is not None)
+
+
+def report_trace(trace_file: Optional[Path], chrome_trace_file: Optional[Path]) -> None:
+    """Write the requested trace outputs"""
+    tracer = get_tracer()
+    if trace_file is not None:
+        tracer.write_json(trace_file)
+        logger.info("Stage timings written to %s", trace_file)
+    if chrome_trace_file is not None:
+        tracer.write_chrome_trace(chrome_trace_file)
+        logger.info("Trace events written to %s", chrome_trace_file)
+
+
+# pylint: disable=too-many-arguments,too-many-locals
 def extract(
     source_data_path: SourceDataPathArg,
     output_dir: Annotated[
@@ -37,33 +80,70 @@ def extract(
     profile_version: ProfileVersionOption = None,
     log_file: LogFileOption = Path("extraction.log"),
     log_level: LogLevelOption = "INFO",
+    queued_logging: QueuedLoggingOption = False,
+    log_rate_limit: LogRateLimitOption = 0,
+    trace_file: TraceFileOption = None,
+    chrome_trace_file: ChromeTraceFileOption = None,
+    status_file: StatusFileOption = None,
+    full_summary: FullSummaryOption = False,
 ) -> None:
     """
     Extract metadata from a directory tree, parse it into a MyTardis PEDD structure,
     and write it to a directory.
 
+    Any files produced during extraction, such as packed archives, are written to the
+    "staging" directory within it, as the source data is not written to.
+
     The 'upload' command be used to ingest this extracted data into MyTardis.
     """
 
-    log_utils.init_logging(file_name=str(log_file), level=log_level)
+    log_utils.init_logging(
+        file_name=str(log_file),
+        level=log_level,
+        queued=queued_logging,
+        rate_limit=log_rate_limit,
+    )
+    start_tracing(trace_file, chrome_trace_file)
     timer = Timer(start=True)
 
     profile = load_profile(profile_name, profile_version)
 
     extractor = profile.get_extractor()
+    extractor.staging_dir = output_dir / "staging"
 
     logger.info("Extracting metadata from %s", source_data_path)
 
-    metadata = extractor.extract(source_data_path)
+    with report_progress(status_file), span("extract"):
+        metadata = extractor.extract(source_data_path)
 
     elapsed = timer.stop()
     logging.info("Finished parsing data directory into PEDD hierarchy")
     logging.info("Total time (s): %.2f", elapsed)
-    logging.info(metadata.summarize())
+    logging.info(metadata.summarize(full=full_summary))
 
     metadata.serialize(output_dir)
 
     logging.info("Extraction complete. Ingestion manifest written to %s.", output_dir)
+    report_trace(trace_file, chrome_trace_file)
+
+
+def load_failed_objects(
+    manifest_dir: Path, dead_letter_file: Path
+) -> IngestionManifest:
+    """Load the objects which failed in a previous upload of the manifest in
+    'manifest_dir' from its dead-letter file"""
+    if not dead_letter_file.exists():
+        raise ValueError(
+            f"No dead-letter file found at {dead_letter_file}. There is nothing to retry."
+        )
+    logging.info("Loading the objects which failed from %s", dead_letter_file)
+    manifest = read_dead_letters(
+        dead_letter_file,
+        IngestionManifest.read_data_root(manifest_dir),
+        IngestionManifest.read_staging_root(manifest_dir),
+    )
+    logging.info(manifest.summarize())
+    return manifest
 
 
 def upload(
@@ -79,33 +159,62 @@ def upload(
     storage: StorageBoxOption = None,
     log_file: LogFileOption = Path("upload.log"),
     log_level: LogLevelOption = "INFO",
+    queued_logging: QueuedLoggingOption = False,
+    log_rate_limit: LogRateLimitOption = 0,
+    metrics_file: MetricsFileOption = None,
+    trace_file: TraceFileOption = None,
+    chrome_trace_file: ChromeTraceFileOption = None,
+    status_file: StatusFileOption = None,
+    retry_failed: Annotated[
+        bool,
+        typer.Option(
+            help=(
+                "Only retry the objects which failed in a previous upload, as recorded "
+                "in its dead-letter file"
+            )
+        ),
+    ] = False,
 ) -> None:
     """
     Submit the extracted metadata to MyTardis, and transfer the data to the storage directory.
     """
-    log_utils.init_logging(file_name=str(log_file), level=log_level)
+    log_utils.init_logging(
+        file_name=str(log_file),
+        level=log_level,
+        queued=queued_logging,
+        rate_limit=log_rate_limit,
+    )
     config = get_config(storage)
+    start_tracing(trace_file, chrome_trace_file)
     if DirectoryNode(manifest_dir).empty():
         raise ValueError(
             "Manifest directory is empty. Extract data into a manifest using 'extract' command."
         )
 
-    logging.info("Loading metadata manifest from %s", manifest_dir)
+    if retry_failed:
+        manifest = load_failed_objects(manifest_dir, config.scheduler.dead_letter_file)
+    else:
+        logging.info("Loading metadata manifest from %s", manifest_dir)
+
+        manifest = IngestionManifest.deserialize(manifest_dir)
 
-    manifest = IngestionManifest.deserialize(manifest_dir)
+        logging.info("Successfully loaded metadata manifest from %s", manifest_dir)
 
-    logging.info("Successfully loaded metadata manifest from %s", manifest_dir)
     logging.info("Submitting metadata to MyTardis")
 
     timer = Timer(start=True)
 
-    ingestion_agent = IngestionFactory(config=config)
+    mt_rest = MyTardisRESTFactory(config.auth, config.connection)
+    ingestion_agent = IngestionFactory(config=config, mt_rest=mt_rest)
 
-    ingestion_agent.ingest(manifest)
+    with report_progress(status_file):
+        ingestion_agent.ingest(manifest)
 
     elapsed = timer.stop()
     logging.info("Finished submitting dataclasses to MyTardis")
     logging.info("Total time (s): %.2f", elapsed)
+    report_request_metrics(mt_rest, metrics_file)
+    report_trace(trace_file, chrome_trace_file)
 
 
 def ingest(
@@ -115,12 +224,28 @@ def ingest(
     profile_version: ProfileVersionOption = None,
     log_file: LogFileOption = Path("ingestion.log"),
     log_level: LogLevelOption = "INFO",
+    queued_logging: QueuedLoggingOption = False,
+    log_rate_limit: LogRateLimitOption = 0,
+    metrics_file: MetricsFileOption = None,
+    trace_file: TraceFileOption = None,
+    chrome_trace_file: ChromeTraceFileOption = None,
+    status_file: StatusFileOption = None,
+    full_summary: FullSummaryOption = False,
 ) -> None:
     """
     Run the full ingestion process, from extracting metadata to ingesting it into MyTardis.
+
+    Any files produced during extraction, such as packed archives, are written to a
+    temporary directory, which is removed once they have been transferred.
     """
-    log_utils.init_logging(file_name=str(log_file), level=log_level)
+    log_utils.init_logging(
+        file_name=str(log_file),
+        level=log_level,
+        queued=queued_logging,
+        rate_limit=log_rate_limit,
+    )
     config = get_config(storage)
+    start_tracing(trace_file, chrome_trace_file)
     timer = Timer(start=True)
 
     profile = load_profile(profile_name, profile_version)
@@ -129,20 +254,27 @@ def ingest(
 
     logger.info("Extracting metadata from %s", source_data_path)
 
-    manifest = extractor.extract(source_data_path)
+    # Progress is reported across both the extraction and the ingestion
+    with report_progress(status_file), TemporaryDirectory() as staging_dir:
+        extractor.staging_dir = Path(staging_dir)
+        with span("extract"):
+            manifest = extractor.extract(source_data_path)
 
-    elapsed = timer.stop()
-    logging.info("Finished parsing data directory into PEDD hierarchy")
-    logging.info("Total time (s): %.2f", elapsed)
-    logging.info(manifest.summarize())
+        elapsed = timer.stop()
+        logging.info("Finished parsing data directory into PEDD hierarchy")
+        logging.info("Total time (s): %.2f", elapsed)
+        logging.info(manifest.summarize(full=full_summary))
 
-    logging.info("Submitting to MyTardis")
-    timer.start()
+        logging.info("Submitting to MyTardis")
+        timer.start()
 
-    ingestion_agent = IngestionFactory(config=config)
+        mt_rest = MyTardisRESTFactory(config.auth, config.connection)
+        ingestion_agent = IngestionFactory(config=config, mt_rest=mt_rest)
 
-    ingestion_agent.ingest(manifest)
+        ingestion_agent.ingest(manifest)
 
     elapsed = timer.stop()
     logger.info("Finished submitting dataclasses and transferring files to MyTardis")
     logger.info("Total time (s): %.2f", elapsed)
+    report_request_metrics(mt_rest, metrics_file)
+    report_trace(trace_file, chrome_trace_file)
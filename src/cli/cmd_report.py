@@ -1,7 +1,9 @@
 # pylint: disable=duplicate-code, fixme
 """Module for the cleaning command."""
 import csv
+import itertools
 import logging
+from collections.abc import Iterable
 from datetime import datetime
 from pathlib import Path
 from typing import Annotated
@@ -9,11 +11,12 @@ from typing import Annotated
 import typer
 
 from src.blueprints.datafile import RawDatafile
-from src.cli.cmd_clean import filter_completed_dfs
+from src.cli.cmd_clean import filter_completed_dfs, load_manifest
 from src.cli.common import (
     LogFileOption,
     LogLevelOption,
-    ProfileNameOption,
+    ManifestDirOption,
+    ProfileOption,
     ProfileVersionOption,
     SourceDataPathArg,
     get_config,
@@ -26,45 +29,43 @@ logger = logging.getLogger(__name__)
 
 def _save_data_status(
     source_path: SourceDataPathArg,
-    datafiles_verified: list[RawDatafile],
-    datafiles_unverified: list[RawDatafile],
-) -> None:
-    """Saves the status of verified and unverified data files to a CSV file."""
+    datafiles_verified: Iterable[RawDatafile],
+    datafiles_unverified: Iterable[RawDatafile],
+) -> Path:
+    """Saves the status of verified and unverified data files to a CSV file.
+
+    The rows are written as they are generated, so the report is never held in memory.
+
+    Returns:
+        Path: the path of the CSV file written.
+    """
     # Get the current date and time
     current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
 
     # Prepare the CSV file for writing with the current date and time in the filename
     output_csv_path = source_path.parent / f"verified_datafiles_{current_datetime}.csv"
 
-    # Combine verified and unverified datafiles into one list with status
-    data_to_write = [
-        {
-            "filename": df.filename,
-            "filepath": source_path.parent / df.filepath,
-            "dataset": df.dataset,
-            "ingestion_verified": verified,
-        }
-        for df, verified in zip(
-            datafiles_verified + datafiles_unverified,
-            [True] * len(datafiles_verified) + [False] * len(datafiles_unverified),
-        )
-    ]
-
-    # Write all data to CSV at once
-    with open(output_csv_path, "w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["filename", "filepath", "dataset", "ingestion_verified"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    rows = itertools.chain(
+        ((df, True) for df in datafiles_verified),
+        ((df, False) for df in datafiles_unverified),
+    )
 
-        writer.writeheader()
-        writer.writerows(data_to_write)
+    with open(output_csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["filename", "filepath", "dataset", "ingestion_verified"])
+        for df, verified in rows:
+            writer.writerow(
+                [df.filename, source_path.parent / df.filepath, df.dataset, verified]
+            )
 
     logger.info("Data written to %s", output_csv_path)
+    return output_csv_path
 
 
 # pylint: disable=too-many-locals
 def report(
     source_data_path: SourceDataPathArg,
-    profile_name: ProfileNameOption,
+    profile_name: ProfileOption = None,
     profile_version: ProfileVersionOption = None,
     min_file_age: Annotated[
         int,
@@ -77,20 +78,22 @@ def report(
     ] = 0,
     log_file: LogFileOption = Path("report.log"),
     log_level: LogLevelOption = "INFO",
+    manifest_dir: ManifestDirOption = None,
 ) -> None:
     """Report on the data source."""
     log_utils.init_logging(file_name=str(log_file), level=log_level)
 
-    logger.info("Extracting list of datafiles using %s profile", profile_name)
-    profile = load_profile(profile_name, profile_version)
-    manifest = profile.get_extractor().extract(source_data_path)
-    # Print out all files
-    df_paths = [
-        manifest.get_data_root() / df.filepath for df in manifest.get_datafiles()
-    ]
-    logger.info("The following datafiles are found in this data source.")
-    for file in df_paths:
-        logger.info(file)
+    profile = (
+        load_profile(profile_name, profile_version)
+        if profile_name is not None and manifest_dir is None
+        else None
+    )
+    manifest = load_manifest(source_data_path, profile, manifest_dir)
+    logger.info(
+        "Found %d datafiles in this data source.", len(manifest.get_datafiles())
+    )
+    for df in manifest.get_datafiles():
+        logger.debug(manifest.get_data_root() / df.filepath)
 
     config = get_config()
     # Check verification status.
@@ -31,6 +31,18 @@ ProfileNameOption: TypeAlias = Annotated[
     ),
 ]
 
+ProfileOption: TypeAlias = Annotated[
+    Optional[str],
+    typer.Option(
+        "--profile",
+        "-p",
+        help=(
+            "Name of the ingestion profile to be used to extract the data. "
+            "Not needed if a manifest directory is given."
+        ),
+    ),
+]
+
 ProfileVersionOption = Annotated[
     Optional[str],
     typer.Option(
@@ -61,6 +73,91 @@ LogLevelOption: TypeAlias = Annotated[
     ),
 ]
 
+QueuedLoggingOption: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help=(
+            "Write log messages from a background thread, so the threads doing the "
+            "work don't wait for the console or log file."
+        )
+    ),
+]
+
+LogRateLimitOption: TypeAlias = Annotated[
+    int,
+    typer.Option(
+        help=(
+            "Log at most this many INFO and DEBUG messages of each kind per minute, "
+            "and the number of those suppressed. 0 for no limit."
+        ),
+        min=0,
+    ),
+]
+
+MetricsFileOption: TypeAlias = Annotated[
+    Optional[Path],
+    typer.Option(
+        help=(
+            "Path of a file to write MyTardis request metrics to, in Prometheus text "
+            "format. The metrics are always summarised in the log."
+        )
+    ),
+]
+
+TraceFileOption: TypeAlias = Annotated[
+    Optional[Path],
+    typer.Option(
+        help=(
+            "Path of a file to write the time spent in each stage of the pipeline to, "
+            "as JSON (totals and percentiles per stage)."
+        )
+    ),
+]
+
+ChromeTraceFileOption: TypeAlias = Annotated[
+    Optional[Path],
+    typer.Option(
+        help=(
+            "Path of a file to write every traced stage to, in the Chrome trace-event "
+            "format (viewable in chrome://tracing or Perfetto)."
+        )
+    ),
+]
+
+StatusFileOption: TypeAlias = Annotated[
+    Optional[Path],
+    typer.Option(
+        help=(
+            "Path of a file to write the progress of each stage to, as JSON, every few "
+            "seconds while the command runs. Progress is also shown on the terminal, "
+            "if there is one."
+        )
+    ),
+]
+
+FullSummaryOption: TypeAlias = Annotated[
+    bool,
+    typer.Option(
+        help=(
+            "Log every extracted project, experiment and dataset, rather than "
+            "statistics and a sample of each."
+        )
+    ),
+]
+
+ManifestDirOption: TypeAlias = Annotated[
+    Optional[Path],
+    typer.Option(
+        help=(
+            "Directory containing a manifest written by the 'extract' command. If given, "
+            "the datafiles are read from it instead of extracting the data source again."
+        ),
+        exists=True,
+        dir_okay=True,
+        file_okay=False,
+    ),
+]
+
 StorageBoxOption: TypeAlias = Annotated[
     Optional[tuple[str, Path]],
     typer.Option(
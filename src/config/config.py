@@ -16,7 +16,7 @@ from pathlib import Path
 from typing import Dict, Optional
 from urllib.parse import urljoin
 
-from pydantic import BaseModel, PrivateAttr
+from pydantic import BaseModel, Field, PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from requests import PreparedRequest
 from requests.auth import AuthBase
@@ -81,6 +81,113 @@ class ProxyConfig(BaseModel):
     https: Optional[MTUrl] = None
 
 
+class FlowControlConfig(BaseModel):
+    """Control of the rate and concurrency of requests to MyTardis.
+
+    The number of requests in flight is adjusted between 'min_concurrency' and
+    'max_concurrency': it grows while requests succeed, and is cut by 'backoff_ratio'
+    when the server shows signs of overload (429, 502, 503 or 504 responses, timeouts,
+    or responses slower than 'latency_target').
+
+    Attributes:
+        adaptive : bool (default: True)
+            adjust the concurrency from the responses observed; if False, the limit is
+            fixed at 'max_concurrency'
+        initial_concurrency : int (default: 4)
+            concurrency limit to start from
+        min_concurrency : int (default: 1)
+            lower bound of the concurrency limit
+        max_concurrency : int (default: 32)
+            upper bound of the concurrency limit
+        backoff_ratio : float (default: 0.5)
+            factor the concurrency limit is multiplied by when overload is detected
+        latency_target : Optional[float] (default: None)
+            response time, in seconds, above which a response counts as overload
+        requests_per_second : Optional[float] (default: None)
+            ceiling on the rate of requests, enforced with a token bucket
+        burst : int (default: 10)
+            number of requests which may exceed 'requests_per_second' in a burst
+    """
+
+    adaptive: bool = True
+    initial_concurrency: int = Field(default=4, ge=1)
+    min_concurrency: int = Field(default=1, ge=1)
+    max_concurrency: int = Field(default=32, ge=1)
+    backoff_ratio: float = Field(default=0.5, gt=0, lt=1)
+    latency_target: Optional[float] = Field(default=None, gt=0)
+    requests_per_second: Optional[float] = Field(default=None, gt=0)
+    burst: int = Field(default=10, ge=1)
+
+
+class ResilienceConfig(BaseModel):
+    """Protection of an ingestion run against MyTardis outages.
+
+    A circuit breaker watches the outcomes of recent requests. When the proportion of
+    them which failed (with a connection error, a timeout or a 5xx response) reaches
+    'failure_rate', it opens: all workers pause, and the health of the server is probed
+    every 'probe_interval' seconds until it recovers. A run-wide retry budget limits the
+    number of retries to 'min_retries' plus 'retry_ratio' times the number of requests
+    made, so that retries cannot take over a run.
+
+    Attributes:
+        circuit_breaker : bool (default: True)
+            pause requests while MyTardis appears to be down
+        failure_rate : float (default: 0.5)
+            proportion of failed requests in the window which opens the circuit
+        window_size : int (default: 20)
+            number of recent requests considered
+        min_requests : int (default: 10)
+            number of requests which must be in the window before the circuit can open
+        probe_interval : float (default: 30.0)
+            seconds between probes of the server while the circuit is open
+        max_outage : Optional[float] (default: 3600.0)
+            seconds after which requests fail, rather than wait, while the circuit is
+            open; None to wait indefinitely
+        retry_ratio : float (default: 0.1)
+            retries allowed per request made, across the whole run
+        min_retries : int (default: 20)
+            retries allowed regardless of the number of requests made
+    """
+
+    circuit_breaker: bool = True
+    failure_rate: float = Field(default=0.5, gt=0, le=1)
+    window_size: int = Field(default=20, ge=1)
+    min_requests: int = Field(default=10, ge=1)
+    probe_interval: float = Field(default=30.0, gt=0)
+    max_outage: Optional[float] = Field(default=3600.0, gt=0)
+    retry_ratio: float = Field(default=0.1, ge=0)
+    min_retries: int = Field(default=20, ge=0)
+
+
+class TransportConfig(BaseModel):
+    """HTTP transport settings for requests to MyTardis.
+
+    Attributes:
+        pool_connections : int (default: 10)
+            number of per-host connection pools to keep
+        pool_maxsize : Optional[int] (default: None)
+            connections kept open per host; None to match the maximum concurrency of
+            requests (FlowControlConfig.max_concurrency), so that the pool does not cap
+            it. Connections beyond the pool size are opened and closed per request.
+        pool_block : bool (default: False)
+            wait for a free pooled connection instead of opening an extra one
+        keep_alive : bool (default: True)
+            reuse connections between requests
+        accept_encoding : str (default: "gzip, deflate")
+            content codings accepted for responses; "identity" to disable compression
+        gzip_min_bytes : Optional[int] (default: None)
+            compress request bodies of at least this size with gzip; None to never
+            compress them. The server (or its proxy) must accept gzip-encoded bodies.
+    """
+
+    pool_connections: int = Field(default=10, ge=1)
+    pool_maxsize: Optional[int] = Field(default=None, ge=1)
+    pool_block: bool = False
+    keep_alive: bool = True
+    accept_encoding: str = "gzip, deflate"
+    gzip_min_bytes: Optional[int] = Field(default=None, ge=0)
+
+
 class ConnectionConfig(BaseModel):
     """MyTardis connection configuration.
 
@@ -92,6 +199,16 @@ class ConnectionConfig(BaseModel):
         verify_certificate : bool (default: True)
             Checks the validity of the host certificate if `True`
         proxy : ProxyConfig (default: None)
+        flow_control : FlowControlConfig
+            limits on the rate and concurrency of requests
+        resilience : ResilienceConfig
+            circuit breaker and retry budget settings
+        transport : TransportConfig
+            connection pooling, keep-alive and compression settings
+        fields_param : str (default: None)
+            Name of the GET query parameter which the MyTardis instance accepts to limit
+            the fields of the objects returned, if it supports one. When set, requests
+            for partial objects send the fields they need in this parameter.
 
     Properties:
         api_template : str
@@ -101,6 +218,10 @@ class ConnectionConfig(BaseModel):
     hostname: MTUrl
     verify_certificate: bool = True
     proxy: Optional[ProxyConfig] = None
+    flow_control: FlowControlConfig = FlowControlConfig()
+    resilience: ResilienceConfig = ResilienceConfig()
+    transport: TransportConfig = TransportConfig()
+    fields_param: Optional[str] = None
     _api_stub: str = PrivateAttr("/api/v1/")
 
     @property
@@ -123,12 +244,53 @@ class SchemaConfig(BaseModel):
             default dataset schema
         datafile : Optional[AnyUrl] (default: None)
             default datafile schema
+        validate_parameters : bool (default: False)
+            fetch the parameter definitions of each schema from MyTardis and check and
+            convert metadata against them before ingestion, rejecting invalid
+            parameters locally instead of having MyTardis reject them
     """
 
     project: Optional[MTUrl] = None
     experiment: Optional[MTUrl] = None
     dataset: Optional[MTUrl] = None
     datafile: Optional[MTUrl] = None
+    validate_parameters: bool = False
+
+
+class SchedulerConfig(BaseModel):
+    """Scheduling of the ingestion of the objects in a manifest.
+
+    Each object is ingested as soon as the objects it refers to (its projects,
+    experiments or dataset) have been, so independent parts of the hierarchy are
+    ingested concurrently rather than one object type at a time.
+
+    An object which fails because MyTardis is unavailable is deferred, along with the
+    objects which depend on it, and retried at the end of the run. Objects which still
+    fail are written to the dead-letter file, which 'upload --retry-failed' replays.
+    The dead-letter file and the result log may be shared by the runs of several
+    manifests: each run only replaces the dead letters of its own source data, and
+    only summarises its own results.
+
+    Attributes:
+        max_workers : int (default: 1)
+            number of objects (or, for datafiles, datasets' worth of datafiles)
+            ingested at once; with 1, the objects are ingested one at a time
+        retry_rounds : int (default: 3)
+            number of times deferred objects are retried at the end of the run
+        retry_delay : float (default: 10.0)
+            seconds to wait before the first retry round, doubled for each round
+        dead_letter_file : Path (default: ingestion_failed.jsonl)
+            file the objects which failed are written to, one JSON object per line
+        result_log_file : Path (default: ingestion_result.jsonl)
+            file the result for each object is appended to as the ingestion runs,
+            marked with the ID of the run
+    """
+
+    max_workers: int = Field(default=1, ge=1)
+    retry_rounds: int = Field(default=3, ge=0)
+    retry_delay: float = Field(default=10.0, ge=0)
+    dead_letter_file: Path = Path("ingestion_failed.jsonl")
+    result_log_file: Path = Path("ingestion_result.jsonl")
 
 
 class StorageBoxConfig(BaseModel, ABC):
@@ -177,6 +339,8 @@ class ConfigFromEnv(BaseSettings):
             instance of Pydantic storage model
         default_schema : SchemaConfig
             instance of Pydantic schema model
+        scheduler : SchedulerConfig
+            instance of Pydantic scheduler model
 
     ## Usage
     Requires a .env file in the current working direction:
@@ -208,6 +372,7 @@ class ConfigFromEnv(BaseSettings):
     auth: AuthConfig
     connection: ConnectionConfig
     default_schema: SchemaConfig
+    scheduler: SchedulerConfig = SchedulerConfig()
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", env_nested_delimiter="__"
     )
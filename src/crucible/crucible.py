@@ -156,8 +156,29 @@ class Crucible:
         """Refine a datafile by finding URIs from MyTardis for the
         relevant fields of interest."""
 
+        dataset_uri = self.resolve_dataset(refined_datafile.dataset)
+        if dataset_uri is None:
+            return None
+
+        return Datafile(
+            filename=refined_datafile.filename,
+            directory=refined_datafile.directory,
+            md5sum=refined_datafile.md5sum,
+            mimetype=refined_datafile.mimetype,
+            size=refined_datafile.size,
+            users=refined_datafile.users,
+            groups=refined_datafile.groups,
+            dataset=dataset_uri,
+            parameter_sets=refined_datafile.parameter_sets,
+            replicas=[],
+        )
+
+    def resolve_dataset(self, identifier: str) -> URI | None:
+        """Get the URI of the dataset of a datafile, from the dataset's identifier,
+        if it identifies a single dataset in MyTardis"""
+
         dataset_uris = self.overseer.get_uris_by_identifier(
-            MyTardisObject.DATASET, refined_datafile.dataset
+            MyTardisObject.DATASET, identifier
         )
         if len(dataset_uris) == 0:
             logger.warning(
@@ -174,17 +195,4 @@ class Crucible:
             )
             return None
 
-        dataset_uri = dataset_uris[0]
-
-        return Datafile(
-            filename=refined_datafile.filename,
-            directory=refined_datafile.directory,
-            md5sum=refined_datafile.md5sum,
-            mimetype=refined_datafile.mimetype,
-            size=refined_datafile.size,
-            users=refined_datafile.users,
-            groups=refined_datafile.groups,
-            dataset=dataset_uri,
-            parameter_sets=refined_datafile.parameter_sets,
-            replicas=[],
-        )
+        return dataset_uris[0]
@@ -9,6 +9,8 @@ from __future__ import annotations
 import io
 import json
 import logging
+import statistics
+from collections import Counter
 from pathlib import Path
 from typing import List, Optional, Sequence, Type, TypeVar
 
@@ -18,15 +20,20 @@ from src.blueprints.datafile import RawDatafile
 from src.blueprints.dataset import RawDataset
 from src.blueprints.experiment import RawExperiment
 from src.blueprints.project import RawProject
+from src.extraction.packing import datafile_root
 from src.utils.filesystem.filesystem_nodes import DirectoryNode
 
 # ---Constants
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 ModelT = TypeVar("ModelT", bound=BaseModel)
 
+# The number of objects of each type written out in a summary of a manifest
+SUMMARY_SAMPLE_SIZE = 5
+# The number of mimetypes counted separately in a summary of a manifest
+SUMMARY_MIMETYPES = 10
+
 
 # ---Code
 class IngestionManifest:
@@ -37,6 +44,8 @@ class IngestionManifest:
 
     Attributes:
         data_root (Path): The root directory of the data files.
+        staging_root (Optional[Path]): The directory of the files written during
+            extraction, such as packed archives, if any.
         projects (List[RawProject]): List of projects.
         experiments (List[RawExperiment]): List of experiments.
         datasets (List[RawDataset]): List of datasets.
@@ -50,8 +59,10 @@ class IngestionManifest:
         experiments: Optional[list[RawExperiment]] = None,
         datasets: Optional[list[RawDataset]] = None,
         datafiles: Optional[list[RawDatafile]] = None,
+        staging_root: Optional[Path] = None,
     ) -> None:
         self._source_data_root = source_data_root
+        self._staging_root = staging_root
         self._projects = projects or []
         self._experiments = experiments or []
         self._datasets = datasets or []
@@ -61,6 +72,16 @@ class IngestionManifest:
         """Return the root directory for the datafiles."""
         return self._source_data_root
 
+    def get_staging_root(self) -> Optional[Path]:
+        """Return the directory of the files written during extraction, if any."""
+        return self._staging_root
+
+    def get_datafile_path(self, datafile: RawDatafile) -> Path:
+        """Return the path of a datafile: in the staging directory if it was written
+        during extraction, otherwise in the source data."""
+        root = datafile_root(datafile, self._source_data_root, self._staging_root)
+        return root / datafile.filepath
+
     def get_projects(  # pylint: disable=missing-function-docstring
         self,
     ) -> List[RawProject]:
@@ -135,6 +156,8 @@ class IngestionManifest:
         source_info = {
             "source_data_root": self.get_data_root().as_posix(),
         }
+        if self._staging_root is not None:
+            source_info["staging_root"] = self._staging_root.as_posix()
 
         with (root_dir / "source.json").open("w", encoding="utf-8") as f:
             json_data = json.dumps(source_info, indent=4)
@@ -157,6 +180,23 @@ class IngestionManifest:
         serialize_objects(self.get_datasets(), "datasets")
         serialize_objects(self.get_datafiles(), "datafiles")
 
+    @staticmethod
+    def read_data_root(root_dir: Path) -> Path:
+        """Read the root directory of the data files of a serialized manifest, without
+        reading its objects."""
+        with (root_dir / "source.json").open("r", encoding="utf-8") as f:
+            source_info = json.load(f)
+        return Path(source_info["source_data_root"])
+
+    @staticmethod
+    def read_staging_root(root_dir: Path) -> Optional[Path]:
+        """Read the staging directory of a serialized manifest, if it has one, without
+        reading its objects."""
+        with (root_dir / "source.json").open("r", encoding="utf-8") as f:
+            source_info = json.load(f)
+        staging_root = source_info.get("staging_root")
+        return Path(staging_root) if staging_root is not None else None
+
     @staticmethod
     def deserialize(root_dir: Path) -> IngestionManifest:
         try:
@@ -165,10 +205,7 @@ class IngestionManifest:
             e.strerror = f"Failed to deserialize ingestion manifest: {e.strerror}"
             raise e
 
-        source_info_file = directory.file("source.json")
-        with source_info_file.path().open("r", encoding="utf-8") as f:
-            source_info = json.load(f)
-            source_data_root = Path(source_info["source_data_root"])
+        source_data_root = IngestionManifest.read_data_root(root_dir)
 
         def deserialize_objects(
             obj_dir: DirectoryNode, object_type: Type[ModelT]
@@ -196,9 +233,57 @@ class IngestionManifest:
             experiments=experiments,
             datasets=datasets,
             datafiles=datafiles,
+            staging_root=IngestionManifest.read_staging_root(root_dir),
         )
 
-    def summarize(self, skip_datafiles: bool = True) -> str:
+    def _write_statistics(self, stream: io.StringIO) -> None:
+        """Write statistics about the objects in the manifest to 'stream', computed in a
+        single pass over the datafiles"""
+        total_size = 0
+        datafiles_per_dataset: Counter[str] = Counter()
+        mimetypes: Counter[str] = Counter()
+        for datafile in self.get_datafiles():
+            total_size += datafile.size
+            datafiles_per_dataset[datafile.dataset] += 1
+            mimetypes[datafile.mimetype] += 1
+
+        stream.write(f"Projects: {len(self.get_projects())}\n")
+        stream.write(f"Experiments: {len(self.get_experiments())}\n")
+        stream.write(f"Datasets: {len(self.get_datasets())}\n")
+        stream.write(f"Datafiles: {len(self.get_datafiles())}\n")
+        stream.write(f"Total size of datafiles: {total_size} bytes\n")
+
+        if datafiles_per_dataset:
+            counts = list(datafiles_per_dataset.values())
+            stream.write(
+                f"Datafiles per dataset, for {len(counts)} datasets: "
+                f"min {min(counts)}, median {statistics.median(counts):g}, "
+                f"mean {statistics.mean(counts):.1f}, max {max(counts)}\n"
+            )
+
+            stream.write("Datafiles by mimetype:\n")
+            common_mimetypes = mimetypes.most_common(SUMMARY_MIMETYPES)
+            for mimetype, count in common_mimetypes:
+                stream.write(f"    {mimetype}: {count}\n")
+            num_other = mimetypes.total() - sum(count for _, count in common_mimetypes)
+            if num_other:
+                stream.write(
+                    f"    {len(mimetypes) - len(common_mimetypes)} other mimetypes: "
+                    f"{num_other}\n"
+                )
+
+    def summarize(
+        self,
+        skip_datafiles: bool = True,
+        full: bool = False,
+        sample_size: int = SUMMARY_SAMPLE_SIZE,
+    ) -> str:
+        """Summarize the manifest, for logging.
+
+        The summary holds statistics about the objects, and the first 'sample_size'
+        projects, experiments and datasets. With 'full', every project, experiment and
+        dataset is written out instead, as are the datafiles unless 'skip_datafiles'.
+        """
         stream = io.StringIO()
 
         def write_header(text: str) -> None:
@@ -211,21 +296,27 @@ class IngestionManifest:
                 stream.write(model.model_dump_json(indent=4))
                 stream.write("\n")
 
+        def write_objects(name: str, models: Sequence[BaseModel]) -> None:
+            if full or len(models) <= sample_size:
+                write_header(name)
+                write_dataclasses(models)
+            else:
+                write_header(f"{name} (first {sample_size} of {len(models)})")
+                write_dataclasses(models[:sample_size])
+
         write_header("Source Data Info")
         stream.write(f"Data Root: {self.get_data_root().as_posix()}\n")
+        if self._staging_root is not None:
+            stream.write(f"Staging Root: {self._staging_root.as_posix()}\n")
 
-        write_header("Projects")
-        write_dataclasses(self.get_projects())
-
-        write_header("Experiments")
-        write_dataclasses(self.get_experiments())
+        write_header("Statistics")
+        self._write_statistics(stream)
 
-        write_header("Datasets")
-        write_dataclasses(self.get_datasets())
+        write_objects("Projects", self.get_projects())
+        write_objects("Experiments", self.get_experiments())
+        write_objects("Datasets", self.get_datasets())
 
-        if skip_datafiles:
-            stream.write(f"Number of datafiles: {len(self.get_datafiles())}")
-        else:
+        if full and not skip_datafiles:
             write_header("Datafiles")
             write_dataclasses(self.get_datafiles())
 
@@ -3,6 +3,7 @@
 
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Optional
 
 from src.extraction.manifest import IngestionManifest
 
@@ -10,8 +11,15 @@ from src.extraction.manifest import IngestionManifest
 class IMetadataExtractor(ABC):
     """Abstract Base Class defining an interface for extracting metadata from a directory
     and parsing it into an ingestible format.
+
+    Attributes:
+        staging_dir: The directory to write any files produced during extraction to,
+            such as packed archives, as the source data must not be written to.
+            Extractors which produce no files ignore it.
     """
 
+    staging_dir: Optional[Path] = None
+
     @abstractmethod
     def extract(self, root_dir: Path) -> IngestionManifest:
         """Extract the data from root_dir and parse into an ingestible format."""
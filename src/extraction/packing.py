@@ -0,0 +1,270 @@
+"""
+Helpers for packing directories of many small files into a single archive datafile.
+
+Chunk-heavy outputs (e.g. Zarr stores) can contain hundreds of thousands of tiny
+files. Ingesting each one as its own datafile means a MyTardis record, a POST and an
+rsync entry per chunk, so the per-file overhead dwarfs the data. Packing bundles the
+small files under a directory into one uncompressed tar archive, which is written and
+hashed in a single pass, and records the archive's member index as datafile metadata.
+
+The source data is treated as read-only, so the archive is written to a staging
+directory, at the path the packed directory has in the source data (e.g.
+"data/image.zarr" -> "<staging>/data/image.zarr.tar"). The manifest records the staging
+directory, and archive datafiles are transferred from it rather than from the source
+data root. Once an archive is verified, 'clean' deletes it and the files packed in it.
+"""
+
+import hashlib
+import json
+import logging
+import tarfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from src.blueprints.datafile import RawDatafile
+from src.mytardis_client.common_types import MTUrl
+from src.utils.filesystem import filters
+from src.utils.filesystem.filesystem_nodes import DirectoryNode, FileNode
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = ".tar"
+ARCHIVE_MIMETYPE = "application/x-tar"
+
+
+@dataclass
+class PackingOptions:
+    """
+    Options controlling how a directory of small files is packed into an archive.
+
+    Attributes:
+        max_member_size: files strictly smaller than this (in bytes) are packed into the
+            archive; larger files are left to be ingested as individual datafiles.
+        min_member_count: directories with fewer small files than this are not packed,
+            as there is nothing to be gained.
+        schema: the schema of the archive datafiles' metadata, which must define the
+            "archive-*" parameters. If None, the default datafile schema is used, and
+            must define them instead.
+    """
+
+    max_member_size: int = 1024 * 1024
+    min_member_count: int = 2
+    schema: Optional[MTUrl] = None
+
+
+@dataclass
+class ArchiveMember:
+    """An entry in the member index of a packed archive"""
+
+    name: str
+    size: int
+    offset: int
+
+
+class _HashingWriter:
+    """Minimal file-like wrapper which hashes and counts bytes as they are written."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self._stream = stream
+        self._md5 = hashlib.md5()
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        """Write the data to the underlying stream, updating the hash and position"""
+        self._stream.write(data)
+        self._md5.update(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        """Number of bytes written so far"""
+        return self._position
+
+    def flush(self) -> None:
+        """Flush the underlying stream"""
+        self._stream.flush()
+
+    def hexdigest(self) -> str:
+        """MD5 digest of everything written so far"""
+        return self._md5.hexdigest()
+
+
+def _make_tarinfo(file: FileNode, arcname: str) -> tarfile.TarInfo:
+    """Create a normalised tar header for a file, so that re-packing unchanged
+    data produces a byte-identical archive (and therefore the same checksum)."""
+    info = tarfile.TarInfo(name=arcname)
+    stat = file.stat()
+    info.size = stat.st_size
+    info.mtime = int(stat.st_mtime)
+    info.mode = 0o644
+    info.uid = info.gid = 0
+    info.uname = info.gname = ""
+    return info
+
+
+def write_archive(
+    members: list[FileNode], base_dir: Path, archive_path: Path
+) -> tuple[str, list[ArchiveMember]]:
+    """Stream the files in `members` into an uncompressed tar archive at `archive_path`.
+
+    Member names are stored relative to `base_dir`, in the order of `members`. The
+    archive is hashed as it is written, so no second pass over the data is needed.
+
+    Returns:
+        The MD5 checksum of the archive and its member index.
+    """
+    index: list[ArchiveMember] = []
+
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with archive_path.open("wb") as stream:
+        writer = _HashingWriter(stream)
+        with tarfile.TarFile(
+            fileobj=writer, mode="w", format=tarfile.PAX_FORMAT  # type: ignore[arg-type]
+        ) as archive:
+            for file in members:
+                arcname = file.path().relative_to(base_dir).as_posix()
+                info = _make_tarinfo(file, arcname)
+                with file.path().open("rb") as member_stream:
+                    archive.addfile(info, member_stream)
+
+                padded_size = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                index.append(
+                    ArchiveMember(
+                        name=arcname,
+                        size=info.size,
+                        offset=archive.offset - padded_size,
+                    )
+                )
+
+        return writer.hexdigest(), index
+
+
+def archive_path_for(
+    directory: DirectoryNode, root_dir: Path, staging_dir: Path
+) -> Path:
+    """The path of the archive that packs `directory`: its path relative to the source
+    data root `root_dir`, within `staging_dir`"""
+    relative_path = directory.path().relative_to(root_dir)
+    return (staging_dir / relative_path).with_name(directory.name() + ARCHIVE_SUFFIX)
+
+
+def pack_directory(
+    directory: DirectoryNode,
+    root_dir: Path,
+    dataset_identifier: str,
+    *,
+    staging_dir: Path,
+    file_filter: filters.PathFilterSet,
+    options: PackingOptions,
+    collate_file: Callable[[FileNode], RawDatafile],
+) -> list[RawDatafile]:
+    """Produce the datafiles for `directory`, packing its small files into one archive.
+
+    Files smaller than `options.max_member_size` are written, in order of their paths,
+    to a tar archive in `staging_dir` (see `archive_path_for`), which becomes a single
+    datafile whose metadata holds the member index. Larger files are returned as
+    individual datafiles. If there are too few small files to be worth packing, every
+    file is returned individually and no archive is written.
+
+    Args:
+        directory: the directory whose files are to be packed
+        root_dir: the source data root; datafile directories are relative to this
+        dataset_identifier: identifier of the dataset the datafiles belong to
+        staging_dir: the directory the archive is written to, outside the source data
+        file_filter: filter for files which should be ignored
+        options: the packing thresholds
+        collate_file: produces the datafile for a file which is not packed
+
+    Returns:
+        The datafiles for the directory - the archive (if any) followed by the
+        unpacked files.
+    """
+    small_files: list[FileNode] = []
+    large_files: list[FileNode] = []
+
+    # Sorted, so that the same data always gives the same archive and member index
+    for file in sorted(
+        directory.iter_files(recursive=True),
+        key=lambda file: file.path().relative_to(directory.path()).as_posix(),
+    ):
+        if file_filter.exclude(file.path()):
+            continue
+        if file.stat().st_size < options.max_member_size:
+            small_files.append(file)
+        else:
+            large_files.append(file)
+
+    if len(small_files) < options.min_member_count:
+        return [collate_file(file) for file in small_files + large_files]
+
+    archive_path = archive_path_for(directory, root_dir, staging_dir)
+    logger.info("Packing %d files into %s", len(small_files), archive_path)
+
+    md5sum, index = write_archive(small_files, directory.path(), archive_path)
+
+    archive_metadata: dict[str, str | int | float | bool] = {
+        "archive-format": "tar",
+        "archive-source-directory": directory.name(),
+        "archive-member-count": len(index),
+        "archive-members": json.dumps(
+            [[member.name, member.size, member.offset] for member in index],
+            separators=(",", ":"),
+        ),
+    }
+
+    archive_datafile = RawDatafile(
+        filename=archive_path.name,
+        directory=archive_path.relative_to(staging_dir).parent,
+        md5sum=md5sum,
+        mimetype=ARCHIVE_MIMETYPE,
+        size=archive_path.stat().st_size,
+        users=None,
+        groups=None,
+        dataset=dataset_identifier,
+        metadata=archive_metadata,
+        schema=options.schema,
+    )
+
+    return [archive_datafile] + [collate_file(file) for file in large_files]
+
+
+def is_packed_archive(datafile: RawDatafile) -> bool:
+    """Whether `datafile` is an archive produced by `pack_directory`"""
+    return datafile.metadata is not None and "archive-members" in datafile.metadata
+
+
+def datafile_root(
+    datafile: RawDatafile, root_dir: Path, staging_dir: Optional[Path]
+) -> Path:
+    """The directory the path of `datafile` is relative to: `staging_dir` for a packed
+    archive, otherwise the source data root `root_dir`"""
+    if staging_dir is not None and is_packed_archive(datafile):
+        return staging_dir
+    return root_dir
+
+
+def read_member_index(datafile: RawDatafile) -> list[ArchiveMember]:
+    """Recover the member index recorded on a packed archive datafile"""
+    if not datafile.metadata or "archive-members" not in datafile.metadata:
+        raise ValueError(f"Datafile {datafile.filename} is not a packed archive")
+
+    entries = json.loads(str(datafile.metadata["archive-members"]))
+    return [
+        ArchiveMember(name=name, size=size, offset=offset)
+        for name, size, offset in entries
+    ]
+
+
+def member_paths(datafile: RawDatafile, root_dir: Path) -> list[Path]:
+    """The paths, in the source data at `root_dir`, of the files packed into the
+    archive `datafile`"""
+    if not datafile.metadata or not is_packed_archive(datafile):
+        raise ValueError(f"Datafile {datafile.filename} is not a packed archive")
+
+    source_dir = (
+        root_dir
+        / (datafile.directory or Path(""))
+        / str(datafile.metadata["archive-source-directory"])
+    )
+    return [source_dir / member.name for member in read_member_index(datafile)]
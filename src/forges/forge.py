@@ -1,4 +1,3 @@
-# pylint: disable=logging-fstring-interpolation
 """Defines Forge class which is a class that creates MyTardis objects."""
 
 import logging
@@ -101,18 +100,15 @@ class Forge:
             uri = URI(response_dict["resource_uri"])
         except KeyError:
             logger.warning(
-                (
-                    "No URI found for newly created object in forge_object call\n"
-                    f"response dictionary: {response_dict}"
-                )
+                "No URI found for newly created object in forge_object call\n"
+                "response dictionary: %s",
+                response_dict,
             )
             return None
         except ValidationError:
             logger.warning(
-                (
-                    "Unable to parse the resource_uri into a URI.\n"
-                    f"response dictionary: {response_dict}"
-                )
+                "Unable to parse the resource_uri into a URI.\nresponse dictionary: %s",
+                response_dict,
             )
             return None
         return uri
@@ -190,11 +186,9 @@ class Forge:
                     raise ForgeError(message)
 
                 logger.info(
-                    (
-                        f"Object: {refined_object.display_name} successfully "
-                        "created in MyTardis\n"
-                        f"Endpoint: {endpoint}"
-                    )
+                    "Object: %s successfully created in MyTardis\nEndpoint: %s",
+                    refined_object.display_name,
+                    endpoint,
                 )
                 return uri
 
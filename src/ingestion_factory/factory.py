@@ -1,11 +1,11 @@
 """A collection of classes for ingesting raw metadata into MyTardis."""
 
-import json
 import logging
+import threading
+import time
+from functools import partial
 from pathlib import Path
-from typing import Optional
-
-from pydantic import BaseModel
+from typing import Any, Callable, Optional, Sequence
 
 from src.blueprints.datafile import Datafile, RawDatafile
 from src.blueprints.dataset import RawDataset
@@ -15,24 +15,35 @@ from src.config.config import ConfigFromEnv
 from src.conveyor.conveyor import Conveyor, FailedTransferException
 from src.crucible.crucible import Crucible
 from src.extraction.manifest import IngestionManifest
+from src.extraction.packing import datafile_root
 from src.forges.forge import Forge
-from src.mytardis_client.endpoints import URI
+from src.ingestion_factory.failures import (
+    DeadLetterLog,
+    RawObject,
+    describe_error,
+    is_transient,
+)
+from src.ingestion_factory.refinery import DatafileRefinery
+from src.ingestion_factory.results import (
+    OBJECT_TYPES,
+    IngestionResult,
+    ResultLog,
+    summarise_result_log,
+    write_result_summary,
+)
 from src.mytardis_client.mt_rest import MyTardisRESTFactory
 from src.mytardis_client.objects import MyTardisObject
 from src.overseers.overseer import Overseer
 from src.smelters.smelter import Smelter
+from src.utils.concurrency import TaskGraph
+from src.utils.progress import add_total, advance
+from src.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
-
-class IngestionResult(BaseModel):
-    """Container for recording the results of an ingestion of a set of objects
-    into MyTardis
-    """
-
-    success: list[tuple[str, Optional[URI]]] = []
-    skipped: list[tuple[str, Optional[URI]]] = []
-    error: list[str] = []
+# Identifies a task of the ingestion: the object type, and the index of the object in
+# the manifest, or for datafiles, the identifier of their dataset
+TaskKey = tuple[str, int | str]
 
 
 class IngestionFactory:
@@ -42,12 +53,16 @@ class IngestionFactory:
     first refining the raw metadata (mainly resolving references to existing
     MyTardis objects), and then submitting it to MyTardis.
 
+    An exception raised while ingesting an object fails that object only. If it was
+    caused by MyTardis being unavailable, the object is retried at the end of the run.
+
     Attributes:
         config: configuration for the IngestionFactory
         mt_rest: client for interacting with MyTardis REST API
         overseer: An instance of the Overseer class
         smelter: used to refine the metadata for ingestion
         crucible: used to prepare the metadata for ingestion
+        refinery: used to smelt and prepare datafiles in a single stage
         forge: used to upload the metadata to MyTardis
         conveyor: used to transfer datafiles to MyTardis storage
     """
@@ -78,261 +93,718 @@ class IngestionFactory:
         self.crucible = crucible or Crucible(
             overseer=self._overseer,
         )
+        self.refinery = DatafileRefinery(self.crucible, self.smelter)
         self.conveyor = conveyor or Conveyor(store=config.storage)
+        # The log the results are written to, while an ingestion is running
+        self._result_log: Optional[ResultLog] = None
 
-    def ingest_projects(
-        self,
-        projects: list[RawProject],
-    ) -> IngestionResult:
-        """Ingest a set of projects into MyTardis."""
+    def _new_result(self, object_type: str) -> IngestionResult:
+        """An empty result for objects of 'object_type', written to the result log"""
+        return IngestionResult.logged_to(self._result_log, object_type)
 
-        result = IngestionResult()
+    def _record_failure(
+        self, raw_object: RawObject, result: IngestionResult, error: Exception
+    ) -> None:
+        """Record an exception raised while ingesting 'raw_object', deferring the
+        object if the failure was transient"""
+        reason = describe_error(error)
+        if is_transient(error):
+            logger.warning(
+                'Deferring "%s" until the end of the run after a transient error: %s',
+                raw_object.display_name,
+                reason,
+            )
+            result.defer(raw_object, reason)
+        else:
+            logger.error(
+                'Failed to ingest "%s": %s',
+                raw_object.display_name,
+                reason,
+                exc_info=error,
+            )
+            result.fail(raw_object, reason)
 
-        for raw_project in projects:
+    def _record_group_failure(
+        self,
+        raw_objects: Sequence[RawObject],
+        result: IngestionResult,
+        error: Exception,
+    ) -> None:
+        """Record an exception which failed all of 'raw_objects' at once, such as the
+        datafiles of a dataset. It is logged once for the group, not once per object."""
+        if not raw_objects:
+            return
+        reason = describe_error(error)
+        if is_transient(error):
+            logger.warning(
+                'Deferring %d objects, including "%s", until the end of the run after '
+                "a transient error: %s",
+                len(raw_objects),
+                raw_objects[0].display_name,
+                reason,
+            )
+            for raw_object in raw_objects:
+                result.defer(raw_object, reason)
+        else:
+            logger.error(
+                'Failed to ingest %d objects, including "%s": %s',
+                len(raw_objects),
+                raw_objects[0].display_name,
+                reason,
+                exc_info=error,
+            )
+            for raw_object in raw_objects:
+                result.fail(raw_object, reason)
+
+    def _ingest_isolated(
+        self,
+        raw_object: RawObject,
+        result: IngestionResult,
+        ingest_object: Callable[[], None],
+    ) -> bool:
+        """Run 'ingest_object', recording an exception it raises as a failure of
+        'raw_object' rather than letting it end the run.
+
+        Returns whether it completed without an exception.
+        """
+        try:
+            ingest_object()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._record_failure(raw_object, result, error)
+            return False
+        return True
+
+    def _ingest_project(self, raw_project: RawProject, result: IngestionResult) -> None:
+        with span("smelt"):
             smelted_project = self.smelter.smelt_project(raw_project)
-            if not smelted_project:
-                result.error.append(raw_project.display_name)
-                continue
+        if not smelted_project:
+            result.fail(raw_project, "Unable to refine the project's metadata")
+            return
 
-            refined_project, refined_parameters = smelted_project
+        refined_project, refined_parameters = smelted_project
 
+        with span("crucible"):
             project = self.crucible.prepare_project(refined_project)
-            if not project:
-                result.error.append(refined_project.display_name)
-                continue
+        if not project:
+            result.fail(raw_project, "Unable to find the project's institutions")
+            return
+        advance("refine")
 
+        with span("overseer_lookup"):
             matching_projects = self._overseer.get_matching_objects(
                 MyTardisObject.PROJECT, project.model_dump()
             )
-            if len(matching_projects) > 0:
-                project_uri = matching_projects[0].resource_uri
-                # Would we ever get multiple matches? If so, what should we do?
-                logging.info(
-                    'Already ingested project "%s" as "%s". Skipping project ingestion.',
-                    project.name,
-                    project_uri,
-                )
-                result.skipped.append((project.display_name, project_uri))
-                continue
+        if len(matching_projects) > 0:
+            project_uri = matching_projects[0].resource_uri
+            # Would we ever get multiple matches? If so, what should we do?
+            logger.info(
+                'Already ingested project "%s" as "%s". Skipping project ingestion.',
+                project.name,
+                project_uri,
+            )
+            result.add_skipped(project.display_name, project_uri)
+            return
 
+        with span("forge"):
             project_uri = self.forge.forge_project(project, refined_parameters)
-            result.success.append((project.display_name, project_uri))
+        result.add_success(project.display_name, project_uri)
 
-        return result
-
-    def ingest_experiments(
+    def ingest_projects(
         self,
-        experiments: list[RawExperiment],
+        projects: list[RawProject],
     ) -> IngestionResult:
-        """Ingest a set of experiments into MyTardis."""
+        """Ingest a set of projects into MyTardis."""
 
-        result = IngestionResult()
+        result = self._new_result("project")
 
-        for raw_experiment in experiments:
+        for raw_project in projects:
+            self._ingest_isolated(
+                raw_project, result, partial(self._ingest_project, raw_project, result)
+            )
+
+        return result
+
+    def _ingest_experiment(
+        self, raw_experiment: RawExperiment, result: IngestionResult
+    ) -> None:
+        with span("smelt"):
             smelted_experiment = self.smelter.smelt_experiment(raw_experiment)
-            if not smelted_experiment:
-                result.error.append(raw_experiment.display_name)
-                continue
+        if not smelted_experiment:
+            result.fail(raw_experiment, "Unable to refine the experiment's metadata")
+            return
 
-            refined_experiment, refined_parameters = smelted_experiment
+        refined_experiment, refined_parameters = smelted_experiment
 
+        with span("crucible"):
             experiment = self.crucible.prepare_experiment(refined_experiment)
-            if not experiment:
-                result.error.append(refined_experiment.display_name)
-                continue
+        if not experiment:
+            result.fail(raw_experiment, "Unable to find the experiment's projects")
+            return
+        advance("refine")
 
+        with span("overseer_lookup"):
             matching_experiments = self._overseer.get_matching_objects(
                 MyTardisObject.EXPERIMENT, experiment.model_dump()
             )
-            if len(matching_experiments) > 0:
-                experiment_uri = matching_experiments[0].resource_uri
-                logging.info(
-                    'Already ingested experiment "%s" as "%s". Skipping experiment ingestion.',
-                    experiment.title,
-                    experiment_uri,
-                )
-                result.skipped.append((experiment.display_name, experiment_uri))
-                continue
+        if len(matching_experiments) > 0:
+            experiment_uri = matching_experiments[0].resource_uri
+            logger.info(
+                'Already ingested experiment "%s" as "%s". Skipping experiment ingestion.',
+                experiment.title,
+                experiment_uri,
+            )
+            result.add_skipped(experiment.display_name, experiment_uri)
+            return
 
+        with span("forge"):
             experiment_uri = self.forge.forge_experiment(experiment, refined_parameters)
 
-            result.success.append((experiment.display_name, experiment_uri))
+        result.add_success(experiment.display_name, experiment_uri)
 
-        return result
-
-    def ingest_datasets(
+    def ingest_experiments(
         self,
-        datasets: list[RawDataset],
+        experiments: list[RawExperiment],
     ) -> IngestionResult:
-        """Ingest a set of datasets into MyTardis."""
+        """Ingest a set of experiments into MyTardis."""
 
-        result = IngestionResult()
+        result = self._new_result("experiment")
 
-        for raw_dataset in datasets:
+        for raw_experiment in experiments:
+            self._ingest_isolated(
+                raw_experiment,
+                result,
+                partial(self._ingest_experiment, raw_experiment, result),
+            )
+
+        return result
+
+    def _ingest_dataset(self, raw_dataset: RawDataset, result: IngestionResult) -> None:
+        with span("smelt"):
             smelted_dataset = self.smelter.smelt_dataset(raw_dataset)
-            if not smelted_dataset:
-                result.error.append(raw_dataset.display_name)
-                continue
+        if not smelted_dataset:
+            result.fail(raw_dataset, "Unable to refine the dataset's metadata")
+            return
 
-            refined_dataset, refined_parameters = smelted_dataset
+        refined_dataset, refined_parameters = smelted_dataset
+        with span("crucible"):
             dataset = self.crucible.prepare_dataset(refined_dataset)
-            if not dataset:
-                result.error.append(refined_dataset.display_name)
-                continue
+        if not dataset:
+            result.fail(
+                raw_dataset, "Unable to find the dataset's experiments or instrument"
+            )
+            return
+        advance("refine")
 
+        with span("overseer_lookup"):
             matching_datasets = self._overseer.get_matching_objects(
                 MyTardisObject.DATASET, dataset.model_dump()
             )
-            if len(matching_datasets) > 0:
-                dataset_uri = matching_datasets[0].resource_uri
-                logging.info(
-                    'Already ingested dataset "%s" as "%s". Skipping dataset ingestion.',
-                    dataset.description,
-                    dataset_uri,
-                )
-                result.skipped.append((dataset.display_name, dataset_uri))
-                continue
+        if len(matching_datasets) > 0:
+            dataset_uri = matching_datasets[0].resource_uri
+            logger.info(
+                'Already ingested dataset "%s" as "%s". Skipping dataset ingestion.',
+                dataset.description,
+                dataset_uri,
+            )
+            result.add_skipped(dataset.display_name, dataset_uri)
+            return
 
+        with span("forge"):
             dataset_uri = self.forge.forge_dataset(dataset, refined_parameters)
-            result.success.append((dataset.display_name, dataset_uri))
+        result.add_success(dataset.display_name, dataset_uri)
 
-        return result
-
-    def ingest_datafiles(
+    def ingest_datasets(
         self,
-        source_data_root: Path,
-        raw_datafiles: list[RawDatafile],
+        datasets: list[RawDataset],
     ) -> IngestionResult:
-        """Ingest a set of datafiles into MyTardis."""
-        result = IngestionResult()
-        datafiles_to_transfer: list[Datafile] = []
+        """Ingest a set of datasets into MyTardis."""
 
-        datafiles_prefetched: dict[URI, bool] = {}
+        result = self._new_result("dataset")
 
-        for raw_datafile in raw_datafiles:
-            refined_datafile = self.smelter.smelt_datafile(raw_datafile)
-            if not refined_datafile:
-                result.error.append(raw_datafile.display_name)
-                continue
-
-            datafile = self.crucible.prepare_datafile(refined_datafile)
-            if not datafile:
-                result.error.append(refined_datafile.display_name)
-                continue
-
-            if not datafiles_prefetched.get(datafile.dataset):
-                num_objects = self._overseer.prefetch(
-                    "/dataset_file", query_params={"dataset": datafile.dataset}
-                )
-                datafiles_prefetched[datafile.dataset] = True
-                logging.info(
-                    "Prefetched %d datafiles for dataset %s",
-                    num_objects,
-                    datafile.dataset,
+        for raw_dataset in datasets:
+            self._ingest_isolated(
+                raw_dataset, result, partial(self._ingest_dataset, raw_dataset, result)
+            )
+
+        return result
+
+    def _forge_datafile(self, datafile: Datafile) -> None:
+        with span("forge"):
+            self.forge.forge_datafile(datafile)
+
+    def _ingest_dataset_datafiles(
+        self, raw_datafiles: list[RawDatafile], result: IngestionResult
+    ) -> tuple[list[tuple[RawDatafile, Datafile]], list[tuple[RawDatafile, Datafile]]]:
+        """Ingest the datafiles of one dataset, finding those already ingested with a
+        single set difference.
+
+        Returns the datafiles to transfer, with their raw datafiles: those already
+        ingested, and those forged. Their results are left to be recorded once the
+        transfer is done.
+        """
+        # Not recorded until the datafiles are known not to fail as a group below
+        refine_failures: list[tuple[RawDatafile, str]] = []
+        new_datafiles: list[Datafile] = []
+        ingested_datafiles: list[Datafile] = []
+        try:
+            refined = list(
+                self.refinery.refine(
+                    raw_datafiles,
+                    lambda raw_datafile, reason: refine_failures.append(
+                        (raw_datafile, reason)
+                    ),
                 )
+            )
+            if refined:
+                with span("overseer_lookup"):
+                    new_datafiles, ingested_datafiles = (
+                        self._overseer.split_ingested_datafiles(
+                            refined[0][1].dataset,
+                            [datafile for _, datafile in refined],
+                        )
+                    )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._record_group_failure(raw_datafiles, result, error)
+            return [], []
+
+        for raw_datafile, reason in refine_failures:
+            result.fail(raw_datafile, reason)
+        if not refined:
+            return [], []
+
+        logger.info(
+            "%d of %d datafiles already ingested for dataset %s",
+            len(ingested_datafiles),
+            len(refined),
+            refined[0][1].dataset,
+        )
 
+        for _, datafile in refined:
             # Add a replica to represent the copy transferred by the Conveyor.
             datafile.replicas.append(self.conveyor.create_replica(datafile))
 
-            matching_datafiles = self._overseer.get_matching_objects(
-                MyTardisObject.DATAFILE,
-                datafile.model_dump(),
+        for datafile in ingested_datafiles:
+            logger.debug(
+                'Already ingested datafile "%s". Skipping datafile ingestion.',
+                datafile.filepath,
             )
-            if len(matching_datafiles) > 0:
-                logging.info(
-                    'Already ingested datafile "%s" as %s. Skipping datafile ingestion.',
-                    datafile.filepath,
-                    matching_datafiles[0].resource_uri,
-                )
-                datafiles_to_transfer.append(datafile)
-                result.skipped.append((datafile.display_name, None))
-                continue
 
-            self.forge.forge_datafile(datafile)
-            datafiles_to_transfer.append(datafile)
-            result.success.append((datafile.display_name, None))
+        raw_datafile_of = {id(datafile): raw for raw, datafile in refined}
+        forged_datafiles = [
+            datafile
+            for datafile in new_datafiles
+            if self._ingest_isolated(
+                raw_datafile_of[id(datafile)],
+                result,
+                partial(self._forge_datafile, datafile),
+            )
+        ]
+
+        return (
+            [
+                (raw_datafile_of[id(datafile)], datafile)
+                for datafile in ingested_datafiles
+            ],
+            [
+                (raw_datafile_of[id(datafile)], datafile)
+                for datafile in forged_datafiles
+            ],
+        )
 
-        logger.info(
-            "Successfully ingested %d datafile metadata: %s",
-            len(result.success),
-            result.success,
+    def _transfer_datafiles(
+        self,
+        source_data_root: Path,
+        staging_root: Optional[Path],
+        datafiles_to_transfer: list[tuple[RawDatafile, Datafile]],
+    ) -> Optional[str]:
+        """Transfer the datafiles with the conveyor, each from its root.
+
+        Returns the reason the transfer failed, or None if it succeeded.
+        """
+        logger.info("Starting transfer of datafiles.")
+        datafiles_by_root: dict[Path, list[Datafile]] = {}
+        for raw_datafile, datafile in datafiles_to_transfer:
+            root = datafile_root(raw_datafile, source_data_root, staging_root)
+            datafiles_by_root.setdefault(root, []).append(datafile)
+        try:
+            with span("transfer"):
+                for root, datafiles in datafiles_by_root.items():
+                    self.conveyor.transfer(root, datafiles)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            if isinstance(error, FailedTransferException):
+                logger.error(
+                    "Datafile transfer could not complete. Check rsync output for more information."
+                )
+            else:
+                logger.error(
+                    "Datafile transfer could not complete: %s",
+                    describe_error(error),
+                    exc_info=error,
+                )
+            return f"Transfer failed: {describe_error(error)}"
+
+        advance(
+            "transfer",
+            objects=len(datafiles_to_transfer),
+            num_bytes=sum(datafile.size for _, datafile in datafiles_to_transfer),
         )
-        if result.error:
+        logger.info("Finished transferring datafiles.")
+        return None
+
+    def ingest_datafiles(
+        self,
+        source_data_root: Path,
+        raw_datafiles: list[RawDatafile],
+        staging_root: Optional[Path] = None,
+    ) -> IngestionResult:
+        """Ingest a set of datafiles into MyTardis.
+
+        The datafiles are transferred from 'source_data_root', except those written
+        during extraction (such as packed archives), which are transferred from
+        'staging_root'.
+
+        A datafile only counts as ingested (or skipped, if its metadata already was)
+        once it has been transferred. If the transfer fails, the datafiles it was to
+        transfer are failed instead, even though their metadata was ingested, so that
+        retrying them transfers them.
+        """
+        result = self._new_result("datafile")
+        ingested_datafiles: list[tuple[RawDatafile, Datafile]] = []
+        forged_datafiles: list[tuple[RawDatafile, Datafile]] = []
+
+        # Group the datafiles by dataset, so each dataset's existing datafiles can be
+        # found with a single set difference
+        raw_datafiles_by_dataset: dict[str, list[RawDatafile]] = {}
+        for raw_datafile in raw_datafiles:
+            raw_datafiles_by_dataset.setdefault(raw_datafile.dataset, []).append(
+                raw_datafile
+            )
+
+        for dataset_raw_datafiles in raw_datafiles_by_dataset.values():
+            dataset_ingested, dataset_forged = self._ingest_dataset_datafiles(
+                dataset_raw_datafiles, result
+            )
+            ingested_datafiles.extend(dataset_ingested)
+            forged_datafiles.extend(dataset_forged)
+        datafiles_to_transfer = ingested_datafiles + forged_datafiles
+
+        logger.info("Successfully ingested %d datafile metadata", len(forged_datafiles))
+        if result.num_error:
             logger.warning(
-                "There were errors ingesting %d datafiles: %s",
-                len(result.error),
+                "There were errors ingesting %d datafiles, including: %s",
+                result.num_error,
                 result.error,
             )
 
-        # Create a file transfer with the conveyor
-        logger.info("Starting transfer of datafiles.")
-        try:
-            self.conveyor.transfer(source_data_root, datafiles_to_transfer)
-            logger.info("Finished transferring datafiles.")
-        except FailedTransferException:
-            logger.error(
-                "Datafile transfer could not complete. Check rsync output for more information."
-            )
+        failure = self._transfer_datafiles(
+            source_data_root, staging_root, datafiles_to_transfer
+        )
+        if failure is not None:
+            for raw_datafile, _ in datafiles_to_transfer:
+                result.fail(raw_datafile, failure)
+            return result
+
+        for _, datafile in ingested_datafiles:
+            result.add_skipped(datafile.display_name, None)
+        for _, datafile in forged_datafiles:
+            result.add_success(datafile.display_name, None)
         return result
 
-    def dump_ingestion_result_json(
+    def _ingest_objects(
+        self, object_type: str, manifest: IngestionManifest
+    ) -> Callable[[list[Any]], IngestionResult]:
+        """The method ingesting a list of objects of 'object_type'"""
+        if object_type == "project":
+            return self.ingest_projects
+        if object_type == "experiment":
+            return self.ingest_experiments
+        if object_type == "dataset":
+            return self.ingest_datasets
+        return partial(
+            self.ingest_datafiles,
+            manifest.get_data_root(),
+            staging_root=manifest.get_staging_root(),
+        )
+
+    def _ingest_group(
+        self,
+        object_type: str,
+        ingest_objects: Callable[[list[Any]], IngestionResult],
+        objects: Sequence[Any],
+    ) -> IngestionResult:
+        """Ingest 'objects' with 'ingest_objects', recording an exception it raises as
+        a failure of all of them, rather than letting it end the run"""
+        try:
+            with span(f"ingest_{object_type}s"):
+                return ingest_objects(list(objects))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            result = self._new_result(object_type)
+            self._record_group_failure(objects, result, error)
+            return result
+
+    def _build_task_graph(  # pylint: disable=too-many-locals
         self,
-        projects_result: IngestionResult,
-        experiments_result: IngestionResult,
-        datasets_result: IngestionResult,
-        datafiles_result: IngestionResult,
+        manifest: IngestionManifest,
+        record_result: Callable[[TaskKey, IngestionResult], None],
+        deferred_tasks: set[TaskKey],
+    ) -> TaskGraph[TaskKey]:
+        """Build the graph of tasks ingesting the objects of 'manifest', in which each
+        object depends on the objects it refers to by identifier.
+
+        The objects of a task whose parents are in 'deferred_tasks' are deferred
+        without being ingested, to be retried after their parents.
+        """
+
+        graph: TaskGraph[TaskKey] = TaskGraph()
+        # The tasks of the objects with each identifier, which their children wait for
+        keys_by_identifier: dict[tuple[str, str], list[TaskKey]] = {}
+
+        def add_task(
+            key: TaskKey,
+            objects: Sequence[Any],
+            parents: list[TaskKey],
+            identifiers: Optional[list[str]],
+        ) -> None:
+            object_type = key[0]
+            ingest_objects = self._ingest_objects(object_type, manifest)
+
+            def task() -> None:
+                if deferred_tasks.intersection(parents):
+                    result = self._new_result(object_type)
+                    for raw_object in objects:
+                        result.defer(raw_object, "A parent object was deferred")
+                else:
+                    result = self._ingest_group(object_type, ingest_objects, objects)
+                record_result(key, result)
+
+            graph.add(key, task, parents)
+            for identifier in identifiers or []:
+                keys_by_identifier.setdefault((object_type, identifier), []).append(key)
+
+        def tasks_of(
+            object_type: str, identifiers: Optional[list[str]]
+        ) -> list[TaskKey]:
+            return [
+                key
+                for identifier in identifiers or []
+                for key in keys_by_identifier.get((object_type, identifier), [])
+            ]
+
+        for index, raw_project in enumerate(manifest.get_projects()):
+            add_task(("project", index), [raw_project], [], raw_project.identifiers)
+
+        for index, raw_experiment in enumerate(manifest.get_experiments()):
+            add_task(
+                ("experiment", index),
+                [raw_experiment],
+                tasks_of("project", raw_experiment.projects),
+                raw_experiment.identifiers,
+            )
+
+        for index, raw_dataset in enumerate(manifest.get_datasets()):
+            add_task(
+                ("dataset", index),
+                [raw_dataset],
+                tasks_of("experiment", raw_dataset.experiments),
+                raw_dataset.identifiers,
+            )
+
+        # The datafiles of a dataset are ingested and transferred together
+        datafiles_by_dataset: dict[str, list[RawDatafile]] = {}
+        for raw_datafile in manifest.get_datafiles():
+            datafiles_by_dataset.setdefault(raw_datafile.dataset, []).append(
+                raw_datafile
+            )
+
+        for dataset_identifier, raw_datafiles in datafiles_by_dataset.items():
+            add_task(
+                ("datafile", dataset_identifier),
+                raw_datafiles,
+                tasks_of("dataset", [dataset_identifier]),
+                None,
+            )
+
+        return graph
+
+    def _forget_ingested_datafiles(self, raw_datafiles: list[RawDatafile]) -> None:
+        """Drop the datasets of 'raw_datafiles' from the Overseer's datafile index, so
+        datafiles which were created by a request which appeared to fail are found"""
+        datafile_index = self._overseer.datafile_index
+        for identifier in {raw_datafile.dataset for raw_datafile in raw_datafiles}:
+            try:
+                dataset_uri = self.crucible.resolve_dataset(identifier)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # Without the dataset, its entry can't be found, so drop every entry
+                datafile_index.clear()
+                return
+            if dataset_uri is not None:
+                datafile_index.remove_dataset(dataset_uri)
+
+    def _retry_deferred(
+        self, manifest: IngestionManifest, results: dict[str, IngestionResult]
     ) -> None:
-        """Write the results of the ingestion to a JSON file."""
-
-        with open("ingestion_result.json", "w", encoding="utf-8") as file:
-            json.dump(
-                {
-                    "projects": projects_result.model_dump(),
-                    "experiments": experiments_result.model_dump(),
-                    "datasets": datasets_result.model_dump(),
-                    "datafiles": datafiles_result.model_dump(),
-                },
-                file,
-                ensure_ascii=False,
-                indent=4,
+        """Retry the deferred objects, with an exponentially increasing delay before
+        each round. Objects still deferred after the last round are failed.
+
+        A request which timed out may still have created its object, so the datafile
+        index is refreshed for the datasets of the datafiles retried.
+        """
+
+        max_rounds = self.config.scheduler.retry_rounds
+        for retry_round in range(max_rounds):
+            num_deferred = sum(result.num_deferred for result in results.values())
+            if num_deferred == 0:
+                return
+
+            delay = self.config.scheduler.retry_delay * 2**retry_round
+            logger.info(
+                "Retrying %d deferred objects in %.1fs (round %d of %d)",
+                num_deferred,
+                delay,
+                retry_round + 1,
+                max_rounds,
             )
+            time.sleep(delay)
+
+            deferred = self._take_deferred(results)
+            # Retry parents before their children
+            for object_type in OBJECT_TYPES:
+                if objects := [raw_object for raw_object, _ in deferred[object_type]]:
+                    if object_type == "datafile":
+                        self._forget_ingested_datafiles(objects)
+                    with span(f"retry_{object_type}s"):
+                        retried = self._ingest_group(
+                            object_type,
+                            self._ingest_objects(object_type, manifest),
+                            objects,
+                        )
+                    results[object_type].merge(retried)
+
+        for object_type, still_deferred in self._take_deferred(results).items():
+            for raw_object, reason in still_deferred:
+                results[object_type].fail(
+                    raw_object, f"{reason} (still failing after retries)"
+                )
+
+    def _take_deferred(
+        self, results: dict[str, IngestionResult]
+    ) -> dict[str, list[tuple[Any, str]]]:
+        """Take the objects deferred so far, by object type, from the result log where
+        they were spooled, and clear them from 'results'"""
+        deferred: dict[str, list[tuple[Any, str]]] = {
+            object_type: [] for object_type in OBJECT_TYPES
+        }
+        if self._result_log is not None:
+            for letter in self._result_log.take_deferred():
+                deferred[letter.object_type].append(
+                    (letter.raw_object(), letter.reason)
+                )
+        for result in results.values():
+            result.clear_deferred()
+        return deferred
 
     def ingest(self, manifest: IngestionManifest) -> None:
-        """Ingest the data described by the input `manifest` into MyTardis."""
+        """Ingest the data described by the input `manifest` into MyTardis.
+
+        Each object is ingested as soon as the objects it refers to in the manifest
+        have been: an experiment after its projects, a dataset after its experiments,
+        and the datafiles of a dataset after the dataset. Independent objects are
+        ingested concurrently, by up to 'scheduler.max_workers' threads.
+
+        Objects which failed because MyTardis was unavailable are retried at the end.
+        The objects which failed for good are written to the dead-letter file, from
+        which they can be replayed alone, replacing those of earlier runs of the same
+        source data.
+
+        The result for each object is appended to the result log as soon as it is
+        known, and the summary of this run in ingestion_result.json is generated from
+        the log.
+        """
+
+        raw_datafiles = manifest.get_datafiles()
+        num_objects = (
+            len(manifest.get_projects())
+            + len(manifest.get_experiments())
+            + len(manifest.get_datasets())
+            + len(raw_datafiles)
+        )
+        add_total("refine", num_objects)
+        add_total("forge", num_objects)
+        add_total(
+            "transfer",
+            len(raw_datafiles),
+            num_bytes=sum(raw_datafile.size for raw_datafile in raw_datafiles),
+        )
+
+        dead_letter_file = self.config.scheduler.dead_letter_file
+        with DeadLetterLog(
+            dead_letter_file, manifest.get_data_root()
+        ) as dead_letters, ResultLog(
+            self.config.scheduler.result_log_file, dead_letters
+        ) as result_log:
+            self._result_log = result_log
+            try:
+                results = self._run(manifest)
+            finally:
+                self._result_log = None
+
+        for object_type, result in results.items():
+            self.log_results(result, object_type)
+
+        # The summary is generated from the log rather than the results in memory,
+        # which only hold a sample of the objects
+        write_result_summary(
+            Path("ingestion_result.json"),
+            summarise_result_log(result_log.path, result_log.run, result_log.start),
+        )
+
+        if dead_letters.num_written:
+            logger.warning(
+                "%d objects failed to be ingested. They were written to %s, and can "
+                "be retried with 'upload --retry-failed'",
+                dead_letters.num_written,
+                dead_letter_file,
+            )
 
-        ingested_projects = self.ingest_projects(manifest.get_projects())
-        self.log_results(ingested_projects, "project")
+    def _run(self, manifest: IngestionManifest) -> dict[str, IngestionResult]:
+        """Ingest the objects of 'manifest', then retry those deferred, returning the
+        results for each object type"""
 
-        ingested_experiments = self.ingest_experiments(manifest.get_experiments())
-        self.log_results(ingested_experiments, "experiment")
+        results = {
+            object_type: self._new_result(object_type) for object_type in OBJECT_TYPES
+        }
+        deferred_tasks: set[TaskKey] = set()
+        results_lock = threading.Lock()
 
-        ingested_datasets = self.ingest_datasets(manifest.get_datasets())
-        self.log_results(ingested_datasets, "dataset")
+        def record_result(key: TaskKey, result: IngestionResult) -> None:
+            with results_lock:
+                results[key[0]].merge(result)
+                if result.num_deferred:
+                    deferred_tasks.add(key)
 
-        ingested_datafiles = self.ingest_datafiles(
-            manifest.get_data_root(), manifest.get_datafiles()
+        graph = self._build_task_graph(manifest, record_result, deferred_tasks)
+        logger.info(
+            "Ingesting %d tasks with up to %d workers",
+            len(graph),
+            self.config.scheduler.max_workers,
         )
-        self.log_results(ingested_datafiles, "datafile")
+        graph.run(self.config.scheduler.max_workers)
 
-        self.dump_ingestion_result_json(
-            projects_result=ingested_projects,
-            experiments_result=ingested_experiments,
-            datasets_result=ingested_datasets,
-            datafiles_result=ingested_datafiles,
-        )
+        self._retry_deferred(manifest, results)
+        return results
 
     def log_results(self, result: IngestionResult, object_type: str) -> None:
         """Logs the details of an ingestion result"""
 
         logger.info("Finished ingesting %ss", object_type)
-        logger.info("%d %ss successfully ingested", len(result.success), object_type)
-        logger.info("%d %ss skipped", len(result.skipped), object_type)
-        logger.info("%d %ss failed", len(result.error), object_type)
+        logger.info("%d %ss successfully ingested", result.num_success, object_type)
+        logger.info("%d %ss skipped", result.num_skipped, object_type)
+        logger.info("%d %ss failed", result.num_error, object_type)
 
         if result.error:
             logger.error(
-                "There were errors ingesting %d %ss: %s",
-                len(result.error),
+                "There were errors ingesting %d %ss, including: %s",
+                result.num_error,
                 object_type,
                 result.error,
             )
@@ -0,0 +1,173 @@
+"""Classification and recording of the objects which fail to be ingested.
+
+Failures caused by MyTardis being unreachable or overloaded are transient: the objects
+are deferred and retried at the end of the run. Other failures are permanent. The
+objects which fail are written to a dead-letter file as they do, one JSON object per
+line, from which a later run can replay them alone.
+
+Each dead letter records the source data root of its manifest, so that the runs of
+several manifests can share the dead-letter file without replaying each other's objects.
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import HTTPError, Timeout
+
+from src.blueprints import RawDatafile, RawDataset, RawExperiment, RawProject
+from src.extraction.manifest import IngestionManifest
+from src.mytardis_client.mt_rest import BadGateWayException
+from src.mytardis_client.resilience import CircuitOpenError
+from src.utils.closeable import Closeable
+
+logger = logging.getLogger(__name__)
+
+RawObject = RawProject | RawExperiment | RawDataset | RawDatafile
+
+# HTTP statuses after which the same request may succeed later
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+_RAW_TYPES: dict[str, type[RawObject]] = {
+    "project": RawProject,
+    "experiment": RawExperiment,
+    "dataset": RawDataset,
+    "datafile": RawDatafile,
+}
+
+
+def _causes(error: BaseException) -> list[BaseException]:
+    """The error, and the errors which caused it"""
+    causes: list[BaseException] = []
+    current: Optional[BaseException] = error
+    while current is not None and current not in causes:
+        causes.append(current)
+        current = current.__cause__ or current.__context__
+    return causes
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether 'error', or an error which caused it, is one a later attempt may not
+    hit: a connection failure, a timeout, an open circuit breaker or an HTTP status
+    showing MyTardis is unavailable or overloaded"""
+    for cause in _causes(error):
+        if isinstance(
+            cause,
+            (RequestsConnectionError, Timeout, BadGateWayException, CircuitOpenError),
+        ):
+            return True
+        if isinstance(cause, HTTPError) and cause.response is not None:
+            if cause.response.status_code in TRANSIENT_STATUS_CODES:
+                return True
+    return False
+
+
+def describe_error(error: BaseException) -> str:
+    """A one-line description of 'error', for the results of an ingestion"""
+    return f"{type(error).__name__}: {error}".splitlines()[0]
+
+
+class DeadLetter(BaseModel):
+    """An object which failed to be ingested, as recorded in the dead-letter file"""
+
+    object_type: str
+    reason: str
+    data: dict[str, Any]
+    source_data_root: Optional[Path] = None
+
+    @classmethod
+    def of(
+        cls,
+        object_type: str,
+        raw_object: RawObject,
+        reason: str,
+        source_data_root: Optional[Path] = None,
+    ) -> "DeadLetter":
+        """The dead letter of 'raw_object', which failed for 'reason'"""
+        return cls(
+            object_type=object_type,
+            reason=reason,
+            data=raw_object.model_dump(mode="json", by_alias=True),
+            source_data_root=source_data_root,
+        )
+
+    def raw_object(self) -> RawObject:
+        """The object which failed"""
+        return _RAW_TYPES[self.object_type].model_validate(self.data)
+
+
+class DeadLetterLog(Closeable):
+    """Writes the objects which fail to the dead-letter file as they fail.
+
+    Opening the log drops the dead letters of earlier runs of the same source data,
+    which have either been replayed or been superseded by this run, and keeps those of
+    other manifests. Dead letters without a source data root are taken to belong to
+    every manifest. Letters may be written from several threads at once.
+
+    Attributes:
+        path: the path of the dead-letter file
+        source_data_root: the source data root of the manifest being ingested
+        num_written: the number of dead letters written by this run
+    """
+
+    def __init__(self, path: Path, source_data_root: Path) -> None:
+        self.path = path
+        self.source_data_root = source_data_root
+        self.num_written = 0
+        self._lock = threading.Lock()
+        kept = (
+            [
+                line
+                for line in path.read_text(encoding="utf-8").splitlines(keepends=True)
+                if line.strip()
+                and DeadLetter.model_validate_json(line).source_data_root
+                not in (None, source_data_root)
+            ]
+            if path.exists()
+            else []
+        )
+        self._file = path.open("w", encoding="utf-8", buffering=1)
+        self._file.writelines(kept)
+
+    def write(self, object_type: str, raw_object: RawObject, reason: str) -> None:
+        """Write the dead letter of 'raw_object', which failed for 'reason'"""
+        letter = DeadLetter.of(object_type, raw_object, reason, self.source_data_root)
+        line = letter.model_dump_json() + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.num_written += 1
+
+    def close(self) -> None:
+        """Close the dead-letter file"""
+        with self._lock:
+            self._file.close()
+
+
+def read_dead_letters(
+    path: Path, source_data_root: Path, staging_root: Optional[Path] = None
+) -> IngestionManifest:
+    """Read the dead-letter file at 'path' into a manifest of the objects which failed
+    in the runs of the source data in 'source_data_root'"""
+    manifest = IngestionManifest(
+        source_data_root=source_data_root, staging_root=staging_root
+    )
+    with path.open("r", encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            letter = DeadLetter.model_validate_json(line)
+            if letter.source_data_root not in (None, source_data_root):
+                continue
+            raw_object = letter.raw_object()
+            if isinstance(raw_object, RawProject):
+                manifest.add_project(raw_object)
+            elif isinstance(raw_object, RawExperiment):
+                manifest.add_experiment(raw_object)
+            elif isinstance(raw_object, RawDataset):
+                manifest.add_dataset(raw_object)
+            else:
+                manifest.add_datafile(raw_object)
+    return manifest
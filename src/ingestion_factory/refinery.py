@@ -0,0 +1,88 @@
+"""A fused smelt and prepare stage for datafiles.
+
+For a datafile, the Smelter and the Crucible mostly copy the same fields from one model
+into the next, and the only lookup is the resolution of the dataset identifier to its
+URI. The DatafileRefinery goes straight from a RawDatafile to a Datafile, without the
+intermediate RefinedDatafile, and resolves each distinct dataset identifier once for
+the whole batch, rather than once per datafile.
+"""
+
+import logging
+from typing import Callable, Iterable, Iterator, Optional
+
+from pydantic import ValidationError
+
+from src.blueprints.datafile import Datafile, RawDatafile
+from src.crucible.crucible import Crucible
+from src.mytardis_client.endpoints import URI
+from src.smelters.smelter import Smelter
+from src.utils.progress import advance
+from src.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class DatafileRefinery:
+    """Turns RawDatafiles into Datafiles ready for ingestion.
+
+    The checks and warnings are those of Smelter.smelt_datafile() and
+    Crucible.prepare_datafile(), whose shared steps it uses.
+
+    Attributes:
+        crucible: used to resolve dataset identifiers to URIs
+        smelter: used to extract the datafile fields and parameters
+    """
+
+    def __init__(self, crucible: Crucible, smelter: Smelter) -> None:
+        self.crucible = crucible
+        self.smelter = smelter
+
+    def refine_datafile(
+        self, raw_datafile: RawDatafile, dataset_uri: URI
+    ) -> Datafile | None:
+        """Build the Datafile for 'raw_datafile', in the dataset 'dataset_uri'"""
+        fields = self.smelter.datafile_fields(raw_datafile)
+        if fields is None:
+            return None
+        try:
+            return Datafile(**fields, dataset=dataset_uri, replicas=[])
+        except ValidationError:
+            logger.warning(
+                "Malformed datafile dataclass produced by refinery. Datafile is %s",
+                raw_datafile.filename,
+                exc_info=True,
+            )
+            return None
+
+    def refine(
+        self,
+        raw_datafiles: Iterable[RawDatafile],
+        on_error: Callable[[RawDatafile, str], None],
+    ) -> Iterator[tuple[RawDatafile, Datafile]]:
+        """Refine a list or stream of datafiles, yielding those ready for ingestion
+        along with the raw datafiles they came from.
+
+        The dataset of each datafile is resolved the first time its identifier is
+        seen, and the result (including a failure) is reused for the rest of the
+        batch. 'on_error' is called with each datafile which can't be refined, and
+        the reason, e.g. to record it in an IngestionResult.
+        """
+        dataset_uris: dict[str, Optional[URI]] = {}
+
+        for raw_datafile in raw_datafiles:
+            with span("refine"):
+                identifier = raw_datafile.dataset
+                if identifier not in dataset_uris:
+                    dataset_uris[identifier] = self.crucible.resolve_dataset(identifier)
+                dataset_uri = dataset_uris[identifier]
+                if dataset_uri is None:
+                    on_error(raw_datafile, f"Unable to find the dataset {identifier!r}")
+                    continue
+                datafile = self.refine_datafile(raw_datafile, dataset_uri)
+
+            if datafile is None:
+                on_error(raw_datafile, "Unable to refine the datafile's metadata")
+                continue
+
+            advance("refine")
+            yield raw_datafile, datafile
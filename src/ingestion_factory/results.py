@@ -0,0 +1,252 @@
+"""Recording of the results of an ingestion.
+
+Each result is appended to a JSON Lines log as soon as it is known, so the results of a
+run survive the process dying, and only the counts and a bounded sample of the results
+are kept in memory. The summary of the run is generated from the log once it is done.
+
+Each run appends to the log rather than replacing it, so that retrying the objects
+which failed in a run keeps the results of that run. Each record is marked with the ID
+of its run, which the summary of the run is restricted to.
+"""
+
+import json
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+from src.ingestion_factory.failures import DeadLetter, DeadLetterLog, RawObject
+from src.mytardis_client.endpoints import URI
+from src.utils.closeable import Closeable
+from src.utils.progress import advance
+
+# The number of results of each kind kept in memory, for logging and the summary
+RESULT_SAMPLE_SIZE = 100
+
+# The object types, in the order in which they are ingested
+OBJECT_TYPES = ("project", "experiment", "dataset", "datafile")
+
+ResultStatus = Literal["success", "skipped", "error"]
+
+
+class ResultRecord(BaseModel):
+    """The result of ingesting one object, as written to the result log"""
+
+    object_type: str
+    status: ResultStatus
+    name: str
+    uri: Optional[URI] = None
+    reason: Optional[str] = None
+    run: Optional[str] = None
+
+
+class ResultLog(Closeable):
+    """Appends the results of an ingestion to a JSON Lines file, one line per object.
+
+    Results may be written from several threads at once. Each line is flushed as it is
+    written. The results are appended to those of earlier runs, marked with the ID of
+    this run.
+
+    The objects which fail are written to the dead-letter log, if given, and those
+    deferred are spooled to a temporary file until they are taken to be retried.
+
+    Attributes:
+        path: the path of the log
+        run: the ID of this run
+        start: the offset in the log at which the results of this run begin
+    """
+
+    def __init__(
+        self, path: Path, dead_letters: Optional[DeadLetterLog] = None
+    ) -> None:
+        self.path = path
+        self.run = uuid.uuid4().hex
+        self._dead_letters = dead_letters
+        self._lock = threading.Lock()
+        self._file = path.open("a", encoding="utf-8", buffering=1)
+        self._deferred = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.start = self._file.tell()
+
+    def write(self, record: ResultRecord) -> None:
+        """Append 'record' to the log"""
+        line = record.model_dump_json(exclude_none=True) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def fail(self, object_type: str, raw_object: RawObject, reason: str) -> None:
+        """Write 'raw_object', which failed for 'reason', to the dead letters"""
+        if self._dead_letters is not None:
+            self._dead_letters.write(object_type, raw_object, reason)
+
+    def defer(self, object_type: str, raw_object: RawObject, reason: str) -> None:
+        """Spool 'raw_object', deferred for 'reason', until it is retried"""
+        line = DeadLetter.of(object_type, raw_object, reason).model_dump_json() + "\n"
+        with self._lock:
+            self._deferred.write(line)
+
+    def take_deferred(self) -> list[DeadLetter]:
+        """Take the objects deferred since they were last taken"""
+        with self._lock:
+            self._deferred.seek(0)
+            deferred = [DeadLetter.model_validate_json(line) for line in self._deferred]
+            self._deferred.seek(0)
+            self._deferred.truncate()
+        return deferred
+
+    def close(self) -> None:
+        """Close the log file"""
+        with self._lock:
+            self._file.close()
+            self._deferred.close()
+
+
+class IngestionResult(BaseModel):
+    """Container for recording the results of an ingestion of a set of objects
+    into MyTardis
+
+    The number of objects ingested, skipped and failed are counted, but only the first
+    RESULT_SAMPLE_SIZE of each are kept. If the result has a log, each result is also
+    written to it as it is recorded.
+
+    Errors are recorded with their reason. The raw objects which failed, and those
+    deferred for a retry after a transient failure, are written to the log, and a
+    sample of them is kept too, but they are not part of the results written out.
+    """
+
+    num_success: int = 0
+    num_skipped: int = 0
+    num_error: int = 0
+    success: list[tuple[str, Optional[URI]]] = []
+    skipped: list[tuple[str, Optional[URI]]] = []
+    error: list[tuple[str, str]] = []
+    num_deferred: int = Field(default=0, exclude=True)
+    failed: list[tuple[Any, str]] = Field(default=[], exclude=True)
+    deferred: list[tuple[Any, str]] = Field(default=[], exclude=True)
+
+    _object_type: str = PrivateAttr(default="")
+    _log: Optional[ResultLog] = PrivateAttr(default=None)
+
+    @classmethod
+    def logged_to(cls, log: Optional[ResultLog], object_type: str) -> "IngestionResult":
+        """An empty result for objects of 'object_type', recorded to 'log' if given"""
+        result = cls()
+        result._object_type = object_type  # pylint: disable=protected-access
+        result._log = log  # pylint: disable=protected-access
+        return result
+
+    def _write(self, status: ResultStatus, name: str, **details: Any) -> None:
+        if self._log is not None:
+            # The forge stage counts each object once its result is known
+            advance("forge")
+            self._log.write(
+                ResultRecord(
+                    object_type=self._object_type,
+                    status=status,
+                    name=name,
+                    run=self._log.run,
+                    **details,
+                )
+            )
+
+    def add_success(self, name: str, uri: Optional[URI]) -> None:
+        """Record that the object 'name' was ingested as 'uri'"""
+        self.num_success += 1
+        if len(self.success) < RESULT_SAMPLE_SIZE:
+            self.success.append((name, uri))
+        self._write("success", name, uri=uri)
+
+    def add_skipped(self, name: str, uri: Optional[URI]) -> None:
+        """Record that the object 'name' was already ingested, as 'uri'"""
+        self.num_skipped += 1
+        if len(self.skipped) < RESULT_SAMPLE_SIZE:
+            self.skipped.append((name, uri))
+        self._write("skipped", name, uri=uri)
+
+    def add_error(self, name: str, reason: str) -> None:
+        """Record that the object 'name' could not be ingested"""
+        self.num_error += 1
+        if len(self.error) < RESULT_SAMPLE_SIZE:
+            self.error.append((name, reason))
+        self._write("error", name, reason=reason)
+
+    def fail(self, raw_object: RawObject, reason: str) -> None:
+        """Record that 'raw_object' could not be ingested"""
+        self.add_error(raw_object.display_name, reason)
+        if len(self.failed) < RESULT_SAMPLE_SIZE:
+            self.failed.append((raw_object, reason))
+        if self._log is not None:
+            self._log.fail(self._object_type, raw_object, reason)
+
+    def defer(self, raw_object: RawObject, reason: str) -> None:
+        """Record that 'raw_object' should be retried later"""
+        self.num_deferred += 1
+        if len(self.deferred) < RESULT_SAMPLE_SIZE:
+            self.deferred.append((raw_object, reason))
+        if self._log is not None:
+            self._log.defer(self._object_type, raw_object, reason)
+
+    def clear_deferred(self) -> None:
+        """Forget the objects deferred, once they have been taken to be retried"""
+        self.num_deferred = 0
+        self.deferred = []
+
+    def merge(self, other: "IngestionResult") -> None:
+        """Add the results of 'other' to these results.
+
+        The results of 'other' were already written to its own log, if it had one, so
+        they are not written again.
+        """
+        self.num_success += other.num_success
+        self.num_skipped += other.num_skipped
+        self.num_error += other.num_error
+        self.num_deferred += other.num_deferred
+        self.success.extend(other.success[: RESULT_SAMPLE_SIZE - len(self.success)])
+        self.skipped.extend(other.skipped[: RESULT_SAMPLE_SIZE - len(self.skipped)])
+        self.error.extend(other.error[: RESULT_SAMPLE_SIZE - len(self.error)])
+        self.failed.extend(other.failed[: RESULT_SAMPLE_SIZE - len(self.failed)])
+        self.deferred.extend(other.deferred[: RESULT_SAMPLE_SIZE - len(self.deferred)])
+
+
+def summarise_result_log(
+    path: Path, run: Optional[str] = None, start: int = 0
+) -> dict[str, IngestionResult]:
+    """Read the result log at 'path' into the results for each object type, with their
+    counts and a sample of each kind of result. Every object type has a result, even if
+    it has no records.
+
+    If 'run' is given, only the records of that run (see 'ResultLog.run') are read,
+    from the offset 'start' at which it began (see 'ResultLog.start')."""
+    results = {object_type: IngestionResult() for object_type in OBJECT_TYPES}
+    with path.open("r", encoding="utf-8") as file:
+        file.seek(start)
+        for line in file:
+            if not line.strip():
+                continue
+            record = ResultRecord.model_validate_json(line)
+            if run is not None and record.run != run:
+                continue
+            result = results.setdefault(record.object_type, IngestionResult())
+            if record.status == "success":
+                result.add_success(record.name, record.uri)
+            elif record.status == "skipped":
+                result.add_skipped(record.name, record.uri)
+            else:
+                result.add_error(record.name, record.reason or "")
+    return results
+
+
+def write_result_summary(path: Path, results: dict[str, IngestionResult]) -> None:
+    """Write the summary of the results for each object type to a JSON file"""
+    with path.open("w", encoding="utf-8") as file:
+        json.dump(
+            {
+                f"{object_type}s": result.model_dump(mode="json")
+                for object_type, result in results.items()
+            },
+            file,
+            ensure_ascii=False,
+            indent=4,
+        )
@@ -3,6 +3,8 @@
 """
 
 import logging
+from collections import defaultdict
+from pathlib import Path
 from typing import Optional
 
 from typeguard import check_type
@@ -11,10 +13,8 @@ from src.blueprints.datafile import RawDatafile
 from src.config.config import ConfigFromEnv
 from src.crucible.crucible import Crucible
 from src.mytardis_client.mt_rest import MyTardisRESTFactory
-from src.mytardis_client.objects import MyTardisObject
-from src.mytardis_client.response_data import IngestedDatafile
+from src.mytardis_client.response_data import IngestedDatafileStatus
 from src.overseers.overseer import Overseer
-from src.smelters.smelter import Smelter
 
 logger = logging.getLogger(__name__)
 
@@ -24,37 +24,60 @@ class Inspector:
 
     def __init__(self, config: ConfigFromEnv) -> None:
         mt_rest = MyTardisRESTFactory(config.auth, config.connection)
-        overseer = Overseer(mt_rest)
-        smelter = Smelter(
-            overseer=overseer,
-            general=config.general,
-            default_schema=config.default_schema,
-        )
-        crucible = Crucible(overseer)
-        self._overseer: Overseer = overseer
-        self._smelter = smelter
-        self._crucible = crucible
-
-    def query_datafile(self, raw_df: RawDatafile) -> Optional[list[IngestedDatafile]]:
-        """Partially ingests raw datafile and queries MyTardis for matching instances.
+        self._mt_rest = mt_rest
+        self._crucible = Crucible(Overseer(mt_rest))
+
+    def query_datafiles(
+        self, raw_dfs: list[RawDatafile]
+    ) -> list[Optional[list[IngestedDatafileStatus]]]:
+        """Queries MyTardis for the ingested instances of many datafiles at once.
+
+        The datafiles are grouped by dataset, and all the datafiles of each dataset are
+        fetched from MyTardis in a single paginated query, with only the fields needed
+        to check their status. They are then matched to the
+        raw datafiles locally on their directory and filename.
 
         Args:
-            raw_df (RawDatafile): The raw datafile to query.
+            raw_dfs (list[RawDatafile]): The raw datafiles to query.
 
         Returns:
-            Optional[list[IngestedDatafile]]: A list of matching datafiles, or None if the raw
-            datafile is unable to be smelted or prepared.
+            list[Optional[list[IngestedDatafileStatus]]]: The matching datafiles for each raw
+            datafile, in the same order as 'raw_dfs', or None for raw datafiles whose
+            dataset could not be found in MyTardis.
         """
-        smelted_df = self._smelter.smelt_datafile(raw_df)
-        if not smelted_df:
-            return None
-        df = self._crucible.prepare_datafile(smelted_df)
-        if not df:
-            return None
-
-        # Look up the datafile in MyTardis to check if it's ingested.
-        matches = self._overseer.get_matching_objects(
-            MyTardisObject.DATAFILE, df.model_dump()
-        )
-
-        return check_type(matches, list[IngestedDatafile])
+        indices_by_dataset: dict[str, list[int]] = defaultdict(list)
+        for index, raw_df in enumerate(raw_dfs):
+            indices_by_dataset[raw_df.dataset].append(index)
+
+        results: list[Optional[list[IngestedDatafileStatus]]] = [None] * len(raw_dfs)
+
+        for dataset_identifier, indices in indices_by_dataset.items():
+            dataset_uri = self._crucible.resolve_dataset(dataset_identifier)
+            if dataset_uri is None:
+                continue
+
+            objects, _ = self._mt_rest.get_all(
+                "/dataset_file",
+                query_params={"dataset": dataset_uri},
+                partial=IngestedDatafileStatus,
+            )
+            ingested_dfs = check_type(objects, list[IngestedDatafileStatus])
+            logger.info(
+                "Retrieved %d datafiles of dataset %s",
+                len(ingested_dfs),
+                dataset_identifier,
+            )
+
+            ingested_by_path: dict[tuple[Path, str], list[IngestedDatafileStatus]] = (
+                defaultdict(list)
+            )
+            for ingested_df in ingested_dfs:
+                key = (ingested_df.directory, ingested_df.filename)
+                ingested_by_path[key].append(ingested_df)
+
+            for index in indices:
+                raw_df = raw_dfs[index]
+                key = (Path(raw_df.directory or ""), raw_df.filename)
+                results[index] = ingested_by_path.get(key, [])
+
+        return results
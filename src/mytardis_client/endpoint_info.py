@@ -19,6 +19,7 @@ from src.mytardis_client.response_data import (
     MyTardisIntrospection,
     MyTardisObjectData,
     ProjectParameterSet,
+    Schema,
     StorageBox,
 )
 
@@ -176,6 +177,14 @@ _MYTARDIS_ENDPOINTS: dict[MyTardisEndpoint, MyTardisEndpointInfo] = {
             ),
         ),
     ),
+    "/schema": MyTardisEndpointInfo(
+        path="/schema",
+        methods=EndpointMethods(
+            GET=GetRequestProperties(
+                response_obj_type=Schema,
+            ),
+        ),
+    ),
 }
 
 
@@ -0,0 +1,223 @@
+"""Adaptive control of the concurrency and rate of requests to MyTardis.
+
+A single FlowController is shared by all the threads making requests through a
+MyTardisRESTFactory. Before each request, a thread waits for a token from the (optional)
+token bucket and for a free slot under the concurrency limit. The limit follows an AIMD
+(additive increase, multiplicative decrease) scheme: it grows by about one for each
+limit's worth of successful requests, and is multiplied by the backoff ratio when the
+server appears overloaded.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from src.config.config import FlowControlConfig
+
+logger = logging.getLogger(__name__)
+
+# Status codes which indicate that the server is overloaded
+CONGESTION_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+class TokenBucket:
+    """A thread-safe token bucket limiting the rate of requests.
+
+    Tokens are added at 'rate' per second, up to 'capacity'. Each request takes one.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(capacity)
+        self._last_refill = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, returning 0. Otherwise return the number of
+        seconds until one will be."""
+        with self._lock:
+            self._refill()
+            # Allow for rounding, which could otherwise leave vanishingly short waits
+            if self._tokens >= 1 - 1e-9:
+                self._tokens = max(0.0, self._tokens - 1)
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Take a token, waiting until one is available"""
+        while (wait := self.try_acquire()) > 0:
+            self._sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """A thread-safe concurrency limit adjusted with AIMD.
+
+    The limit is fractional, and the number of requests allowed in flight is its
+    integer part. It is decreased at most once per observed round-trip time, so that a
+    burst of failures from requests sent together counts as a single overload signal.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        backoff_ratio: float = 0.5,
+        adaptive: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not minimum <= maximum:
+            raise ValueError("Minimum concurrency must not exceed the maximum")
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff_ratio = backoff_ratio
+        self.adaptive = adaptive
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._limit = float(
+            min(max(initial, minimum), maximum) if adaptive else maximum
+        )
+        self._in_flight = 0
+        self._last_decrease = float("-inf")
+        self._smoothed_latency = 0.0
+
+    @property
+    def limit(self) -> int:
+        """The number of requests currently allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of requests currently in flight"""
+        return self._in_flight
+
+    def acquire(self) -> None:
+        """Wait for a free slot under the limit, and take it"""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, congested: bool) -> None:
+        """Give back a slot, adjusting the limit from the outcome of the request"""
+        with self._condition:
+            self._in_flight -= 1
+            self._smoothed_latency = (
+                latency
+                if self._smoothed_latency == 0.0
+                else 0.8 * self._smoothed_latency + 0.2 * latency
+            )
+
+            if self.adaptive:
+                if congested:
+                    now = self._clock()
+                    if now - self._last_decrease >= self._smoothed_latency:
+                        self._last_decrease = now
+                        previous = self._limit
+                        self._limit = max(
+                            float(self.minimum), self._limit * self.backoff_ratio
+                        )
+                        logger.info(
+                            "MyTardis appears overloaded. Reducing request concurrency "
+                            "from %d to %d",
+                            int(previous),
+                            int(self._limit),
+                        )
+                else:
+                    self._limit = min(
+                        float(self.maximum), self._limit + 1 / self._limit
+                    )
+
+            self._condition.notify_all()
+
+
+@dataclass
+class RequestOutcome:
+    """The outcome of a request made in a FlowController slot"""
+
+    status_code: Optional[int] = None
+
+
+@dataclass
+class FlowControlSnapshot:
+    """The state of a FlowController at a point in time"""
+
+    concurrency_limit: int
+    in_flight: int
+    requests_per_second: Optional[float]
+
+
+class FlowController:
+    """Combines the concurrency limiter and the optional token bucket used for every
+    request to MyTardis."""
+
+    def __init__(self, config: FlowControlConfig) -> None:
+        self.config = config
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=config.initial_concurrency,
+            minimum=config.min_concurrency,
+            maximum=config.max_concurrency,
+            backoff_ratio=config.backoff_ratio,
+            adaptive=config.adaptive,
+        )
+        self.bucket = (
+            TokenBucket(config.requests_per_second, config.burst)
+            if config.requests_per_second is not None
+            else None
+        )
+
+    def is_congestion(self, status_code: Optional[int], latency: float) -> bool:
+        """Whether a response (or None for a failed request) indicates overload"""
+        if status_code is None or status_code in CONGESTION_STATUS_CODES:
+            return True
+        target = self.config.latency_target
+        return target is not None and latency > target
+
+    @contextmanager
+    def slot(self) -> Generator[RequestOutcome, None, None]:
+        """Wait for permission to send a request, and release it when done.
+
+        The status code of the response must be recorded on the yielded outcome. A
+        request which raises, or has no status recorded, counts as a failure.
+        """
+        if self.bucket is not None:
+            self.bucket.acquire()
+        self.limiter.acquire()
+
+        outcome = RequestOutcome()
+        start = time.perf_counter()
+        try:
+            yield outcome
+        finally:
+            latency = time.perf_counter() - start
+            self.limiter.release(
+                latency, self.is_congestion(outcome.status_code, latency)
+            )
+
+    def snapshot(self) -> FlowControlSnapshot:
+        """The current concurrency limit and number of requests in flight"""
+        return FlowControlSnapshot(
+            concurrency_limit=self.limiter.limit,
+            in_flight=self.limiter.in_flight,
+            requests_per_second=self.config.requests_per_second,
+        )
@@ -0,0 +1,353 @@
+"""Request-level metrics for the MyTardis REST client.
+
+Records, per HTTP method and endpoint, how many requests were made, how long they
+took, how many failed or were retried, how many bytes were sent and received, and
+how many were answered from the client-side response cache. Lookups in the
+Overseer's own object cache are recorded too, by endpoint and match strategy, so that
+the effectiveness of both caches can be seen side by side. These are the only counts
+of the Overseer's cache lookups; the cache reads its statistics back from here.
+"""
+
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the buckets of the latency histograms
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    math.inf,
+)
+
+
+def _labels(**values: Any) -> str:
+    """Format the labels of a Prometheus sample"""
+    inner = ",".join(f'{key}="{value}"' for key, value in values.items())
+    return "{" + inner + "}"
+
+
+@dataclass
+class LatencyHistogram:
+    """A cumulative-friendly histogram of request latencies"""
+
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    total_seconds: float = 0.0
+    count: int = 0
+
+    def observe(self, seconds: float) -> None:
+        """Record a single latency observation"""
+        for i, upper_bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper_bound:
+                self.bucket_counts[i] += 1
+                break
+        self.total_seconds += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile, as the upper bound of the bucket containing it"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for upper_bound, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return upper_bound
+        return math.inf
+
+
+@dataclass
+class EndpointStats:
+    """Statistics for the requests made with one method to one endpoint"""
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+    coalesced: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    status_codes: dict[int, int] = field(default_factory=dict)
+    error_types: dict[str, int] = field(default_factory=dict)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counts for a cache"""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups which were hits"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class RequestMetrics:
+    """Thread-safe collection of metrics about requests made to MyTardis."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: dict[tuple[str, str], EndpointStats] = {}
+        self._overseer_cache: dict[tuple[str, str], CacheStats] = {}
+
+    def _stats(self, method: str, endpoint: str) -> EndpointStats:
+        key = (method, endpoint)
+        if (stats := self._endpoints.get(key)) is None:
+            stats = self._endpoints[key] = EndpointStats()
+        return stats
+
+    def record_request(  # pylint: disable=too-many-arguments
+        self,
+        method: str,
+        endpoint: str,
+        latency: float,
+        status_code: int,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        from_cache: bool = False,
+    ) -> None:
+        """Record a request which received a response (of any status)"""
+        with self._lock:
+            stats = self._stats(method, endpoint)
+            stats.requests += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.status_codes[status_code] = stats.status_codes.get(status_code, 0) + 1
+            stats.latency.observe(latency)
+            if from_cache:
+                stats.cache_hits += 1
+            if status_code >= 400:
+                stats.errors += 1
+
+    def record_failure(
+        self, method: str, endpoint: str, latency: float, error: Exception
+    ) -> None:
+        """Record a request which failed without a response (e.g. a timeout)"""
+        error_type = type(error).__name__
+        with self._lock:
+            stats = self._stats(method, endpoint)
+            stats.requests += 1
+            stats.errors += 1
+            stats.error_types[error_type] = stats.error_types.get(error_type, 0) + 1
+            stats.latency.observe(latency)
+
+    def record_retry(self, method: str, endpoint: str) -> None:
+        """Record that a request is about to be retried"""
+        with self._lock:
+            self._stats(method, endpoint).retries += 1
+
+    def record_coalesced(self, method: str, endpoint: str) -> None:
+        """Record a request which was answered by sharing the response to an identical
+        request already in flight"""
+        with self._lock:
+            self._stats(method, endpoint).coalesced += 1
+
+    def record_overseer_cache_lookup(
+        self, endpoint: str, hit: bool, count: int = 1, strategy: str = ""
+    ) -> None:
+        """Record 'count' lookups in the Overseer's object cache for 'endpoint', with
+        the match 'strategy' (the fields matched on) if there is more than one"""
+        with self._lock:
+            stats = self._overseer_cache.setdefault((endpoint, strategy), CacheStats())
+            if hit:
+                stats.hits += count
+            else:
+                stats.misses += count
+
+    def reset(self) -> None:
+        """Discard all the metrics recorded so far"""
+        with self._lock:
+            self._endpoints.clear()
+            self._overseer_cache.clear()
+
+    def endpoint_stats(self, method: str, endpoint: str) -> EndpointStats:
+        """Get the statistics for requests with 'method' to 'endpoint'"""
+        with self._lock:
+            return self._endpoints.get((method, endpoint), EndpointStats())
+
+    def overseer_cache_stats(self, endpoint: str) -> CacheStats:
+        """Get the Overseer cache statistics for 'endpoint', over all match
+        strategies"""
+        total = CacheStats()
+        for stats in self.overseer_cache_strategies(endpoint).values():
+            total.hits += stats.hits
+            total.misses += stats.misses
+        return total
+
+    def overseer_cache_strategies(self, endpoint: str) -> dict[str, CacheStats]:
+        """Get the Overseer cache statistics for 'endpoint', by match strategy"""
+        with self._lock:
+            return {
+                strategy: CacheStats(stats.hits, stats.misses)
+                for (cache_endpoint, strategy), stats in self._overseer_cache.items()
+                if cache_endpoint == endpoint
+            }
+
+    def _overseer_cache_totals(self) -> dict[str, CacheStats]:
+        """The Overseer cache statistics of each endpoint, over all match strategies.
+        Must be called with the lock held."""
+        totals: dict[str, CacheStats] = {}
+        for (endpoint, _), stats in sorted(self._overseer_cache.items()):
+            total = totals.setdefault(endpoint, CacheStats())
+            total.hits += stats.hits
+            total.misses += stats.misses
+        return totals
+
+    def snapshot(self) -> dict[str, Any]:
+        """A JSON-serializable summary of the metrics recorded so far"""
+        with self._lock:
+            endpoints = []
+            for (method, endpoint), stats in sorted(self._endpoints.items()):
+                latency = stats.latency
+                endpoints.append(
+                    {
+                        "method": method,
+                        "endpoint": endpoint,
+                        "requests": stats.requests,
+                        "errors": stats.errors,
+                        "retries": stats.retries,
+                        "cache_hits": stats.cache_hits,
+                        "coalesced": stats.coalesced,
+                        "bytes_sent": stats.bytes_sent,
+                        "bytes_received": stats.bytes_received,
+                        "status_codes": dict(stats.status_codes),
+                        "error_types": dict(stats.error_types),
+                        "latency_mean_s": (
+                            latency.total_seconds / latency.count
+                            if latency.count
+                            else 0.0
+                        ),
+                        "latency_p50_s": latency.quantile(0.5),
+                        "latency_p95_s": latency.quantile(0.95),
+                        "latency_p99_s": latency.quantile(0.99),
+                    }
+                )
+            overseer_cache = {
+                endpoint: {
+                    "hits": stats.hits,
+                    "misses": stats.misses,
+                    "hit_ratio": stats.hit_ratio,
+                }
+                for endpoint, stats in self._overseer_cache_totals().items()
+            }
+        return {"endpoints": endpoints, "overseer_cache": overseer_cache}
+
+    def log_summary(self, log: Optional[logging.Logger] = None) -> None:
+        """Log a one-line summary per endpoint/method, and one per Overseer cache"""
+        log = log or logger
+        snapshot = self.snapshot()
+        log.info("MyTardis request metrics:")
+        for entry in snapshot["endpoints"]:
+            log.info(
+                "  %s %s: %d requests, %d errors, %d retries, %d cache hits, "
+                "%d coalesced, %d B sent, %d B received, "
+                "latency mean %.3fs p50 <=%.3fs p95 <=%.3fs",
+                entry["method"],
+                entry["endpoint"],
+                entry["requests"],
+                entry["errors"],
+                entry["retries"],
+                entry["cache_hits"],
+                entry["coalesced"],
+                entry["bytes_sent"],
+                entry["bytes_received"],
+                entry["latency_mean_s"],
+                entry["latency_p50_s"],
+                entry["latency_p95_s"],
+            )
+        for endpoint, stats in snapshot["overseer_cache"].items():
+            log.info(
+                "  Overseer cache %s: %d hits, %d misses (hit ratio %.2f)",
+                endpoint,
+                stats["hits"],
+                stats["misses"],
+                stats["hit_ratio"],
+            )
+
+    def _prometheus_counters(self) -> list[str]:
+        """The per-endpoint request counters, in the Prometheus text format. Must be
+        called with the lock held."""
+        counters: dict[str, Callable[[EndpointStats], int]] = {
+            "mytardis_requests_total": lambda s: s.requests,
+            "mytardis_request_errors_total": lambda s: s.errors,
+            "mytardis_request_retries_total": lambda s: s.retries,
+            "mytardis_request_cache_hits_total": lambda s: s.cache_hits,
+            "mytardis_request_coalesced_total": lambda s: s.coalesced,
+            "mytardis_request_bytes_sent_total": lambda s: s.bytes_sent,
+            "mytardis_request_bytes_received_total": lambda s: s.bytes_received,
+        }
+        lines: list[str] = []
+        for name, value_of in counters.items():
+            lines.append(f"# TYPE {name} counter")
+            for (method, endpoint), stats in sorted(self._endpoints.items()):
+                lines.append(
+                    f"{name}{_labels(method=method, endpoint=endpoint)} "
+                    f"{value_of(stats)}"
+                )
+        return lines
+
+    def _prometheus_latency(self) -> list[str]:
+        """The per-endpoint latency histograms, in the Prometheus text format. Must be
+        called with the lock held."""
+        name = "mytardis_request_duration_seconds"
+        lines = [f"# TYPE {name} histogram"]
+        for (method, endpoint), stats in sorted(self._endpoints.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(
+                LATENCY_BUCKETS, stats.latency.bucket_counts
+            ):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(upper_bound) else str(upper_bound)
+                bucket_labels = _labels(method=method, endpoint=endpoint, le=le)
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            endpoint_labels = _labels(method=method, endpoint=endpoint)
+            lines.append(f"{name}_sum{endpoint_labels} {stats.latency.total_seconds}")
+            lines.append(f"{name}_count{endpoint_labels} {stats.latency.count}")
+        return lines
+
+    def _prometheus_overseer_cache(self) -> list[str]:
+        """The Overseer cache counters, in the Prometheus text format. Must be called
+        with the lock held."""
+        lines: list[str] = []
+        for name, attr in (
+            ("mytardis_overseer_cache_hits_total", "hits"),
+            ("mytardis_overseer_cache_misses_total", "misses"),
+        ):
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, cache_stats in self._overseer_cache_totals().items():
+                value = getattr(cache_stats, attr)
+                lines.append(f"{name}{_labels(endpoint=endpoint)} {value}")
+        return lines
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = (
+                self._prometheus_counters()
+                + self._prometheus_latency()
+                + self._prometheus_overseer_cache()
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """Write the metrics to 'path' in the Prometheus text exposition format"""
+        path.write_text(self.to_prometheus(), encoding="utf-8")
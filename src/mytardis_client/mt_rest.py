@@ -5,17 +5,26 @@ is heavily based on the NGS ingestor for MyTardis found at
     https://github.com/mytardis/mytardis_ngs_ingestor
 """
 
+import functools
+import gzip
+import json
 import logging
+import threading
+import time
 from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import timedelta
-from typing import Any, Callable, Dict, Generic, Literal, Optional, TypeVar
+from typing import Any, Callable, Dict, Generator, Generic, Literal, Optional, TypeVar
 from urllib.parse import urljoin, urlparse
 
 import requests
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from requests import ConnectTimeout, ReadTimeout, RequestException, Response, Session
+from requests.adapters import HTTPAdapter
 from requests_cache import CachedSession
+from requests_cache.backends.base import BaseCache
 from tenacity import (
+    RetryCallState,
     before_sleep_log,
     retry,
     retry_if_exception_type,
@@ -27,7 +36,17 @@ from src.config.config import AuthConfig, ConnectionConfig
 from src.mytardis_client.common_types import HttpRequestMethod
 from src.mytardis_client.endpoint_info import get_endpoint_info
 from src.mytardis_client.endpoints import URI, MyTardisEndpoint
+from src.mytardis_client.flow_control import FlowController
+from src.mytardis_client.metrics import RequestMetrics
+from src.mytardis_client.resilience import (
+    OUTAGE_STATUS_CODES,
+    CircuitBreaker,
+    RetryBudget,
+    is_outage_error,
+)
 from src.mytardis_client.response_data import MyTardisObjectData
+from src.utils.concurrency import SingleFlight
+from src.utils.tracing import span
 from src.utils.types.type_helpers import all_true
 
 # Defines the valid values for the MyTardis API version
@@ -93,6 +112,15 @@ class GetResponse(BaseModel, Generic[T]):
     objects: list[T]
 
 
+@functools.cache
+def get_page_adapter(
+    object_type: type[MyTardisObjectData],
+) -> TypeAdapter[GetResponse[MyTardisObjectData]]:
+    """Get a (cached) adapter which validates a whole page of a GET response, objects
+    included, directly from the JSON bytes using pydantic-core's JSON parser."""
+    return TypeAdapter(GetResponse[object_type])  # type: ignore[valid-type]
+
+
 def sanitize_params(params: dict[str, Any]) -> dict[str, Any]:
     """Apply any necessary cleaning/transformation to a set of query parameters for a GET request.
 
@@ -164,6 +192,94 @@ def has_objects(response: Response) -> bool:
     return False
 
 
+# The maximum number of attempts at each request, budget permitting
+MAX_REQUEST_ATTEMPTS = 8
+
+_log_before_retry = before_sleep_log(logger, logging.INFO)
+_retry_on_transient_error = retry_if_exception_type(
+    (BadGateWayException, ConnectTimeout, ReadTimeout)
+)
+
+
+def _should_retry(retry_state: RetryCallState) -> bool:
+    """Whether a failed call to MyTardisRESTFactory.request should be retried: only
+    for transient errors, and only while the factory's retry budget allows it."""
+    if not _retry_on_transient_error(retry_state):
+        return False
+    if retry_state.attempt_number >= MAX_REQUEST_ATTEMPTS:
+        return False
+    factory = retry_state.args[0] if retry_state.args else None
+    if isinstance(factory, MyTardisRESTFactory):
+        return factory.retry_budget.try_spend()
+    return True
+
+
+def _before_retry_sleep(retry_state: RetryCallState) -> None:
+    """Log an upcoming retry of MyTardisRESTFactory.request, and count it in the
+    factory's metrics."""
+    _log_before_retry(retry_state)
+
+    factory, *args = retry_state.args
+    method = args[0] if len(args) > 0 else retry_state.kwargs.get("method")
+    endpoint = args[1] if len(args) > 1 else retry_state.kwargs.get("endpoint")
+    if isinstance(factory, MyTardisRESTFactory):
+        factory.metrics.record_retry(str(method), str(endpoint))
+
+
+def _make_session(adapter: HTTPAdapter, cache: Optional[BaseCache]) -> Session:
+    """A session sending requests through 'adapter', and caching GET responses in
+    'cache' if given"""
+    # Don't cache datafile responses as they are voluminous and not likely to be reused.
+    session = (
+        CachedSession(
+            backend=cache,
+            expire_after=timedelta(hours=1),
+            allowable_methods=("GET",),
+            filter_fn=all_true([has_objects, endpoint_is_not(("/dataset_file",))]),
+        )
+        if cache is not None
+        else Session()
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@dataclass
+class _RequestState:
+    """The sessions used by a MyTardisRESTFactory, and the state it shares between the
+    requests made through it: the transport settings, flow control and resilience.
+
+    Sessions are not safe to share between threads, so each thread gets its own from
+    'new_session'. They should share the connection pool and response cache.
+    """
+
+    new_session: Callable[[], Session]
+    timeout: int
+    headers: dict[str, str]
+    gzip_min_bytes: Optional[int]
+    flow_control: FlowController
+    retry_budget: RetryBudget
+    circuit_breaker: Optional[CircuitBreaker] = None
+    metrics: RequestMetrics = field(default_factory=RequestMetrics)
+    inflight_gets: SingleFlight[tuple[str, str], Response] = field(init=False)
+    _sessions: threading.local = field(default_factory=threading.local, init=False)
+
+    def __post_init__(self) -> None:
+        # A GET which shares the response of an identical one in flight is counted
+        # as coalesced as soon as it starts waiting
+        self.inflight_gets = SingleFlight(
+            on_shared=lambda key: self.metrics.record_coalesced("GET", key[0])
+        )
+
+    @property
+    def session(self) -> Session:
+        """The session of the calling thread, created on its first request"""
+        if (session := getattr(self._sessions, "session", None)) is None:
+            session = self._sessions.session = self.new_session()
+        return session
+
+
 class MyTardisRESTFactory:
     """Class to interact with MyTardis by calling the REST API
 
@@ -178,7 +294,14 @@ class MyTardisRESTFactory:
             in MyTardis
         proxies: A dictionary containing HTTP(s) proxy addresses when necessary
         verify_certificate: A boolean to determine if SSL certificates should be validated. True
-            unless debugging"""
+            unless debugging
+        metrics: Counters and latency histograms for the requests made by this instance
+        flow_control: The limits on the concurrency and rate of requests made by this
+            instance, shared by all the threads using it
+        circuit_breaker: Pauses all requests while MyTardis appears to be down (None if
+            disabled)
+        retry_budget: The run-wide limit on the number of retries
+    """
 
     user_agent_name = __name__
     user_agent_url = "https://github.com/UoA-eResearch/mytardis_ingestion.git"
@@ -206,6 +329,7 @@ class MyTardisRESTFactory:
         self.auth = auth
         self.proxies = connection.proxy.model_dump() if connection.proxy else None
         self.verify_certificate = connection.verify_certificate
+        self._fields_param = connection.fields_param
 
         self._hostname = connection.hostname
         if not self._hostname.endswith("/"):
@@ -216,19 +340,57 @@ class MyTardisRESTFactory:
 
         self.user_agent = f"{self.user_agent_name}/2.0 ({self.user_agent_url})"
 
-        # Don't cache datafile responses as they are voluminous and not likely to be reused.
-        self._session = (
-            CachedSession(
-                backend="memory",
-                expire_after=timedelta(hours=1),
-                allowable_methods=("GET",),
-                filter_fn=all_true([has_objects, endpoint_is_not(("/dataset_file",))]),
-            )
-            if use_cache
-            else Session()
+        transport = connection.transport
+        adapter = HTTPAdapter(
+            pool_connections=transport.pool_connections,
+            pool_maxsize=transport.pool_maxsize
+            or connection.flow_control.max_concurrency,
+            pool_block=transport.pool_block,
         )
+        # An in-memory response cache, shared by the sessions of all threads
+        cache = BaseCache() if use_cache else None
+        headers = {"Accept-Encoding": transport.accept_encoding}
+        if not transport.keep_alive:
+            headers["Connection"] = "close"
+
+        resilience = connection.resilience
+        self._state = _RequestState(
+            new_session=functools.partial(_make_session, adapter, cache),
+            timeout=request_timeout,
+            headers=headers,
+            gzip_min_bytes=transport.gzip_min_bytes,
+            flow_control=FlowController(connection.flow_control),
+            retry_budget=RetryBudget(resilience.retry_ratio, resilience.min_retries),
+        )
+        if resilience.circuit_breaker:
+            self._state.circuit_breaker = CircuitBreaker(
+                probe=self._probe_health,
+                failure_rate=resilience.failure_rate,
+                window_size=resilience.window_size,
+                min_requests=resilience.min_requests,
+                probe_interval=resilience.probe_interval,
+                max_outage=resilience.max_outage,
+            )
 
-        self._request_timeout = request_timeout
+    @property
+    def metrics(self) -> RequestMetrics:
+        """Counters and latency histograms for the requests made by this instance"""
+        return self._state.metrics
+
+    @property
+    def flow_control(self) -> FlowController:
+        """The limits on the concurrency and rate of requests made by this instance"""
+        return self._state.flow_control
+
+    @property
+    def circuit_breaker(self) -> Optional[CircuitBreaker]:
+        """Pauses all requests while MyTardis appears to be down (None if disabled)"""
+        return self._state.circuit_breaker
+
+    @property
+    def retry_budget(self) -> RetryBudget:
+        """The run-wide limit on the number of retries"""
+        return self._state.retry_budget
 
     @property
     def hostname(self) -> str:
@@ -243,13 +405,27 @@ class MyTardisRESTFactory:
         # Note: it's important here that the base URL ends with a slash and the path does not
         return urljoin(self._url_base, path)
 
+    def _probe_health(self) -> bool:
+        """Check whether MyTardis is answering requests, bypassing the response cache,
+        the flow control and the retries."""
+        try:
+            response = requests.get(
+                self.compose_url("/introspection"),
+                headers={"Accept": "application/json", "User-Agent": self.user_agent},
+                auth=self.auth,
+                verify=self.verify_certificate,
+                proxies=self.proxies,
+                timeout=self._state.timeout,
+            )
+        except RequestException:
+            return False
+        return response.status_code < 500
+
     @retry(
-        retry=retry_if_exception_type(
-            (BadGateWayException, ConnectTimeout, ReadTimeout)
-        ),
+        retry=_should_retry,
         wait=wait_exponential(),
-        stop=stop_after_attempt(8),
-        before_sleep=before_sleep_log(logger, logging.INFO),
+        stop=stop_after_attempt(MAX_REQUEST_ATTEMPTS),
+        before_sleep=_before_retry_sleep,
         reraise=True,
     )
     def request(
@@ -268,12 +444,14 @@ class MyTardisRESTFactory:
 
         502 Bad Gateway error trigger retries, since the proxy web server (eg Nginx or Apache) in
         front of MyTardis could be temporarily restarting. This uses the @backoff decorator and is
-        limited to 8 retries (can be changed in the decorator.
+        limited to 8 retries (can be changed in the decorator), and by the run-wide retry budget.
+        While the circuit breaker is open, the request waits until MyTardis recovers.
 
         Args:
             method: The REST API method, POST, GET etc.
             url: The API URL for the call requested
-            data: A JSON string containing data for generating an object via POST/PUT
+            data: A JSON string containing data for generating an object via POST/PUT. It is
+                sent gzip-compressed if it is larger than the configured threshold
             params: A JSON string of parameters to be passed in the URL
             extra_headers: Extra headers (META) to be passed to the API call
 
@@ -298,20 +476,63 @@ class MyTardisRESTFactory:
             "Accept": "application/json",
             "Content-Type": "application/json",
             "User-Agent": self.user_agent,
+            **self._state.headers,
         }
+
+        body: Optional[bytes] = data.encode("utf-8") if data else None
+        if (
+            body is not None
+            and self._state.gzip_min_bytes is not None
+            and len(body) >= self._state.gzip_min_bytes
+        ):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
         if extra_headers:
             headers = {**headers, **extra_headers}
 
-        response = self._session.request(
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+        self.retry_budget.record_request()
+
+        start_time = time.perf_counter()
+        try:
+            with self.flow_control.slot() as outcome, span(
+                "http", method=method, endpoint=endpoint
+            ):
+                response = self._state.session.request(
+                    method,
+                    url,
+                    data=body,
+                    params=params,
+                    headers=headers,
+                    auth=self.auth,
+                    verify=self.verify_certificate,
+                    proxies=self.proxies,
+                    timeout=self._state.timeout,
+                )
+                outcome.status_code = response.status_code
+        except RequestException as error:
+            self.metrics.record_failure(
+                method, endpoint, time.perf_counter() - start_time, error
+            )
+            if self.circuit_breaker is not None and is_outage_error(error):
+                self.circuit_breaker.record(success=False)
+            raise
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(
+                success=response.status_code not in OUTAGE_STATUS_CODES
+            )
+
+        self.metrics.record_request(
             method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            auth=self.auth,
-            verify=self.verify_certificate,
-            proxies=self.proxies,
-            timeout=self._request_timeout,
+            endpoint,
+            latency=time.perf_counter() - start_time,
+            status_code=response.status_code,
+            bytes_sent=len(body) if body else 0,
+            bytes_received=len(response.content or b""),
+            from_cache=getattr(response, "from_cache", False),
         )
 
         if response.status_code == 502:
@@ -320,41 +541,63 @@ class MyTardisRESTFactory:
 
         return response
 
-    def get(
+    def _request_page(
         self,
         endpoint: MyTardisEndpoint,
-        query_params: Optional[dict[str, Any]] = None,
-        meta_params: Optional[GetRequestMetaParams] = None,
-    ) -> tuple[list[MyTardisObjectData], GetResponseMeta]:
-        """Submit a GET request to the MyTardis API and return the response as a list of objects.
+        query_params: Optional[dict[str, Any]],
+        meta_params: Optional[GetRequestMetaParams],
+        fields: Optional[list[str]] = None,
+    ) -> Response:
+        """Submit a GET request for a page of objects from 'endpoint'.
 
-        Note that the response is paginated, so the function may not return all objects matching
-        'query_params'. The 'meta_params' argument can be used to control the number of results
-        returned. To get all objects matching 'query_params', use the 'get_all()' method.
+        If 'fields' is given, and the MyTardis instance supports it, only those fields
+        of each object are requested. Concurrent requests for the same page are
+        coalesced into one.
         """
 
         endpoint_info = get_endpoint_info(endpoint)
         if endpoint_info.methods.GET is None:
             raise RuntimeError(f"GET method not supported for endpoint '{endpoint}'")
 
-        params = query_params
+        params = dict(query_params) if query_params is not None else None
 
         if meta_params is not None:
             params = params or {}
             params |= meta_params.model_dump()
 
-        response_data = self.request(
-            "GET",
+        if fields is not None and self._fields_param is not None:
+            params = params or {}
+            params[self._fields_param] = ",".join(fields)
+
+        # Identical GETs in flight at the same time share one request and its response
+        key = (
             endpoint,
-            params=params,
+            json.dumps(
+                sanitize_params(params) if params else None, sort_keys=True, default=str
+            ),
+        )
+        response, _ = self._state.inflight_gets.do(
+            key,
+            lambda: self.request(
+                "GET",
+                endpoint,
+                params=params,
+            ),
         )
+        return response
+
+    def _decode_page(
+        self,
+        response: Response,
+        endpoint: MyTardisEndpoint,
+        query_params: Optional[dict[str, Any]],
+    ) -> tuple[list[dict[str, Any]], GetResponseMeta]:
+        """Decode the JSON of a page of objects, without validating the objects"""
 
-        response_json = response_data.json()
+        response_json = response.json()
 
         response_meta = GetResponseMeta.model_validate(response_json["meta"])
 
-        objects: list[MyTardisObjectData] = []
-
         response_objects = response_json.get("objects")
         if response_objects is None:
             raise RuntimeError(
@@ -364,28 +607,127 @@ class MyTardisRESTFactory:
                 f"Response: {response_json}"
             )
 
-        object_type = endpoint_info.methods.GET.response_obj_type
-
         if not isinstance(response_objects, list):
             response_objects = [response_objects]
 
-        for object_json in response_objects:
-            obj = object_type.model_validate(object_json)
-            objects.append(obj)
+        return response_objects, response_meta
+
+    def get_json(
+        self,
+        endpoint: MyTardisEndpoint,
+        query_params: Optional[dict[str, Any]] = None,
+        meta_params: Optional[GetRequestMetaParams] = None,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], GetResponseMeta]:
+        """Submit a GET request to the MyTardis API and return the objects in the response
+        as decoded, unvalidated JSON.
+
+        This is useful when only a few fields of each object are needed, as it avoids
+        validating the full objects. 'fields' lists the fields needed, which restricts
+        the response to them if the server supports it (see ConnectionConfig.fields_param),
+        but callers must tolerate other fields being present. See 'get()' for the
+        pagination parameters.
+        """
+
+        response = self._request_page(endpoint, query_params, meta_params, fields)
+        return self._decode_page(response, endpoint, query_params)
+
+    def get(
+        self,
+        endpoint: MyTardisEndpoint,
+        query_params: Optional[dict[str, Any]] = None,
+        meta_params: Optional[GetRequestMetaParams] = None,
+        partial: Optional[type[MyTardisObjectData]] = None,
+    ) -> tuple[list[MyTardisObjectData], GetResponseMeta]:
+        """Submit a GET request to the MyTardis API and return the response as a list of objects.
+
+        Note that the response is paginated, so the function may not return all objects matching
+        'query_params'. The 'meta_params' argument can be used to control the number of results
+        returned. To get all objects matching 'query_params', use the 'get_all()' method.
+
+        If a partial model (such as IngestedDatafileMatchKeys) is given in 'partial', the
+        objects are returned as instances of it, and only its fields are requested from
+        MyTardis if it supports that.
+        """
+
+        endpoint_info = get_endpoint_info(endpoint)
+        if endpoint_info.methods.GET is None:
+            raise RuntimeError(f"GET method not supported for endpoint '{endpoint}'")
+
+        object_type = partial or endpoint_info.methods.GET.response_obj_type
+        fields = list(partial.model_fields) if partial is not None else None
+
+        response = self._request_page(endpoint, query_params, meta_params, fields)
+
+        with span("validate"):
+            try:
+                page = get_page_adapter(object_type).validate_json(response.content)
+                return list(page.objects), page.meta
+            except ValidationError:
+                logger.debug(
+                    "Validating page from %s failed. Validating objects one by one.",
+                    endpoint,
+                )
+
+            # Slower, but handles single objects and gives clearer errors
+            response_objects, response_meta = self._decode_page(
+                response, endpoint, query_params
+            )
+            objects: list[MyTardisObjectData] = [
+                object_type.model_validate(object_json)
+                for object_json in response_objects
+            ]
 
         return objects, response_meta
 
+    def iter_json_pages(
+        self,
+        endpoint: MyTardisEndpoint,
+        query_params: Optional[dict[str, Any]] = None,
+        batch_size: int = 500,
+        fields: Optional[list[str]] = None,
+    ) -> Generator[tuple[list[dict[str, Any]], GetResponseMeta], None, None]:
+        """Iterate over the pages of all objects that match 'query_params', as decoded,
+        unvalidated JSON.
+
+        Pages are requested one at a time, as the iteration proceeds, so only one page
+        needs to be held in memory. See 'get_json()' for 'fields'.
+        """
+
+        num_objects = 0
+
+        while True:
+            request_meta = GetRequestMetaParams(limit=batch_size, offset=num_objects)
+
+            page, response_meta = self.get_json(
+                endpoint=endpoint,
+                query_params=query_params,
+                meta_params=request_meta,
+                fields=fields,
+            )
+            num_objects += len(page)
+
+            yield page, response_meta
+
+            # The server may cap the page size below the requested batch size
+            last_page = not page or len(page) < min(batch_size, response_meta.limit)
+            got_all_objects = num_objects >= response_meta.total_count
+
+            if last_page or got_all_objects:
+                break
+
     def get_all(
         self,
         endpoint: MyTardisEndpoint,
         query_params: Optional[dict[str, Any]] = None,
         batch_size: int = 500,
+        partial: Optional[type[MyTardisObjectData]] = None,
     ) -> tuple[list[MyTardisObjectData], int]:
         """Get all objects of the given type that match 'query_params'.
 
         Sends repeated GET requests to the MyTardis API until all objects have been retrieved.
         The 'batch_size' argument can be used to control the number of objects retrieved in
-        each request
+        each request. See 'get()' for 'partial'.
         """
 
         objects: list[MyTardisObjectData] = []
@@ -397,11 +739,15 @@ class MyTardisRESTFactory:
                 endpoint=endpoint,
                 query_params=query_params,
                 meta_params=request_meta,
+                partial=partial,
             )
 
             objects.extend(batch_objects)
 
-            last_page = len(batch_objects) < batch_size
+            # The server may cap the page size below the requested batch size
+            last_page = not batch_objects or len(batch_objects) < min(
+                batch_size, response_meta.limit
+            )
             got_all_objects = len(objects) >= response_meta.total_count
 
             if last_page or got_all_objects:
@@ -411,5 +757,5 @@ class MyTardisRESTFactory:
 
     def clear_cache(self) -> None:
         """Clear the cache of the requests session"""
-        if isinstance(self._session, CachedSession):
-            self._session.cache.clear()  # type: ignore[no-untyped-call]
+        if isinstance(self._state.session, CachedSession):
+            self._state.session.cache.clear()  # type: ignore[no-untyped-call]
@@ -0,0 +1,227 @@
+"""Protection of ingestion runs against MyTardis outages.
+
+Retrying each failed request with exponential backoff copes well with brief blips, but
+during an outage every request works through its whole backoff ladder before failing,
+and a run can stall for hours without progress. Two run-wide mechanisms, shared by all
+the threads making requests through a MyTardisRESTFactory, bound that:
+
+- a CircuitBreaker, which opens when too many recent requests have failed, pauses all
+  requests, and probes the health of the server until it recovers;
+- a RetryBudget, which caps the number of retries to a proportion of the requests made.
+
+Only failures which suggest MyTardis is down or overloaded count towards opening the
+circuit: connection errors, timeouts, and the statuses in OUTAGE_STATUS_CODES. Other
+errors, such as a 500 for a malformed object, show the server is up.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from enum import Enum
+from typing import Optional
+
+from requests import RequestException
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+logger = logging.getLogger(__name__)
+
+# Statuses with which MyTardis, or a proxy in front of it, reports being unavailable
+OUTAGE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+def is_outage_error(error: RequestException) -> bool:
+    """Whether 'error' suggests that MyTardis is unreachable"""
+    return isinstance(error, (RequestsConnectionError, Timeout))
+
+
+class CircuitOpenError(RequestException):
+    """Raised for requests made while MyTardis has been unreachable for longer than the
+    configured maximum outage."""
+
+
+class CircuitState(str, Enum):
+    """The states of a CircuitBreaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """A thread-safe circuit breaker for the requests to a server.
+
+    While closed, the outcomes of the last 'window_size' requests are kept. Once there
+    are at least 'min_requests' of them and the proportion which failed reaches
+    'failure_rate', the circuit opens. Threads about to make a request then wait, and
+    every 'probe_interval' seconds one of them calls 'probe' to check the health of the
+    server. When a probe succeeds the circuit closes and the waiting threads resume.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        probe: Callable[[], bool],
+        failure_rate: float = 0.5,
+        window_size: int = 20,
+        min_requests: int = 10,
+        probe_interval: float = 30.0,
+        max_outage: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.probe = probe
+        self.failure_rate = failure_rate
+        self.min_requests = min(min_requests, window_size)
+        self.probe_interval = probe_interval
+        self.max_outage = max_outage
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._next_probe = 0.0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state of the circuit"""
+        return self._state
+
+    def _open(self, now: float) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = now
+        self._next_probe = now + self.probe_interval
+        self.times_opened += 1
+        logger.warning(
+            "%d of the last %d requests to MyTardis failed. Pausing requests and "
+            "checking the server every %.0fs until it recovers",
+            self._outcomes.count(False),
+            len(self._outcomes),
+            self.probe_interval,
+        )
+
+    def _close(self, now: float) -> None:
+        self._state = CircuitState.CLOSED
+        self._outcomes.clear()
+        logger.warning(
+            "MyTardis is reachable again after %.0fs. Resuming requests",
+            now - self._opened_at,
+        )
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a request"""
+        with self._condition:
+            # Requests which were in flight when the circuit opened say nothing new
+            if self._state is not CircuitState.CLOSED:
+                return
+
+            self._outcomes.append(success)
+            if len(self._outcomes) < self.min_requests:
+                return
+            failures = self._outcomes.count(False)
+            if failures / len(self._outcomes) >= self.failure_rate:
+                self._open(self._clock())
+
+    def _run_probe(self) -> bool:
+        try:
+            return self.probe()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.debug("Health probe of MyTardis failed", exc_info=True)
+            return False
+
+    def before_request(self) -> None:
+        """Wait until requests are allowed, probing the server if it is this thread's
+        turn to.
+
+        Raises:
+            CircuitOpenError: if the circuit has been open for longer than 'max_outage'
+        """
+        while True:
+            with self._condition:
+                while True:
+                    if self._state is CircuitState.CLOSED:
+                        return
+
+                    now = self._clock()
+                    deadline = (
+                        self._opened_at + self.max_outage
+                        if self.max_outage is not None
+                        else None
+                    )
+                    if deadline is not None and now >= deadline:
+                        raise CircuitOpenError(
+                            f"MyTardis has been unreachable for over {self.max_outage}s"
+                        )
+
+                    if self._state is CircuitState.OPEN and now >= self._next_probe:
+                        self._state = CircuitState.HALF_OPEN
+                        break
+
+                    # Another thread is probing, or the next probe is not yet due
+                    wake_at = (
+                        self._next_probe
+                        if self._state is CircuitState.OPEN
+                        else now + self.probe_interval
+                    )
+                    if deadline is not None:
+                        wake_at = min(wake_at, deadline)
+                    self._condition.wait(timeout=max(wake_at - now, 0.0))
+
+            healthy = self._run_probe()
+
+            with self._condition:
+                now = self._clock()
+                if healthy:
+                    self._close(now)
+                else:
+                    self._state = CircuitState.OPEN
+                    self._next_probe = now + self.probe_interval
+                self._condition.notify_all()
+
+
+class RetryBudget:
+    """A thread-safe, run-wide limit on the number of retries.
+
+    Allows 'minimum' retries plus 'ratio' retries for each request made, so that during
+    an outage retries cannot multiply the time and load of a run.
+    """
+
+    def __init__(self, ratio: float, minimum: int) -> None:
+        self.ratio = ratio
+        self.minimum = minimum
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._exhausted_logged = False
+
+    @property
+    def remaining(self) -> int:
+        """The number of retries currently allowed"""
+        with self._lock:
+            return self._remaining()
+
+    def _remaining(self) -> int:
+        return max(int(self.minimum + self.ratio * self._requests) - self._retries, 0)
+
+    def record_request(self) -> None:
+        """Record that a request was made, adding to the budget"""
+        with self._lock:
+            self._requests += 1
+
+    def try_spend(self) -> bool:
+        """Take a retry from the budget, returning False if none are left"""
+        with self._lock:
+            if self._remaining() > 0:
+                self._retries += 1
+                self._exhausted_logged = False
+                return True
+            if not self._exhausted_logged:
+                self._exhausted_logged = True
+                logger.warning(
+                    "The retry budget is exhausted (%d retries for %d requests). "
+                    "Failed requests will not be retried until more succeed",
+                    self._retries,
+                    self._requests,
+                )
+            return False
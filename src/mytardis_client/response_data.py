@@ -4,7 +4,14 @@ from abc import abstractmethod
 from pathlib import Path
 from typing import Any, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_serializer, model_validator
+from pydantic import (
+    AliasChoices,
+    BaseModel,
+    ConfigDict,
+    Field,
+    field_serializer,
+    model_validator,
+)
 from typing_extensions import Self
 
 from src.mytardis_client.common_types import (
@@ -145,11 +152,15 @@ class ParameterName(MyTardisObjectData):
     def mytardis_type(self) -> MyTardisObject:
         return MyTardisObject.PARAMETER_NAME
 
+    data_type: Optional[int] = None
     full_name: str
     immutable: bool
     is_searchable: bool
     name: str
-    parent_schema: URI = Field(serialization_alias="schema")
+    parent_schema: URI = Field(
+        validation_alias=AliasChoices("schema", "parent_schema"),
+        serialization_alias="schema",
+    )
     sensitive: bool
     units: str
 
@@ -309,6 +320,29 @@ class IngestedDataset(MyTardisObjectData):
     public_access: bool
 
 
+class IngestedDatafileMatchKeys(MyTardisObjectData):
+    """The fields of an ingested datafile which are needed to match it to a local file.
+
+    A partial model of '/dataset_file' objects: it validates both complete objects and
+    ones where the server has returned only these fields.
+    """
+
+    @property
+    def mytardis_type(self) -> MyTardisObject:
+        return MyTardisObject.DATAFILE
+
+    dataset: URI
+    directory: Path
+    filename: str
+
+
+class IngestedDatafileStatus(IngestedDatafileMatchKeys):
+    """The fields of an ingested datafile which are needed to check whether it has been
+    transferred and verified. A partial model of '/dataset_file' objects."""
+
+    replicas: list[Replica]
+
+
 class IngestedDatafile(MyTardisObjectData):
     """Metadata associated with a datafile that has been ingested into MyTardis."""
 
@@ -0,0 +1,110 @@
+"""A compact index of the datafiles in MyTardis datasets, for checking whether a
+datafile has already been ingested."""
+
+import logging
+import threading
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from src.mytardis_client.endpoints import URI, resource_uri_to_id
+
+logger = logging.getLogger(__name__)
+
+# The fields of '/dataset_file' objects read by the index
+INDEX_FIELDS = ["id", "directory", "filename"]
+
+
+def _dataset_id(dataset: URI | str | int) -> int:
+    if isinstance(dataset, URI):
+        return dataset.id
+    if isinstance(dataset, str):
+        return resource_uri_to_id(dataset)
+    return dataset
+
+
+def datafile_path_key(directory: Any, filename: str) -> str:
+    """The key of a datafile within its dataset: its POSIX path, relative to the dataset.
+
+    'directory' may be a path, a string, or None for datafiles at the top of the dataset.
+    """
+    directory_str = (
+        directory.as_posix() if hasattr(directory, "as_posix") else directory
+    )
+    if not directory_str or directory_str == ".":
+        return filename
+    return f"{directory_str.rstrip('/')}/{filename}"
+
+
+class DatafileIndex:
+    """Maps the (dataset, directory, filename) match keys of ingested datafiles to their IDs.
+
+    Only the path of each datafile and its ID are kept, rather than the full datafile
+    objects, so that datasets with hundreds of thousands of files can be indexed cheaply.
+    The index is built from the raw JSON of the datafiles, without validating them.
+    It may be used from several threads at once.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._datasets: dict[int, dict[str, int]] = {}
+
+    def add_dataset(
+        self, dataset: URI | str | int, datafiles: Iterable[Mapping[str, Any]]
+    ) -> int:
+        """Index the datafiles of a dataset, given as MyTardis JSON objects.
+
+        The dataset is marked as indexed even if it has no datafiles. Returns the number
+        of datafiles added.
+        """
+        # Built aside, so that the dataset is only seen as indexed once it is complete
+        new_paths = {
+            datafile_path_key(datafile.get("directory"), datafile["filename"]): int(
+                datafile["id"]
+            )
+            for datafile in datafiles
+        }
+        with self._lock:
+            paths = self._datasets.get(_dataset_id(dataset), {})
+            num_before = len(paths)
+            paths = self._datasets[_dataset_id(dataset)] = paths | new_paths
+            return len(paths) - num_before
+
+    def remove_dataset(self, dataset: URI | str | int) -> None:
+        """Forget the datafiles of a dataset, so that they are fetched again"""
+        with self._lock:
+            self._datasets.pop(_dataset_id(dataset), None)
+
+    def clear(self) -> None:
+        """Forget the datafiles of every dataset"""
+        with self._lock:
+            self._datasets.clear()
+
+    def has_dataset(self, dataset: URI | str | int) -> bool:
+        """Whether the datafiles of 'dataset' have been indexed"""
+        with self._lock:
+            return _dataset_id(dataset) in self._datasets
+
+    def get(
+        self, dataset: URI | str | int, directory: Any, filename: str
+    ) -> int | None:
+        """Get the ID of the datafile with the given match keys, or None if it is not in
+        the index"""
+        with self._lock:
+            paths = self._datasets.get(_dataset_id(dataset))
+        if paths is None:
+            return None
+        return paths.get(datafile_path_key(directory, filename))
+
+    def paths(self, dataset: URI | str | int) -> Mapping[str, int]:
+        """The paths (see 'datafile_path_key') and IDs of the datafiles of a dataset"""
+        with self._lock:
+            return self._datasets.get(_dataset_id(dataset), {})
+
+    def missing_paths(self, dataset: URI | str | int, paths: Iterable[str]) -> set[str]:
+        """The paths (see 'datafile_path_key') which are not among the indexed datafiles
+        of 'dataset', found with a single set difference"""
+        return set(paths).difference(self.paths(dataset).keys())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(paths) for paths in self._datasets.values())
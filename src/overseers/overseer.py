@@ -1,18 +1,32 @@
-# pylint: disable=logging-fstring-interpolation,pointless-string-statement
+# pylint: disable=pointless-string-statement
 """Defines Overseer class which is a class that inspects MyTardis
 for the Forge class."""
 
 import logging
-from collections.abc import Generator
-from typing import Any
+import threading
+from collections.abc import Generator, Hashable, Mapping
+from pathlib import Path, PurePath
+from typing import Any, Optional, TypeAlias
 
 from typeguard import check_type
 
+from src.blueprints.datafile import Datafile
 from src.mytardis_client.endpoint_info import get_endpoint_info
-from src.mytardis_client.endpoints import URI, MyTardisEndpoint
+from src.mytardis_client.endpoints import (
+    URI,
+    MyTardisEndpoint,
+    resource_uri_to_id,
+    uri_regex,
+)
+from src.mytardis_client.metrics import CacheStats, RequestMetrics
 from src.mytardis_client.mt_rest import MyTardisRESTFactory
 from src.mytardis_client.objects import MyTardisObject, get_type_info
 from src.mytardis_client.response_data import MyTardisIntrospection, MyTardisObjectData
+from src.overseers.datafile_index import (
+    INDEX_FIELDS,
+    DatafileIndex,
+    datafile_path_key,
+)
 from src.utils.container import lazyjoin
 from src.utils.types.type_helpers import is_list_of
 
@@ -38,6 +52,11 @@ _DEFAULT_ENDPOINTS: dict[MyTardisObject, MyTardisEndpoint] = {
 }
 
 
+# Endpoints whose lookups are only cached if they are prefetched: datafiles are looked
+# up in the datafile index instead, as there are too many to cache whole objects for
+_UNCACHED_ENDPOINTS: frozenset[MyTardisEndpoint] = frozenset({"/dataset_file"})
+
+
 def get_default_endpoint(object_type: MyTardisObject) -> MyTardisEndpoint:
     """Return the default MyTardis endpoint to POST to for the given object type.
 
@@ -67,52 +86,114 @@ def extract_values_for_matching(
     return match_keys
 
 
+CacheKey: TypeAlias = tuple[tuple[str, Hashable], ...]
+
+
+def _canonical_value(  # pylint: disable=too-many-return-statements
+    value: Any,
+) -> Hashable:
+    """Convert a match value to a hashable form which does not depend on how the value
+    was produced: URIs (or nested objects with a resource URI) become IDs, paths become
+    POSIX strings and collections become sorted tuples."""
+    if isinstance(value, URI):
+        return value.id
+    if isinstance(value, str):
+        return resource_uri_to_id(value) if uri_regex.match(value) else value
+    if isinstance(value, PurePath):
+        return value.as_posix()
+    if isinstance(value, Mapping):
+        if "resource_uri" in value:
+            return _canonical_value(value["resource_uri"])
+        return tuple(sorted((k, _canonical_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted((_canonical_value(v) for v in value), key=repr))
+    if isinstance(value, Hashable):
+        return value
+    return repr(value)
+
+
+def canonical_key(keys: dict[str, Any]) -> CacheKey:
+    """Convert match keys to a cache key which is independent of the order of the fields
+    and of the representation of their values"""
+    return tuple(
+        sorted((field, _canonical_value(value)) for field, value in keys.items())
+    )
+
+
 class MyTardisEndpointCache:
-    """A cache for URIs and objects from a specific MyTardis endpoint"""
+    """A cache for URIs and objects from a specific MyTardis endpoint
+
+    Objects are indexed separately for each match strategy, i.e. each set of fields
+    that objects are matched on (for example identifiers, or the type's match fields).
+    Lookups are counted in 'metrics', usually those of the REST client, by match
+    strategy. The cache may be used from several threads at once.
+    """
 
-    def __init__(self, endpoint: MyTardisEndpoint) -> None:
+    def __init__(
+        self, endpoint: MyTardisEndpoint, metrics: Optional[RequestMetrics] = None
+    ) -> None:
         self.endpoint = endpoint
-        self._objects: list[list[MyTardisObjectData]] = []
-        self._index: dict[tuple[tuple[str, Any], ...], int] = {}
+        self._metrics = metrics or RequestMetrics()
+        self._lock = threading.Lock()
+        self._indexes: dict[
+            tuple[str, ...], dict[CacheKey, list[MyTardisObjectData]]
+        ] = {}
 
-    def _to_hashable(self, keys: dict[str, Any]) -> tuple[tuple[str, Any], ...]:
-        return tuple(keys.items())
+    def _index(self, keys: dict[str, Any]) -> dict[CacheKey, list[MyTardisObjectData]]:
+        return self._indexes.setdefault(tuple(sorted(keys)), {})
 
     def emplace(self, keys: dict[str, Any], objects: list[MyTardisObjectData]) -> None:
         """Add objects to the cache"""
-        hashable_keys = self._to_hashable(keys)
-
-        if index := self._index.get(hashable_keys):
+        cache_key = canonical_key(keys)
+        with self._lock:
+            index = self._index(keys)
+            if (cached := index.get(cache_key)) is not None:
+                # Replaced rather than extended, as readers may hold the old list
+                index[cache_key] = cached + objects
+            else:
+                index[cache_key] = list(objects)
+
+        if cached is not None:
             logger.warning(
                 "Cache entry already exists for keys: %s. Merging values.",
-                hashable_keys,
+                cache_key,
             )
-            self._objects[index].extend(objects)
-        else:
-            self._index[hashable_keys] = len(self._objects)
-            self._objects.append(objects)
 
         logger.debug(
             "Cache entry added. key: %s, objects: %s",
-            hashable_keys,
+            cache_key,
             lazyjoin(", ", (obj.resource_uri for obj in objects)),
         )
 
     def get(self, keys: dict[str, Any]) -> list[MyTardisObjectData] | None:
         """Get objects from the cache"""
-        hashable_keys = self._to_hashable(keys)
-        object_index = self._index.get(hashable_keys)
-        if object_index is not None:
+        cache_key = canonical_key(keys)
+        with self._lock:
+            objects = self._index(keys).get(cache_key)
+        self._metrics.record_overseer_cache_lookup(
+            self.endpoint, hit=objects is not None, strategy="+".join(sorted(keys))
+        )
+        if objects is not None:
             logger.debug(
                 "Cache hit. keys: %s, objects: %s",
-                hashable_keys,
-                [obj.resource_uri for obj in self._objects[object_index]],
+                cache_key,
+                lazyjoin(", ", (obj.resource_uri for obj in objects)),
             )
-            return self._objects[object_index]
+            return objects
 
-        logger.debug("Cache miss. keys: %s", hashable_keys)
+        logger.debug("Cache miss. keys: %s", cache_key)
         return None
 
+    def __len__(self) -> int:
+        """The number of keys cached, over all match strategies"""
+        with self._lock:
+            return sum(len(index) for index in self._indexes.values())
+
+    @property
+    def stats(self) -> dict[str, CacheStats]:
+        """Hit/miss statistics for each match strategy, keyed by the matched fields"""
+        return self._metrics.overseer_cache_strategies(self.endpoint)
+
 
 class Overseer:
     """The Overseer class inspects MyTardis
@@ -150,13 +231,23 @@ class Overseer:
         """
         self.rest_factory = rest_factory
 
+        # Guards the lazily created state below, as workers share the Overseer
+        self._lock = threading.Lock()
         self._cache: dict[MyTardisEndpoint, MyTardisEndpointCache] = {}
+        self._datafile_index = DatafileIndex()
+
+    @property
+    def datafile_index(self) -> DatafileIndex:
+        """The compact index of datafiles populated by 'prefetch_datafiles()'"""
+        return self._datafile_index
 
     @property
     def mytardis_setup(self) -> MyTardisIntrospection:
         """Getter for mytardis_setup. Sends API request on first call and caches the result"""
         if self._mytardis_setup is None:
-            self._mytardis_setup = self.fetch_mytardis_setup()
+            with self._lock:
+                if self._mytardis_setup is None:
+                    self._mytardis_setup = self.fetch_mytardis_setup()
         return self._mytardis_setup
 
     def check_identifiers_enabled_for_type(self, object_type: MyTardisObject) -> None:
@@ -200,13 +291,22 @@ class Overseer:
         object_type: MyTardisObject,
         query_params: dict[str, str],
     ) -> list[MyTardisObjectData]:
-        """Get objects from MyTardis that match the given query parameters"""
+        """Get objects from MyTardis that match the given query parameters.
+
+        The objects found are cached under the query parameters, so that looking them
+        up again, by the same identifier or match fields, doesn't query MyTardis. A
+        lookup which finds nothing is not cached, as the object may be created later.
+        """
 
         endpoint = get_default_endpoint(object_type)
 
-        if self._cache.get(endpoint):
-            if objects := self._cache[endpoint].get(query_params):
-                return objects
+        cache = (
+            self._cache.get(endpoint)
+            if endpoint in _UNCACHED_ENDPOINTS
+            else self._endpoint_cache(endpoint)
+        )
+        if cache is not None and (objects := cache.get(query_params)):
+            return objects
 
         try:
             objects, _ = self.rest_factory.get(endpoint, query_params)
@@ -216,8 +316,20 @@ class Overseer:
                 f"Object type: {object_type}. Query: {query_params}"
             ) from error
 
+        if objects and endpoint not in _UNCACHED_ENDPOINTS:
+            self._endpoint_cache(endpoint).emplace(query_params, objects)
+
         return objects
 
+    def _endpoint_cache(self, endpoint: MyTardisEndpoint) -> MyTardisEndpointCache:
+        """The cache of the objects of 'endpoint', created on first use"""
+        with self._lock:
+            if (cache := self._cache.get(endpoint)) is None:
+                cache = self._cache[endpoint] = MyTardisEndpointCache(
+                    endpoint, self.rest_factory.metrics
+                )
+            return cache
+
     def prefetch(
         self,
         endpoint: MyTardisEndpoint,
@@ -232,10 +344,9 @@ class Overseer:
         if endpoint_info.methods.GET is None:
             raise ValueError(f"Endpoint {endpoint} does not support GET requests")
 
-        logger.info(f"Prefetching from {endpoint} with query params {query_params}")
+        logger.info("Prefetching from %s with query params %s", endpoint, query_params)
 
-        if self._cache.get(endpoint) is None:
-            self._cache[endpoint] = MyTardisEndpointCache(endpoint)
+        cache = self._endpoint_cache(endpoint)
 
         objects, _ = self.rest_factory.get_all(endpoint, query_params)
 
@@ -252,12 +363,100 @@ class Overseer:
             matchers = self.generate_object_matchers(mt_type, obj.model_dump())
 
             for keys in matchers:
-                self._cache[endpoint].emplace(keys, [obj])
+                cache.emplace(keys, [obj])
 
-        logger.info(f"Prefetched {len(objects)} objects from {endpoint}")
+        logger.info("Prefetched %d objects from %s", len(objects), endpoint)
 
         return len(objects)
 
+    def prefetch_datafiles(self, dataset: URI) -> int:
+        """Populate the compact datafile index with the datafiles of 'dataset'.
+
+        Unlike 'prefetch()', only the match keys and ID of each datafile are kept, and
+        they are read from the raw JSON of the response without validating the objects.
+
+        Returns the number of datafiles prefetched. The dataset is only indexed once
+        every page has been fetched, so that if one fails, the dataset is not taken to
+        hold just the datafiles fetched before it.
+        """
+
+        logger.info("Prefetching datafile index for dataset %s", dataset)
+
+        datafiles: list[dict[str, Any]] = []
+        for page, _ in self.rest_factory.iter_json_pages(
+            "/dataset_file", {"dataset": dataset}, fields=INDEX_FIELDS
+        ):
+            datafiles.extend(page)
+        num_objects = self._datafile_index.add_dataset(dataset, datafiles)
+
+        logger.info("Prefetched %d datafiles for dataset %s", num_objects, dataset)
+
+        return num_objects
+
+    def get_datafile_uri(
+        self, dataset: URI, directory: Path | None, filename: str
+    ) -> URI | None:
+        """Get the URI of the ingested datafile with the given match keys, if any.
+
+        If the datasets's datafiles have been prefetched with 'prefetch_datafiles()',
+        the answer comes from the datafile index, and a datafile missing from it is
+        taken not to exist. Otherwise MyTardis is queried.
+        """
+        if self._datafile_index.has_dataset(dataset):
+            datafile_id = self._datafile_index.get(dataset, directory, filename)
+            self.rest_factory.metrics.record_overseer_cache_lookup(
+                "/dataset_file", hit=datafile_id is not None
+            )
+            if datafile_id is None:
+                return None
+            return URI(f"/api/v1/dataset_file/{datafile_id}/")
+
+        match_keys: dict[str, Any] = {
+            "filename": filename,
+            "directory": directory.as_posix() if directory else None,
+            "dataset": dataset,
+        }
+        objects = self.get_matching_objects(MyTardisObject.DATAFILE, match_keys)
+        return objects[0].resource_uri if objects else None
+
+    def split_ingested_datafiles(
+        self, dataset: URI, datafiles: list[Datafile]
+    ) -> tuple[list[Datafile], list[Datafile]]:
+        """Split the datafiles of 'dataset' into those not yet in MyTardis, and those
+        already ingested.
+
+        The dataset's datafiles are prefetched into the datafile index if they haven't
+        been, and the paths of 'datafiles' are checked against it with a single set
+        difference, rather than a lookup per datafile. Both lists keep the order of
+        'datafiles'.
+        """
+        if not self._datafile_index.has_dataset(dataset):
+            self.prefetch_datafiles(dataset)
+
+        paths = [
+            datafile_path_key(datafile.directory, datafile.filename)
+            for datafile in datafiles
+        ]
+        missing = self._datafile_index.missing_paths(dataset, paths)
+
+        new_datafiles: list[Datafile] = []
+        ingested_datafiles: list[Datafile] = []
+        for datafile, path in zip(datafiles, paths):
+            if path in missing:
+                new_datafiles.append(datafile)
+            else:
+                ingested_datafiles.append(datafile)
+
+        metrics = self.rest_factory.metrics
+        metrics.record_overseer_cache_lookup(
+            "/dataset_file", hit=True, count=len(ingested_datafiles)
+        )
+        metrics.record_overseer_cache_lookup(
+            "/dataset_file", hit=False, count=len(new_datafiles)
+        )
+
+        return new_datafiles, ingested_datafiles
+
     def get_matching_objects(
         self,
         object_type: MyTardisObject,
@@ -6,3 +6,4 @@ ABI_MUSIC_POSTPROCESSING_INSTRUMENT = "abi-music-post-processing-v1"
 
 ABI_MUSIC_DATASET_RAW_SCHEMA = "http://abi-music.com/dataset-raw/1"
 ABI_MUSIC_DATASET_ZARR_SCHEMA = "http://abi-music.com/dataset-zarr/1"
+ABI_MUSIC_DATAFILE_ARCHIVE_SCHEMA = "http://abi-music.com/datafile-archive/1"
@@ -7,8 +7,9 @@ import logging
 import mimetypes
 import re
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Any, Mapping
+from typing import Any, Mapping, Optional
 
 from slugify import slugify
 
@@ -19,6 +20,7 @@ from src.blueprints.experiment import RawExperiment
 from src.blueprints.project import RawProject
 from src.extraction.manifest import IngestionManifest
 from src.extraction.metadata_extractor import IMetadataExtractor
+from src.extraction.packing import ARCHIVE_SUFFIX, PackingOptions, pack_directory
 from src.mytardis_client.common_types import DataClassification, MTUrl
 from src.profiles.abi_music.abi_music_consts import (
     ABI_MUSIC_DATASET_RAW_SCHEMA,
@@ -343,12 +345,24 @@ def parse_raw_data(
 
 
 def parse_zarr_data(
-    root: DirectoryNode, file_filter: filters.PathFilterSet
+    root: DirectoryNode,
+    file_filter: filters.PathFilterSet,
+    packing: Optional[PackingOptions] = None,
+    staging_dir: Optional[Path] = None,
 ) -> IngestionManifest:
     """
     Parse the directory containing the derived/post-processed Zarr data
+
+    If `packing` is given, the small chunk files of each Zarr store are packed into
+    a single archive datafile in `staging_dir`, rather than being ingested one by one.
     """
-    manifest = IngestionManifest(source_data_root=root.path())
+    if packing is not None and staging_dir is None:
+        raise ValueError("A staging directory is needed to pack the Zarr stores into")
+
+    manifest = IngestionManifest(
+        source_data_root=root.path(),
+        staging_root=staging_dir if packing is not None else None,
+    )
 
     for directory in root.iter_dirs(recursive=True):
         zarr_dirs = directory.find_dirs(
@@ -366,6 +380,24 @@ def parse_zarr_data(
 
             manifest.add_dataset(dataset)
 
+            if packing is not None and staging_dir is not None:
+                manifest.add_datafiles(
+                    pack_directory(
+                        zarr_dir,
+                        root.path(),
+                        dataset_identifier,
+                        staging_dir=staging_dir,
+                        file_filter=file_filter,
+                        options=packing,
+                        collate_file=partial(
+                            collate_datafile_info,
+                            root_dir=root.path(),
+                            dataset_identifier=dataset_identifier,
+                        ),
+                    )
+                )
+                continue
+
             for file in zarr_dir.iter_files(recursive=True):
                 if file_filter.exclude(file.path()):
                     continue
@@ -396,15 +428,21 @@ def link_zarr_to_raw(
         zarr_dataset.metadata["raw_dataset"] = raw_dataset.description
 
 
-def parse_data(root: DirectoryNode) -> IngestionManifest:
+def parse_data(
+    root: DirectoryNode,
+    packing: Optional[PackingOptions] = None,
+    staging_dir: Optional[Path] = None,
+) -> IngestionManifest:
     """
     Parse/validate the data directory to extract the files to be ingested
     """
 
     file_filter = filters.PathFilterSet(filter_system_files=True)
+    # Don't pick up archives produced by a previous packed extraction as raw data
+    file_filter.add(lambda p: p.name.endswith(".zarr" + ARCHIVE_SUFFIX))
 
     dc_raw = parse_raw_data(root, file_filter)
-    dc_zarr = parse_zarr_data(root, file_filter)
+    dc_zarr = parse_zarr_data(root, file_filter, packing, staging_dir)
 
     link_zarr_to_raw(dc_zarr.get_datasets(), dc_raw.get_datasets())
 
@@ -415,15 +453,21 @@ def parse_data(root: DirectoryNode) -> IngestionManifest:
         experiments=dc_raw.get_experiments() + dc_zarr.get_experiments(),
         datasets=dc_raw.get_datasets() + dc_zarr.get_datasets(),
         datafiles=dc_raw.get_datafiles() + dc_zarr.get_datafiles(),
+        staging_root=dc_zarr.get_staging_root(),
     )
 
 
 class ABIMusicExtractor(IMetadataExtractor):
-    """Metadata extractor for the ABI MuSIC data"""
+    """Metadata extractor for the ABI MuSIC data
+
+    Attributes:
+        packing: if set, the files in each Zarr store are packed into archives, which
+            are written to the staging directory
+    """
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, packing: Optional[PackingOptions] = None) -> None:
+        self.packing = packing
 
     def extract(self, root_dir: Path) -> IngestionManifest:
         root = DirectoryNode(root_dir)
-        return parse_data(root)
+        return parse_data(root, self.packing, self.staging_dir)
@@ -5,6 +5,9 @@ Ingestion profile for the "ABI MuSIC" Microscope
 from typing import Optional
 
 from src.extraction.metadata_extractor import IMetadataExtractor
+from src.extraction.packing import PackingOptions
+from src.mytardis_client.common_types import MTUrl
+from src.profiles.abi_music.abi_music_consts import ABI_MUSIC_DATAFILE_ARCHIVE_SCHEMA
 from src.profiles.abi_music.parsing import ABIMusicExtractor
 from src.profiles.profile_base import IProfile
 
@@ -12,15 +15,15 @@ from src.profiles.profile_base import IProfile
 class AbiMusicProfile(IProfile):
     """Profile defining the ingestion behaviour for the 'ABI MuSIC' Microscope"""
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, packing: Optional[PackingOptions] = None) -> None:
+        self._packing = packing
 
     @property
     def name(self) -> str:
         return "abi_music"
 
     def get_extractor(self) -> IMetadataExtractor:
-        return ABIMusicExtractor()
+        return ABIMusicExtractor(packing=self._packing)
 
 
 def get_profile(version: Optional[str]) -> IProfile:
@@ -29,5 +32,10 @@ def get_profile(version: Optional[str]) -> IProfile:
     match version:
         case "v1" | None:
             return AbiMusicProfile()
+        case "v1-packed":
+            # Same as v1, but the chunks of each Zarr store are packed into an archive
+            return AbiMusicProfile(
+                packing=PackingOptions(schema=MTUrl(ABI_MUSIC_DATAFILE_ARCHIVE_SCHEMA))
+            )
         case _:
             raise ValueError(f"Unknown version '{version}' for 'ABI MuSIC' profile")
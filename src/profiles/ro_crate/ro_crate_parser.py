@@ -40,7 +40,6 @@ from src.utils.filesystem.filters import PathFilterSet
 from src.utils.validation import validate_isodatetime, validate_url
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # set the level for which this logger will be printed.
 
 
 def handle_datetime(  # pylint: disable=missing-function-docstring
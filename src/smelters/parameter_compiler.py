@@ -0,0 +1,244 @@
+"""Checks and conversion of metadata against the parameter definitions of MyTardis
+schemas.
+
+The ParameterName definitions of each schema are fetched from MyTardis once, and
+compiled into a converter per parameter (name mapping, type coercion and unit
+handling). The compiled schema is then applied to the metadata of every object which
+uses it, so that parameters MyTardis would reject are found before ingestion, without
+repeating any per-schema work.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, Callable, Optional, Union
+
+from src.blueprints.common_models import Parameter
+from src.mytardis_client.common_types import MTUrl
+from src.mytardis_client.endpoints import URI
+from src.mytardis_client.response_data import ParameterName, Schema
+from src.overseers.overseer import Overseer
+from src.utils.concurrency import SingleFlight
+from src.utils.validation import validate_isodatetime, validate_url
+
+logger = logging.getLogger(__name__)
+
+ParameterValue = Union[str, int, float, bool, None]
+
+# Seconds for which a schema which couldn't be fetched is not fetched again
+SCHEMA_RETRY_INTERVAL = 30.0
+
+
+class ParameterDataType(IntEnum):
+    """The data types of MyTardis parameters (ParameterName.data_type)"""
+
+    NUMERIC = 1
+    STRING = 2
+    URL = 3
+    LINK = 4
+    FILENAME = 5
+    DATETIME = 6
+    LONGSTRING = 7
+    JSON = 8
+
+
+def _to_numeric(value: Any, units: str) -> ParameterValue:
+    if isinstance(value, bool):
+        raise TypeError("A boolean is not a numeric value")
+    if isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, str):
+        raise TypeError(f"Unexpected type for a numeric value: {type(value)}")
+
+    # Numbers may be given with their units, e.g. "12.5 mm"
+    number, _, given_units = value.strip().partition(" ")
+    given_units = given_units.strip()
+    if given_units and given_units != units:
+        raise ValueError(f'Units "{given_units}" do not match the schema\'s "{units}"')
+    try:
+        return int(number)
+    except ValueError:
+        return float(number)
+
+
+def _to_string(value: Any, _units: str) -> ParameterValue:
+    if not isinstance(value, (str, int, float, bool)):
+        raise TypeError(f"Unexpected type for a string value: {type(value)}")
+    return str(value)
+
+
+def _to_url(value: Any, _units: str) -> ParameterValue:
+    return validate_url(value)
+
+
+def _to_datetime(value: Any, _units: str) -> ParameterValue:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return validate_isodatetime(value)
+
+
+def _to_json(value: Any, _units: str) -> ParameterValue:
+    if isinstance(value, str):
+        json.loads(value)
+        return value
+    return json.dumps(value)
+
+
+_CONVERTERS: dict[ParameterDataType, Callable[[Any, str], ParameterValue]] = {
+    ParameterDataType.NUMERIC: _to_numeric,
+    ParameterDataType.STRING: _to_string,
+    ParameterDataType.URL: _to_url,
+    ParameterDataType.LINK: _to_string,
+    ParameterDataType.FILENAME: _to_string,
+    ParameterDataType.DATETIME: _to_datetime,
+    ParameterDataType.LONGSTRING: _to_string,
+    ParameterDataType.JSON: _to_json,
+}
+
+
+def _data_type(value: Optional[int]) -> ParameterDataType:
+    """The data type of a parameter, treating unknown types as strings"""
+    for data_type in ParameterDataType:
+        if data_type == value:
+            return data_type
+    return ParameterDataType.STRING
+
+
+@dataclass(frozen=True)
+class CompiledParameter:
+    """The converter for the values of one parameter of a schema"""
+
+    name: str
+    units: str
+    convert: Callable[[Any, str], ParameterValue]
+
+    def __call__(self, value: Any) -> ParameterValue:
+        if value is None:
+            return None
+        return self.convert(value, self.units)
+
+
+class CompiledSchema:
+    """The parameters of a schema, compiled for converting metadata.
+
+    Parameters are looked up by their name, or by their full name, which is mapped to
+    the name MyTardis expects.
+    """
+
+    def __init__(self, namespace: str, parameter_names: list[ParameterName]) -> None:
+        self.namespace = namespace
+        self._parameters: dict[str, CompiledParameter] = {}
+        for parameter_name in parameter_names:
+            compiled = CompiledParameter(
+                name=parameter_name.name,
+                units=parameter_name.units,
+                convert=_CONVERTERS[_data_type(parameter_name.data_type)],
+            )
+            self._parameters.setdefault(parameter_name.full_name, compiled)
+            self._parameters[parameter_name.name] = compiled
+
+    def compile(
+        self, metadata: dict[str, Any]
+    ) -> tuple[list[Parameter], dict[str, str]]:
+        """Convert metadata into parameters of this schema.
+
+        Returns the parameters, and the reasons for rejecting each metadata key which
+        could not be converted.
+        """
+        parameters: list[Parameter] = []
+        rejected: dict[str, str] = {}
+        for key, value in metadata.items():
+            compiled = self._parameters.get(key)
+            if compiled is None:
+                rejected[key] = f"not a parameter of schema {self.namespace}"
+                continue
+            try:
+                converted = compiled(value)
+            except (TypeError, ValueError) as error:
+                rejected[key] = str(error)
+                continue
+            parameters.append(Parameter(name=compiled.name, value=converted))
+        return parameters, rejected
+
+
+class ParameterCompiler:
+    """Fetches and compiles the schemas used by the metadata of ingested objects.
+
+    Each schema is fetched from MyTardis once. Threads which need a schema while it is
+    being fetched wait for that fetch, while the others carry on. If MyTardis has no
+    such schema, None is cached for it, and its metadata is not checked. If the schema
+    can't be fetched, the metadata of the objects using it is not checked, and it is
+    fetched again once 'retry_interval' seconds have passed.
+    """
+
+    def __init__(
+        self, overseer: Overseer, retry_interval: float = SCHEMA_RETRY_INTERVAL
+    ) -> None:
+        self.overseer = overseer
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._schemas: dict[str, Optional[CompiledSchema]] = {}
+        self._failed_at: dict[str, float] = {}
+        self._fetches: SingleFlight[str, Optional[CompiledSchema]] = SingleFlight()
+
+    def get_schema(self, schema: MTUrl | URI) -> Optional[CompiledSchema]:
+        """Get the compiled schema, fetching it from MyTardis on first use"""
+        key = str(schema)
+        with self._lock:
+            if key in self._schemas:
+                return self._schemas[key]
+            failed_at = self._failed_at.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < self.retry_interval:
+            return None
+
+        compiled, _ = self._fetches.do(key, lambda: self._fetch_and_store(schema))
+        return compiled
+
+    def _fetch_and_store(self, schema: MTUrl | URI) -> Optional[CompiledSchema]:
+        """Fetch and compile the schema, and remember the outcome"""
+        key = str(schema)
+        with self._lock:
+            # It may have been fetched since the caller checked
+            if key in self._schemas:
+                return self._schemas[key]
+        try:
+            compiled = self._fetch_schema(schema)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.warning(
+                "Unable to fetch schema %s from MyTardis. These parameters will "
+                "not be checked before ingestion for the next %.0f seconds",
+                schema,
+                self.retry_interval,
+                exc_info=True,
+            )
+            with self._lock:
+                self._failed_at[key] = time.monotonic()
+            return None
+
+        with self._lock:
+            self._schemas[key] = compiled
+            self._failed_at.pop(key, None)
+        return compiled
+
+    def _fetch_schema(self, schema: MTUrl | URI) -> Optional[CompiledSchema]:
+        """Fetch and compile the schema, or return None if MyTardis has no such
+        schema"""
+        query: dict[str, Any] = (
+            {"id": schema} if isinstance(schema, URI) else {"namespace": str(schema)}
+        )
+        objects, _ = self.overseer.rest_factory.get("/schema", query)
+
+        schemas = [obj for obj in objects if isinstance(obj, Schema)]
+        if not schemas:
+            logger.warning(
+                "Schema %s was not found in MyTardis. Its parameters will not be "
+                "checked before ingestion",
+                schema,
+            )
+            return None
+
+        return CompiledSchema(str(schemas[0].namespace), schemas[0].parameter_names)
@@ -6,9 +6,9 @@ In addition to splitting the raw dataclasses up it also injects some default val
 where appropriate"""
 
 import logging
-from typing import Optional, Tuple
+from typing import Any, Optional, Tuple
 
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
 from src.blueprints.common_models import Parameter, ParameterSet
 from src.blueprints.datafile import RawDatafile, RefinedDatafile
@@ -19,9 +19,13 @@ from src.config.config import GeneralConfig, SchemaConfig
 from src.mytardis_client.common_types import MTUrl
 from src.mytardis_client.endpoints import URI
 from src.overseers.overseer import MYTARDIS_PROJECTS_DISABLED_MESSAGE, Overseer
+from src.smelters.parameter_compiler import ParameterCompiler
 
 logger = logging.getLogger(__name__)
 
+# Validates all the parameters of an object in a single call into pydantic-core
+_PARAMETER_LIST_ADAPTER = TypeAdapter(list[Parameter])
+
 
 class Smelter:
     """The Smelter base class to be subclassed into individual concrete classes for different
@@ -35,6 +39,8 @@ class Smelter:
             information for the ingestion
         default_schema (SchemaConfig): default metadata schema to use in cases where no schema
             is provided - will be deprecated by SSV
+        parameter_compiler (Optional[ParameterCompiler]): checks and converts metadata
+            against the parameter definitions of its schema, if enabled in the schema config
     """
 
     def __init__(
@@ -59,6 +65,9 @@ class Smelter:
         self.overseer = overseer
         self.default_schema = default_schema
         self.default_institution = general.default_institution
+        self.parameter_compiler = (
+            ParameterCompiler(overseer) if default_schema.validate_parameters else None
+        )
 
     def extract_parameters(
         self,
@@ -68,6 +77,10 @@ class Smelter:
         """Extract the metadata field and the schema field from a RawObject dataclass
         and use it to create a Parameterset
 
+        If parameter validation is enabled and the schema is found in MyTardis, the
+        metadata is converted using the schema's parameter definitions, and any
+        parameters which don't fit them are left out.
+
         Args:
             schema (AnyURL): a schema namespace from MyTardis
             raw_object (RawMTObject): A RawProject/Experiment/Dataset/Datafile object
@@ -78,17 +91,35 @@ class Smelter:
 
         if not raw_object.metadata:
             return None
-        parameter_list: list[Parameter] = []
-        parameter = raw_object.metadata
-        for key, value in parameter.items():
-            try:
-                parameter_list.append(Parameter(name=key, value=value))
-            except ValidationError:
-                logger.warning(
-                    ("Unable to parse parameter %s: %s into Parameter", key, value),
-                    exc_info=True,
-                )
-                continue
+
+        if self.parameter_compiler is not None and (
+            compiled_schema := self.parameter_compiler.get_schema(schema)
+        ):
+            parameter_list, rejected = compiled_schema.compile(raw_object.metadata)
+            for key, reason in rejected.items():
+                logger.warning("Rejected parameter %s: %s", key, reason)
+            return ParameterSet(schema=schema, parameters=parameter_list)
+
+        try:
+            parameter_list = _PARAMETER_LIST_ADAPTER.validate_python(
+                [
+                    {"name": key, "value": value}
+                    for key, value in raw_object.metadata.items()
+                ]
+            )
+        except ValidationError:
+            # Validate the parameters one by one to skip only the invalid ones
+            parameter_list = []
+            for key, value in raw_object.metadata.items():
+                try:
+                    parameter_list.append(Parameter(name=key, value=value))
+                except ValidationError:
+                    logger.warning(
+                        "Unable to parse parameter %s: %s into Parameter",
+                        key,
+                        value,
+                        exc_info=True,
+                    )
         return ParameterSet(schema=schema, parameters=parameter_list)
 
     def smelt_project(
@@ -241,12 +272,13 @@ class Smelter:
         parameters = self.extract_parameters(schema, raw_dataset)
         return (refined_dataset, parameters)
 
-    def smelt_datafile(  # pylint: disable=too-many-return-statements
-        self, raw_datafile: RawDatafile
-    ) -> RefinedDatafile | None:
-        """Inject the schema into the datafile dictionary if it's not
-        already present.
-        Convert to a RefinedDatafile dataclass for validation."""
+    def datafile_fields(self, raw_datafile: RawDatafile) -> dict[str, Any] | None:
+        """The fields of 'raw_datafile' which are carried over unchanged into the
+        RefinedDatafile (or Datafile), with its parameters extracted using its schema,
+        or the default datafile schema.
+
+        Returns None if there is no schema to use.
+        """
         schema = raw_datafile.object_schema or self.default_schema.datafile
         if not schema:
             logger.warning(
@@ -254,25 +286,30 @@ class Smelter:
             )
             return None
         parameters = self.extract_parameters(schema, raw_datafile)
+        return {
+            "filename": raw_datafile.filename,
+            "directory": raw_datafile.directory,
+            "md5sum": raw_datafile.md5sum,
+            "mimetype": raw_datafile.mimetype,
+            "size": raw_datafile.size,
+            "users": raw_datafile.users,
+            "groups": raw_datafile.groups,
+            "parameter_sets": [parameters] if parameters is not None else None,
+        }
+
+    def smelt_datafile(self, raw_datafile: RawDatafile) -> RefinedDatafile | None:
+        """Inject the schema into the datafile dictionary if it's not
+        already present.
+        Convert to a RefinedDatafile dataclass for validation."""
+        fields = self.datafile_fields(raw_datafile)
+        if fields is None:
+            return None
         try:
-            refined_datafile = RefinedDatafile(
-                filename=raw_datafile.filename,
-                directory=raw_datafile.directory,
-                md5sum=raw_datafile.md5sum,
-                mimetype=raw_datafile.mimetype,
-                size=raw_datafile.size,
-                users=raw_datafile.users,
-                groups=raw_datafile.groups,
-                dataset=raw_datafile.dataset,
-                parameter_sets=[parameters] if parameters is not None else None,
-            )
+            refined_datafile = RefinedDatafile(**fields, dataset=raw_datafile.dataset)
         except ValidationError:
             logger.warning(
-                (
-                    "Malformed datafile dataclass produced by smelter. Datafile "
-                    "is %s",
-                    raw_datafile.filename,
-                ),
+                "Malformed datafile dataclass produced by smelter. Datafile is %s",
+                raw_datafile.filename,
                 exc_info=True,
             )
             return None
@@ -0,0 +1,29 @@
+"""A base class for objects which hold resources until they are closed
+"""
+
+from abc import ABC, abstractmethod
+from types import TracebackType
+from typing import Optional, Self
+
+
+class Closeable(ABC):
+    """An object holding resources, such as open files or threads, which 'close()'
+    releases.
+
+    Used as a context manager, the object is closed on exit.
+    """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Release the resources held by the object"""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,136 @@
+"""Helpers for code which is called from several threads at once."""
+
+import threading
+from collections.abc import Callable, Hashable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Generic, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class _Call(Generic[V]):
+    """A call in progress, whose result is shared with the threads waiting for it"""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Optional[V] = None
+    error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    """Suppresses duplicate calls which are in progress at the same time.
+
+    While a call for a key is in progress, threads calling 'do()' with the same key wait
+    for it and share its result (or exception), instead of making the call again. Once
+    the call has finished, the next call for the key is made afresh: results are not
+    cached.
+
+    If 'on_shared' is given, it is called with the key whenever a caller starts
+    waiting for a call in progress, for example to count the calls saved.
+    """
+
+    def __init__(self, on_shared: Optional[Callable[[K], None]] = None) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[K, _Call[V]] = {}
+        self._on_shared = on_shared
+
+    def do(self, key: K, fn: Callable[[], V]) -> tuple[V, bool]:
+        """Call 'fn', unless a call for 'key' is already in progress, in which case wait
+        for its result.
+
+        Returns the result, and whether it was shared with another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if self._on_shared is not None:
+                self._on_shared(key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True  # type: ignore[return-value]
+
+        try:
+            call.result = fn()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+
+class TaskGraph(Generic[K]):
+    """Runs tasks on a pool of threads, each as soon as the tasks it depends on are done.
+
+    Tasks are added with the keys of their parents. Parents which are not in the graph
+    are ignored, so a task may depend on something that only might be part of the run.
+    Independent tasks run concurrently, up to the number of workers.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: dict[K, Callable[[], None]] = {}
+        self._parents: dict[K, set[K]] = {}
+
+    def add(self, key: K, task: Callable[[], None], parents: Iterable[K] = ()) -> None:
+        """Add a task which will run after those of 'parents'"""
+        if key in self._tasks:
+            raise ValueError(f"Task {key!r} is already in the graph")
+        self._tasks[key] = task
+        self._parents[key] = set(parents)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def _dependencies(self) -> tuple[dict[K, list[K]], dict[K, int]]:
+        """The children of each task, and its number of parents in the graph"""
+        children: dict[K, list[K]] = {key: [] for key in self._tasks}
+        num_parents: dict[K, int] = {}
+        for key, parents in self._parents.items():
+            known_parents = parents.intersection(self._tasks)
+            num_parents[key] = len(known_parents)
+            for parent in known_parents:
+                children[parent].append(key)
+        return children, num_parents
+
+    def run(self, max_workers: int) -> None:
+        """Run all the tasks, and wait for them to finish.
+
+        If a task raises an exception, no more tasks are started, and the exception is
+        raised once the running tasks have finished. Raises ValueError if the
+        dependencies of the tasks form a cycle.
+        """
+        children, num_parents = self._dependencies()
+        ready = [key for key, count in num_parents.items() if count == 0]
+        num_started = 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running: dict[Future[None], K] = {}
+            while ready or running:
+                for key in ready:
+                    running[executor.submit(self._tasks[key])] = key
+                num_started += len(ready)
+                ready = []
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    if (error := future.exception()) is not None:
+                        wait(running)
+                        raise error
+                    for child in children[key]:
+                        num_parents[child] -= 1
+                        if num_parents[child] == 0:
+                            ready.append(child)
+
+        if num_started < len(self._tasks):
+            raise ValueError("The dependencies of the tasks form a cycle")
@@ -5,18 +5,24 @@ Helpers for calculating checksums and hashes
 import hashlib
 from pathlib import Path
 
+from src.utils.progress import advance
+from src.utils.tracing import span
+
 
 def calculate_md5(file: Path) -> str:
     """
     Compute the MD5 hash of the file referenced by `file`.
     NOTE: a version already exists in datafile_metadata_helpers.py - should unify them
     """
-    with file.open("rb") as f:
+    with span("checksum"), file.open("rb") as f:
         calculator = hashlib.md5()
 
         chunk_size = 8192
+        num_bytes = 0
 
         while chunk := f.read(chunk_size):
             calculator.update(chunk)
+            num_bytes += len(chunk)
 
+        advance("checksum", num_bytes=num_bytes)
         return calculator.hexdigest()
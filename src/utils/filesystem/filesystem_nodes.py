@@ -8,6 +8,9 @@ import os
 from pathlib import Path
 from typing import Callable, Iterator, Tuple, TypeAlias, TypeVar
 
+from src.utils.progress import advance
+from src.utils.tracing import span
+
 T = TypeVar("T")
 Predicate: TypeAlias = Callable[[T], bool]
 
@@ -27,24 +30,26 @@ def collect_children(
     files: list[FileNode] = []
     directories: list[DirectoryNode] = []
 
-    for child in directory.path().iterdir():
-        if child.is_file():
-            files.append(
-                FileNode(
-                    child,
-                    parent=directory,
-                    check_exists=False,
+    with span("walk"):
+        for child in directory.path().iterdir():
+            if child.is_file():
+                files.append(
+                    FileNode(
+                        child,
+                        parent=directory,
+                        check_exists=False,
+                    )
                 )
-            )
-        elif child.is_dir():
-            directories.append(
-                DirectoryNode(
-                    child,
-                    parent=directory,
-                    check_exists=False,
+            elif child.is_dir():
+                directories.append(
+                    DirectoryNode(
+                        child,
+                        parent=directory,
+                        check_exists=False,
+                    )
                 )
-            )
 
+    advance("walk", objects=len(files))
     return (files, directories)
 
 
@@ -2,30 +2,164 @@
 Helpers for configuring and formatting logging outputs
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import time
+from dataclasses import dataclass
 from typing import Optional
 
+# The interval, in seconds, over which a rate limit on log messages applies
+RATE_LIMIT_INTERVAL = 60.0
+
+
+@dataclass
+class _Window:
+    """The records of one kind logged and dropped in an interval, which starts with a
+    record being logged"""
+
+    start: float
+    num_logged: int = 1
+    num_dropped: int = 0
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits the number of records of each kind logged per interval.
+
+    Records are of the same kind if they come from the same logger, at the same
+    level, with the same (unformatted) message, so messages must be formatted lazily
+    for them to be limited. Records at WARNING and above are never limited.
+
+    Once 'limit' records of a kind have been logged in an interval, the rest are
+    dropped. The first record of the kind logged after the interval carries the number
+    dropped, and 'log_suppressed()' logs the numbers still outstanding.
+    """
+
+    def __init__(self, limit: int, interval: float = RATE_LIMIT_INTERVAL) -> None:
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows: dict[tuple[str, int, str], _Window] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # The same filter may be on several handlers, which must agree on a record
+        passed: Optional[bool] = getattr(record, "rate_limit_passed", None)
+        if passed is None:
+            passed = record.levelno >= logging.WARNING or self._admit(record)
+            record.rate_limit_passed = passed
+        return passed
+
+    def _admit(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window.start >= self.interval:
+                self._windows[key] = _Window(now)
+                if window is not None and window.num_dropped:
+                    record.msg = (
+                        f"{record.getMessage()} [{window.num_dropped} similar "
+                        f"messages suppressed in the last {now - window.start:.0f}s]"
+                    )
+                    record.args = None
+                return True
+            if window.num_logged < self.limit:
+                window.num_logged += 1
+                return True
+            window.num_dropped += 1
+            return False
+
+    def log_suppressed(self, log: Optional[logging.Logger] = None) -> None:
+        """Log the number of records of each kind dropped since they were last
+        logged"""
+        log = log or logging.getLogger(__name__)
+        with self._lock:
+            suppressed = [
+                (key, window.num_dropped)
+                for key, window in self._windows.items()
+                if window.num_dropped
+            ]
+            for window in self._windows.values():
+                window.num_dropped = 0
+        for (name, _, msg), num_dropped in suppressed:
+            log.warning(
+                "Suppressed %d messages from %s like: %s", num_dropped, name, msg
+            )
+
+
+@dataclass
+class _LoggingState:
+    """The parts of the logging setup which must be stopped at exit"""
+
+    listener: Optional[logging.handlers.QueueListener] = None
+    rate_limit_filter: Optional[RateLimitFilter] = None
+
+
+_STATE = _LoggingState()
+
+
+def stop_logging() -> None:
+    """Log the numbers of messages dropped by the rate limit, and wait for queued
+    records to be written, if logging was initialised with either"""
+    if _STATE.rate_limit_filter is not None:
+        _STATE.rate_limit_filter.log_suppressed()
+        _STATE.rate_limit_filter = None
+    if _STATE.listener is not None:
+        _STATE.listener.stop()
+        _STATE.listener = None
+
 
 def init_logging(
-    file_name: Optional[str] = None, level: int | str = logging.DEBUG
+    file_name: Optional[str] = None,
+    level: int | str = logging.DEBUG,
+    queued: bool = False,
+    rate_limit: int = 0,
 ) -> None:
     """
     Configure a basic default logging setup. Logs to the console, and optionally
     to a file, if a filename is passed.
+
+    With 'queued', records are put on a queue and written by a background thread, so
+    threads which log don't wait for the console or file. With a 'rate_limit', at
+    most that many INFO and DEBUG records of each kind are logged per minute.
     """
     root = logging.getLogger()
     root.setLevel(level)
 
     log_format = "[%(asctime)s %(levelname)s]: %(message)s"
 
+    handlers: list[logging.Handler] = []
+
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(logging.Formatter(log_format))
-    root.addHandler(console_handler)
+    handlers.append(console_handler)
 
     if file_name:
         file_handler = logging.FileHandler(filename=file_name, mode="w")
         file_handler.setLevel(level)
         file_handler.setFormatter(logging.Formatter(log_format))
-        root.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if queued:
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        _STATE.listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _STATE.listener.start()
+        handlers = [logging.handlers.QueueHandler(log_queue)]
+
+    if rate_limit > 0:
+        _STATE.rate_limit_filter = RateLimitFilter(rate_limit)
+        for handler in handlers:
+            handler.addFilter(_STATE.rate_limit_filter)
+
+    for handler in handlers:
+        root.addHandler(handler)
+
+    if queued or rate_limit > 0:
+        atexit.register(stop_logging)
@@ -0,0 +1,278 @@
+"""Progress reporting for the stages of the ingestion pipeline.
+
+The stages report the objects, and where it is meaningful the bytes, they have
+processed into named counters, along with the totals expected where they are known.
+From these, the rate and estimated time remaining of each stage are worked out.
+
+A reporter thread periodically writes the progress of every stage to a JSON status
+file, for monitoring to scrape, and renders a one-line display on the terminal when
+there is one.
+
+Progress is disabled by default, in which case reporting costs next to nothing. The
+pipeline code uses the module-level tracker via `advance()` and `add_total()`; the CLI
+enables it for the 'extract', 'upload' and 'ingest' commands, and disables it again
+once they are done.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional, TextIO
+
+from src.utils.closeable import Closeable
+
+# The stages of the pipeline, in the order in which they run
+STAGES = ("walk", "checksum", "refine", "forge", "transfer")
+
+# Seconds between updates of the status file and the terminal display
+REPORT_INTERVAL = 5.0
+
+
+class StageProgress:
+    """The objects and bytes processed by a stage, and the totals expected
+
+    Attributes:
+        objects: number of objects processed
+        bytes: number of bytes processed
+        total_objects: number of objects the stage is expected to process, if known
+        total_bytes: number of bytes the stage is expected to process, if known
+        started: time.monotonic() at which the stage processed its first object
+    """
+
+    def __init__(self) -> None:
+        self.objects = 0
+        self.bytes = 0
+        self.total_objects: Optional[int] = None
+        self.total_bytes: Optional[int] = None
+        self.started: Optional[float] = None
+
+    def fraction(self) -> Optional[float]:
+        """The fraction of the stage done, by bytes if their total is known, otherwise
+        by objects"""
+        if self.total_bytes:
+            return min(1.0, self.bytes / self.total_bytes)
+        if self.total_objects:
+            return min(1.0, self.objects / self.total_objects)
+        return None
+
+    def status(self, now: float) -> dict[str, Any]:
+        """The progress of the stage, with its rates and estimated time remaining"""
+        elapsed = now - self.started if self.started is not None else 0.0
+        fraction = self.fraction()
+        eta: Optional[float] = None
+        if fraction is not None and 0 < fraction < 1 and elapsed > 0:
+            eta = elapsed * (1 - fraction) / fraction
+        elif fraction == 1:
+            eta = 0.0
+        return {
+            "objects": self.objects,
+            "total_objects": self.total_objects,
+            "bytes": self.bytes,
+            "total_bytes": self.total_bytes,
+            "elapsed_s": elapsed,
+            "objects_per_second": self.objects / elapsed if elapsed else 0.0,
+            "bytes_per_second": self.bytes / elapsed if elapsed else 0.0,
+            "fraction": fraction,
+            "eta_s": eta,
+        }
+
+
+class Progress:
+    """Counts the objects and bytes processed by each stage of the pipeline.
+
+    Attributes:
+        enabled: whether progress is being counted
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: dict[str, StageProgress] = {}
+        self._origin = time.monotonic()
+
+    def enable(self) -> None:
+        """Start counting progress"""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop counting progress"""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Discard everything counted so far"""
+        with self._lock:
+            self._stages.clear()
+            self._origin = time.monotonic()
+
+    def _stage(self, name: str) -> StageProgress:
+        if (stage := self._stages.get(name)) is None:
+            stage = self._stages[name] = StageProgress()
+        return stage
+
+    def add_total(self, name: str, objects: int, num_bytes: int = 0) -> None:
+        """Add to the number of objects (and bytes) stage 'name' is expected to
+        process"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stage(name)
+            stage.total_objects = (stage.total_objects or 0) + objects
+            if num_bytes:
+                stage.total_bytes = (stage.total_bytes or 0) + num_bytes
+
+    def advance(self, name: str, objects: int = 1, num_bytes: int = 0) -> None:
+        """Record that stage 'name' has processed 'objects' more objects, and
+        'num_bytes' more bytes"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stage(name)
+            if stage.started is None:
+                stage.started = time.monotonic()
+            stage.objects += objects
+            stage.bytes += num_bytes
+
+    def status(self) -> dict[str, Any]:
+        """The progress of every stage which has reported, in pipeline order"""
+        now = time.monotonic()
+        with self._lock:
+            stages = {
+                name: self._stages[name].status(now)
+                for name in sorted(self._stages, key=_stage_order)
+            }
+        return {
+            "updated": datetime.now(timezone.utc).isoformat(),
+            "elapsed_s": now - self._origin,
+            "stages": stages,
+        }
+
+    def write_status(self, path: Path, finished: bool = False) -> None:
+        """Write the progress of every stage to 'path' as JSON, replacing the file in
+        one step so a reader never sees it half written"""
+        status = self.status()
+        status["finished"] = finished
+        temp_path = path.with_name(f".{path.name}.tmp")
+        with temp_path.open("w", encoding="utf-8") as file:
+            json.dump(status, file, indent=4)
+        os.replace(temp_path, path)
+
+
+def _stage_order(name: str) -> tuple[int, str]:
+    return (STAGES.index(name) if name in STAGES else len(STAGES), name)
+
+
+def _format_count(value: float) -> str:
+    for unit in ("", "k", "M", "G", "T"):
+        if abs(value) < 1000:
+            return f"{value:.0f}{unit}" if not unit else f"{value:.1f}{unit}"
+        value /= 1000
+    return f"{value:.1f}P"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+def format_status(status: dict[str, Any]) -> str:
+    """A compact, one-line rendering of the progress of each stage"""
+    parts: list[str] = []
+    for name, stage in status["stages"].items():
+        text = f"{name} {_format_count(stage['objects'])}"
+        if stage["total_objects"] is not None:
+            text += f"/{_format_count(stage['total_objects'])}"
+        if stage["fraction"] is not None:
+            text += f" {stage['fraction']:.0%}"
+        if stage["bytes"]:
+            text += f" {_format_count(stage['bytes_per_second'])}B/s"
+        else:
+            text += f" {stage['objects_per_second']:.1f}/s"
+        if stage["eta_s"]:
+            text += f" ETA {_format_duration(stage['eta_s'])}"
+        parts.append(text)
+    return " | ".join(parts)
+
+
+class ProgressReporter(Closeable):
+    """Periodically writes the progress of the pipeline to a status file, and renders
+    it on the terminal if 'display' is an interactive one.
+
+    Use as a context manager around the run; the final progress is reported on exit,
+    and the tracker is disabled so that later work isn't counted.
+    """
+
+    def __init__(
+        self,
+        progress: Progress,
+        status_file: Optional[Path] = None,
+        display: Optional[TextIO] = None,
+        interval: float = REPORT_INTERVAL,
+    ) -> None:
+        self.progress = progress
+        self.status_file = status_file
+        self.display = display if display is not None and display.isatty() else None
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="progress-reporter", daemon=True
+        )
+
+    def _report(self, finished: bool = False) -> None:
+        if self.status_file is not None:
+            self.progress.write_status(self.status_file, finished=finished)
+        if self.display is not None:
+            line = format_status(self.progress.status())
+            self.display.write(f"\r\x1b[K{line}" + ("\n" if finished else ""))
+            self.display.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._report()
+
+    def __enter__(self) -> "ProgressReporter":
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Stop reporting, report the final progress and disable the tracker"""
+        self._stop.set()
+        self._thread.join()
+        self._report(finished=True)
+        self.progress.disable()
+
+
+_PROGRESS = Progress()
+
+
+def get_progress() -> Progress:
+    """Get the progress tracker used by the ingestion pipeline"""
+    return _PROGRESS
+
+
+def advance(name: str, objects: int = 1, num_bytes: int = 0) -> None:
+    """Record progress of stage 'name' on the pipeline's tracker"""
+    _PROGRESS.advance(name, objects, num_bytes)
+
+
+def add_total(name: str, objects: int, num_bytes: int = 0) -> None:
+    """Add to the work stage 'name' is expected to do on the pipeline's tracker"""
+    _PROGRESS.add_total(name, objects, num_bytes)
+
+
+def report_progress(
+    status_file: Optional[Path], display: Optional[TextIO] = sys.stderr
+) -> ProgressReporter:
+    """Enable the pipeline's progress tracker, and return a reporter for it to use
+    as a context manager around the run"""
+    _PROGRESS.reset()
+    _PROGRESS.enable()
+    return ProgressReporter(_PROGRESS, status_file=status_file, display=display)
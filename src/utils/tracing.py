@@ -0,0 +1,220 @@
+"""A lightweight tracer for timing the stages of the ingestion pipeline.
+
+Stages are wrapped in named spans, which nest: a span opened while another is
+active on the same thread is recorded as its child, under a path such as
+"ingest_datafiles/smelt". Durations are aggregated per path, so that totals and
+percentiles can be reported at the end of a run. The memory used is bounded: each path
+keeps its count, total, minimum and maximum, and a fixed-size random sample of its
+durations from which the percentiles are estimated. Individual spans can also be
+kept for export in the Chrome trace-event format (viewable in chrome://tracing or
+Perfetto).
+
+Tracing is disabled by default, in which case opening a span costs next to nothing.
+The pipeline code uses the module-level tracer via `span()`; the CLI enables it when
+a trace output is requested.
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Iterator, Optional
+
+PATH_SEPARATOR = "/"
+
+# The number of durations sampled per span path, to estimate its percentiles
+SAMPLE_SIZE = 1024
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+@dataclass
+class SpanStats:
+    """The durations of the spans at one path: exact count, total, minimum and
+    maximum, and a uniform random sample (reservoir) of at most SAMPLE_SIZE durations"""
+
+    count: int = 0
+    total: float = 0.0
+    minimum: float = math.inf
+    maximum: float = 0.0
+    sample: "array[float]" = field(default_factory=lambda: array("d"))
+
+    def add(self, duration: float, rng: random.Random) -> None:
+        """Add the duration of a span"""
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(duration)
+        elif (slot := rng.randrange(self.count)) < SAMPLE_SIZE:
+            self.sample[slot] = duration
+
+
+class Tracer:
+    """Records nested, named spans and aggregates their durations.
+
+    Attributes:
+        enabled: whether spans are being recorded
+        max_events: maximum number of individual spans retained for trace-event
+            export; aggregated statistics are unaffected by this limit
+    """
+
+    def __init__(self, enabled: bool = False, max_events: int = 1_000_000) -> None:
+        self.enabled = enabled
+        self.max_events = max_events
+        self._record_events = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: dict[str, SpanStats] = {}
+        self._rng = random.Random(0)
+        self._events: list[tuple[str, float, float, int, dict[str, Any]]] = []
+        self._dropped_events = 0
+        self._origin = time.perf_counter()
+
+    def enable(self, record_events: bool = False) -> None:
+        """Start recording spans. If 'record_events' is set, individual spans are kept
+        so they can be exported as trace events."""
+        self.enabled = True
+        self._record_events = record_events
+
+    def disable(self) -> None:
+        """Stop recording spans"""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Discard everything recorded so far"""
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+            self._dropped_events = 0
+            self._origin = time.perf_counter()
+
+    def _stack(self) -> list[str]:
+        stack: Optional[list[str]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[None]:
+        """Time the enclosed block as a span called 'name', nested under any span
+        which is already open on this thread."""
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._stack()
+        stack.append(name)
+        path = PATH_SEPARATOR.join(stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            self._record(path, start, end, attributes)
+
+    def _record(
+        self, path: str, start: float, end: float, attributes: dict[str, Any]
+    ) -> None:
+        with self._lock:
+            if (stats := self._stats.get(path)) is None:
+                stats = self._stats[path] = SpanStats()
+            stats.add(end - start, self._rng)
+
+            if self._record_events:
+                if len(self._events) < self.max_events:
+                    self._events.append(
+                        (path, start, end, threading.get_ident(), attributes)
+                    )
+                else:
+                    self._dropped_events += 1
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Aggregated statistics (count, total, mean, min, percentiles and max, in
+        seconds) for each span path. The percentiles are estimated from a sample of
+        the durations once there are more than SAMPLE_SIZE."""
+        with self._lock:
+            stats_of = {
+                path: (stats, sorted(stats.sample))
+                for path, stats in self._stats.items()
+            }
+
+        summary: dict[str, dict[str, float]] = {}
+        for path in sorted(stats_of):
+            stats, sample = stats_of[path]
+            summary[path] = {
+                "count": stats.count,
+                "total_s": stats.total,
+                "mean_s": stats.total / stats.count,
+                "min_s": stats.minimum,
+                "p50_s": _percentile(sample, 0.5),
+                "p90_s": _percentile(sample, 0.9),
+                "p99_s": _percentile(sample, 0.99),
+                "max_s": stats.maximum,
+            }
+        return summary
+
+    def write_json(self, path: Path) -> None:
+        """Write the aggregated span statistics to 'path' as JSON"""
+        with path.open("w", encoding="utf-8") as file:
+            json.dump({"spans": self.summary()}, file, indent=4)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the recorded spans to 'path' in the Chrome trace-event format"""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": span_path.rsplit(PATH_SEPARATOR, 1)[-1],
+                    "cat": span_path,
+                    "ph": "X",
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": (end - start) * 1e6,
+                    "pid": pid,
+                    "tid": thread_id,
+                    "args": {key: str(value) for key, value in attributes.items()},
+                }
+                for span_path, start, end, thread_id, attributes in self._events
+            ]
+            dropped = self._dropped_events
+
+        with path.open("w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "traceEvents": events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {"dropped_events": dropped},
+                },
+                file,
+            )
+
+
+_TRACER = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the tracer used by the ingestion pipeline"""
+    return _TRACER
+
+
+def span(name: str, **attributes: Any) -> ContextManager[None]:
+    """Open a span called 'name' on the pipeline's tracer. Use as a context manager:
+
+    with span("smelt", object_type="dataset"):
+        ...
+    """
+    return _TRACER.span(name, **attributes)
@@ -0,0 +1,87 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the synthetic data trees used by the extraction benchmarks"""
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.bench_extract import run_extract_benchmark
+from benchmarks.data_trees import (
+    FileSizes,
+    Profile,
+    TreeShape,
+    generate_abi_music_tree,
+)
+
+SHAPE = TreeShape(
+    projects=1,
+    experiments_per_project=2,
+    datasets_per_experiment=2,
+    files_per_dataset=6,
+    depth=2,
+    files_per_directory=2,
+)
+
+
+NUM_DATASETS = 4
+
+
+# The ABI MuSIC extractor also ingests each dataset's metadata file, and the
+# RO-Crate extractor the crate's metadata file, as datafiles
+@pytest.mark.parametrize(
+    "profile,metadata_files",
+    [
+        (Profile.ABI_MUSIC, NUM_DATASETS),
+        (Profile.RO_CRATE, 1),
+        (Profile.IDW, 0),
+    ],
+)
+def test_extractors_find_all_generated_files(
+    profile: Profile, metadata_files: int
+) -> None:
+    result = run_extract_benchmark(profile, SHAPE)
+
+    assert result.datafiles_extracted == SHAPE.total_files + metadata_files
+    assert result.files_on_disk >= SHAPE.total_files
+    assert "extract" in result.stages
+
+
+def test_generated_tree_is_reproducible(tmp_path: Path) -> None:
+    shape = TreeShape(
+        experiments_per_project=1,
+        datasets_per_experiment=1,
+        files_per_dataset=10,
+        file_sizes=FileSizes(kind="lognormal", mean=512),
+    )
+    generate_abi_music_tree(tmp_path / "a", shape)
+    generate_abi_music_tree(tmp_path / "b", shape)
+
+    def contents(root: Path) -> dict[Path, bytes]:
+        return {
+            path.relative_to(root): path.read_bytes()
+            for path in root.rglob("*")
+            if path.is_file()
+        }
+
+    assert contents(tmp_path / "a") == contents(tmp_path / "b")
+
+
+def test_sparse_files_have_requested_sizes(tmp_path: Path) -> None:
+    shape = TreeShape(
+        experiments_per_project=1,
+        datasets_per_experiment=1,
+        files_per_dataset=3,
+        file_sizes=FileSizes(kind="fixed", mean=1 << 20),
+        sparse=True,
+    )
+    generate_abi_music_tree(tmp_path, shape)
+
+    data_files = [
+        path
+        for path in tmp_path.rglob("*")
+        if path.is_file() and path.suffix != ".json"
+    ]
+    assert len(data_files) == 3
+    assert all(path.stat().st_size == 1 << 20 for path in data_files)
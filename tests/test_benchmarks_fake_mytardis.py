@@ -0,0 +1,98 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the fake MyTardis server used by the benchmarks"""
+
+from benchmarks.bench_ingest import run_ingest_benchmark
+from benchmarks.fake_mytardis import (
+    FakeMyTardis,
+    FakeMyTardisServer,
+    FakeServerOptions,
+)
+from benchmarks.synthetic import ManifestShape
+from src.config.config import AuthConfig, ConnectionConfig
+from src.mytardis_client.mt_rest import MyTardisRESTFactory
+from src.mytardis_client.response_data import IngestedDatafile
+
+
+def test_fake_mytardis_pagination_and_filtering() -> None:
+    api = FakeMyTardis(FakeServerOptions(max_page_size=2))
+    for i in range(5):
+        api.store.add(
+            "dataset_file",
+            {"filename": f"file-{i}", "dataset": "/api/v1/dataset/1/"},
+        )
+    api.store.add(
+        "dataset_file", {"filename": "file-0", "dataset": "/api/v1/dataset/2/"}
+    )
+
+    status, page = api.handle("GET", "/api/v1/dataset_file/", "dataset=1&limit=10", b"")
+    assert status == 200
+    assert page is not None
+    assert page["meta"]["total_count"] == 5
+    assert page["meta"]["limit"] == 2
+    assert [obj["filename"] for obj in page["objects"]] == ["file-0", "file-1"]
+
+    _, page = api.handle(
+        "GET", "/api/v1/dataset_file/", "filename=file-0&dataset=2", b""
+    )
+    assert page is not None
+    assert [obj["id"] for obj in page["objects"]] == [6]
+
+    _, page = api.handle(
+        "GET", "/api/v1/instrument/", "identifier=benchmark-instrument", b""
+    )
+    assert page is not None
+    assert page["meta"]["total_count"] == 1
+
+
+def test_fake_mytardis_injected_errors() -> None:
+    api = FakeMyTardis(FakeServerOptions(error_rate=1.0))
+
+    status, _ = api.handle("GET", "/api/v1/project/", "", b"")
+
+    assert status == 502
+    assert api.stats.injected_errors == 1
+
+
+def test_fake_mytardis_serves_client() -> None:
+    with FakeMyTardisServer() as server:
+        api = server.api
+        api.store.add(
+            "dataset_file",
+            api._create_datafile(  # pylint: disable=protected-access
+                {
+                    "filename": "a.txt",
+                    "directory": "dir",
+                    "dataset": "/api/v1/dataset/1/",
+                    "md5sum": "0" * 32,
+                    "mimetype": "text/plain",
+                    "size": 1,
+                }
+            ),
+        )
+        client = MyTardisRESTFactory(
+            AuthConfig(username="test", api_key="test"),
+            ConnectionConfig(hostname=server.url),
+        )
+
+        objects, total = client.get_all("/dataset_file", {"dataset": 1})
+
+    assert total == 1
+    assert isinstance(objects[0], IngestedDatafile)
+    assert objects[0].filename == "a.txt"
+
+
+def test_ingest_benchmark_end_to_end() -> None:
+    result = run_ingest_benchmark(
+        "test",
+        ManifestShape(
+            datafiles=20, datafiles_per_dataset=10, datasets_per_experiment=1
+        ),
+        FakeServerOptions(),
+    )
+
+    assert result.objects == 1 + 2 + 2 + 20
+    assert result.failed_objects == 0
+    assert result.server_requests > 0
+    assert result.client_errors == 0
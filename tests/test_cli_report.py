@@ -0,0 +1,82 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the report and clean commands' handling of manifests and reports"""
+
+import csv
+from pathlib import Path
+
+import pytest
+import typer
+
+from benchmarks.synthetic import ManifestShape, make_manifest
+from src.blueprints.datafile import RawDatafile
+from src.cli.cmd_clean import datafile_paths, load_manifest
+from src.cli.cmd_report import _save_data_status
+from src.extraction.manifest import IngestionManifest
+
+
+def test_load_manifest_from_directory(tmp_path: Path) -> None:
+    manifest = make_manifest(ManifestShape(datafiles=5, datafiles_per_dataset=2))
+    manifest.serialize(tmp_path / "manifest")
+
+    loaded = load_manifest(manifest.get_data_root(), None, tmp_path / "manifest")
+
+    assert loaded.get_data_root() == manifest.get_data_root()
+    assert sorted(df.filename for df in loaded.get_datafiles()) == sorted(
+        df.filename for df in manifest.get_datafiles()
+    )
+
+
+def test_load_manifest_from_other_data_source(tmp_path: Path) -> None:
+    manifest = make_manifest(ManifestShape(datafiles=1), data_root=tmp_path / "a")
+    manifest.serialize(tmp_path / "manifest")
+
+    with pytest.raises(typer.BadParameter):
+        load_manifest(tmp_path / "b", None, tmp_path / "manifest")
+
+
+def test_load_manifest_needs_profile_or_manifest(tmp_path: Path) -> None:
+    with pytest.raises(typer.BadParameter):
+        load_manifest(tmp_path, None, None)
+
+
+def test_datafile_paths_of_packed_archive(tmp_path: Path) -> None:
+    manifest = IngestionManifest(
+        source_data_root=tmp_path / "source", staging_root=tmp_path / "staging"
+    )
+    archive = RawDatafile(
+        filename="image.zarr.tar",
+        directory=Path("data"),
+        md5sum="0123456789abcdef0123456789abcdef",
+        mimetype="application/x-tar",
+        size=2048,
+        dataset="dataset-1",
+        metadata={
+            "archive-source-directory": "image.zarr",
+            "archive-members": '[[".zattrs",10,512],["0/0",20,1536]]',
+        },
+    )
+
+    # Both the archive and the files packed into it are deleted
+    assert datafile_paths(manifest, archive) == [
+        tmp_path / "staging" / "data" / "image.zarr.tar",
+        tmp_path / "source" / "data" / "image.zarr" / ".zattrs",
+        tmp_path / "source" / "data" / "image.zarr" / "0/0",
+    ]
+
+
+def test_save_data_status(tmp_path: Path) -> None:
+    manifest = make_manifest(ManifestShape(datafiles=3))
+    datafiles = manifest.get_datafiles()
+    source_path = tmp_path / "source"
+
+    csv_path = _save_data_status(source_path, iter(datafiles[:1]), iter(datafiles[1:]))
+
+    with csv_path.open(encoding="utf-8") as csvfile:
+        rows = list(csv.DictReader(csvfile))
+
+    assert [row["ingestion_verified"] for row in rows] == ["True", "False", "False"]
+    assert rows[0]["filename"] == datafiles[0].filename
+    assert rows[0]["filepath"] == str(tmp_path / datafiles[0].filepath)
+    assert rows[0]["dataset"] == datafiles[0].dataset
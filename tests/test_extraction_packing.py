@@ -0,0 +1,155 @@
+# pylint: disable=missing-docstring
+# nosec assert_used
+# flake8: noqa S101
+
+from pathlib import Path
+
+from src.blueprints.datafile import RawDatafile
+from src.extraction.manifest import IngestionManifest
+from src.extraction.packing import (
+    ARCHIVE_MIMETYPE,
+    PackingOptions,
+    member_paths,
+    pack_directory,
+    read_member_index,
+)
+from src.mytardis_client.common_types import MTUrl
+from src.utils.filesystem.checksums import calculate_md5
+from src.utils.filesystem.filesystem_nodes import DirectoryNode, FileNode
+from src.utils.filesystem.filters import PathFilterSet
+
+
+def _collate(root: Path, dataset: str, file: FileNode) -> RawDatafile:
+    return RawDatafile(
+        filename=file.name(),
+        directory=file.path().relative_to(root).parent,
+        md5sum=calculate_md5(file.path()),
+        mimetype="application/octet-stream",
+        size=file.stat().st_size,
+        dataset=dataset,
+    )
+
+
+def _make_store(root: Path) -> Path:
+    store = root / "data" / "image.zarr"
+    (store / "0" / "0").mkdir(parents=True)
+    (store / ".zattrs").write_text('{"multiscales": []}')
+    for i in range(5):
+        (store / "0" / "0" / str(i)).write_bytes(bytes([i]) * (100 + i))
+    (store / "big.bin").write_bytes(b"x" * 4096)
+    (store / ".DS_Store").write_bytes(b"junk")
+    return store
+
+
+def test_pack_directory(tmp_path: Path) -> None:
+    store = _make_store(tmp_path)
+    staging_dir = tmp_path / "staging"
+
+    datafiles = pack_directory(
+        DirectoryNode(store),
+        tmp_path,
+        "dataset-1",
+        staging_dir=staging_dir,
+        file_filter=PathFilterSet(filter_system_files=True),
+        options=PackingOptions(
+            max_member_size=1024, schema=MTUrl("http://example.com/archive/1")
+        ),
+        collate_file=lambda f: _collate(tmp_path, "dataset-1", f),
+    )
+
+    assert len(datafiles) == 2
+    archive, big_file = datafiles
+
+    # The archive is written to the staging directory, not the source data
+    archive_path = staging_dir / "data" / "image.zarr.tar"
+    assert not (tmp_path / "data" / "image.zarr.tar").exists()
+    assert archive.filename == archive_path.name
+    assert archive.directory == Path("data")
+    assert archive.mimetype == ARCHIVE_MIMETYPE
+    assert archive.dataset == "dataset-1"
+    assert archive.size == archive_path.stat().st_size
+    assert archive.md5sum == calculate_md5(archive_path)
+    assert archive.object_schema == MTUrl("http://example.com/archive/1")
+
+    assert big_file.filename == "big.bin"
+    assert big_file.directory == Path("data/image.zarr")
+
+    # The members are in order of their paths
+    index = read_member_index(archive)
+    assert [member.name for member in index] == [
+        ".zattrs",
+        "0/0/0",
+        "0/0/1",
+        "0/0/2",
+        "0/0/3",
+        "0/0/4",
+    ]
+
+    # The recorded offsets should point directly at each member's data
+    archive_bytes = archive_path.read_bytes()
+    for member in index:
+        data = archive_bytes[member.offset : member.offset + member.size]
+        assert data == (store / member.name).read_bytes()
+
+    assert member_paths(archive, tmp_path) == [store / member.name for member in index]
+
+
+def test_pack_directory_is_reproducible(tmp_path: Path) -> None:
+    store = _make_store(tmp_path)
+
+    def pack() -> RawDatafile:
+        return pack_directory(
+            DirectoryNode(store),
+            tmp_path,
+            "dataset-1",
+            staging_dir=tmp_path / "staging",
+            file_filter=PathFilterSet(filter_system_files=True),
+            options=PackingOptions(max_member_size=1024),
+            collate_file=lambda f: _collate(tmp_path, "dataset-1", f),
+        )[0]
+
+    assert pack().md5sum == pack().md5sum
+
+
+def test_pack_directory_too_few_files(tmp_path: Path) -> None:
+    store = _make_store(tmp_path)
+
+    datafiles = pack_directory(
+        DirectoryNode(store),
+        tmp_path,
+        "dataset-1",
+        staging_dir=tmp_path / "staging",
+        file_filter=PathFilterSet(filter_system_files=True),
+        options=PackingOptions(max_member_size=1024, min_member_count=10),
+        collate_file=lambda f: _collate(tmp_path, "dataset-1", f),
+    )
+
+    assert len(datafiles) == 7
+    assert not (tmp_path / "staging").exists()
+
+
+def test_manifest_finds_archives_in_staging_root(tmp_path: Path) -> None:
+    store = _make_store(tmp_path / "source")
+    staging_dir = tmp_path / "staging"
+    manifest = IngestionManifest(
+        source_data_root=tmp_path / "source", staging_root=staging_dir
+    )
+    manifest.add_datafiles(
+        pack_directory(
+            DirectoryNode(store),
+            tmp_path / "source",
+            "dataset-1",
+            staging_dir=staging_dir,
+            file_filter=PathFilterSet(filter_system_files=True),
+            options=PackingOptions(max_member_size=1024),
+            collate_file=lambda f: _collate(tmp_path / "source", "dataset-1", f),
+        )
+    )
+    manifest.serialize(tmp_path / "manifest")
+
+    loaded = IngestionManifest.deserialize(tmp_path / "manifest")
+
+    assert loaded.get_staging_root() == staging_dir
+    big_file, archive = sorted(loaded.get_datafiles(), key=lambda df: df.filename)
+    assert loaded.get_datafile_path(archive) == staging_dir / "data" / "image.zarr.tar"
+    assert loaded.get_datafile_path(big_file) == store / "big.bin"
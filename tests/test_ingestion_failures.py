@@ -0,0 +1,406 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the isolation, retrying and recording of objects which fail to ingest"""
+
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import HTTPError
+
+from src.blueprints.datafile import Datafile, RawDatafile
+from src.blueprints.project import RawProject
+from src.cli.cmd_ingest import load_failed_objects
+from src.config.config import (
+    AuthConfig,
+    ConfigFromEnv,
+    ConnectionConfig,
+    FilesystemStorageBoxConfig,
+    GeneralConfig,
+    SchedulerConfig,
+    SchemaConfig,
+)
+from src.crucible.crucible import Crucible
+from src.extraction.manifest import IngestionManifest
+from src.forges.forge import ForgeError
+from src.ingestion_factory.factory import IngestionFactory
+from src.ingestion_factory.failures import (
+    describe_error,
+    is_transient,
+    DeadLetterLog,
+    read_dead_letters,
+)
+from src.ingestion_factory.results import (
+    RESULT_SAMPLE_SIZE,
+    IngestionResult,
+    ResultLog,
+)
+from src.mytardis_client.endpoints import URI
+from src.overseers.datafile_index import DatafileIndex
+from src.overseers.overseer import Overseer
+from src.smelters.smelter import Smelter
+
+
+def _http_error(status_code: int) -> HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return HTTPError(f"{status_code} error", response=response)
+
+
+def _raised_from(error: Exception, cause: Exception) -> Exception:
+    try:
+        raise error from cause
+    except Exception as raised:  # pylint: disable=broad-exception-caught
+        return raised
+
+
+def test_is_transient() -> None:
+    assert is_transient(RequestsConnectionError("refused"))
+    assert is_transient(_http_error(503))
+    assert is_transient(_raised_from(ForgeError("forge"), _http_error(429)))
+    assert is_transient(
+        _raised_from(RuntimeError("overseer"), RequestsConnectionError("reset"))
+    )
+
+    assert not is_transient(_http_error(400))
+    assert not is_transient(_raised_from(ForgeError("forge"), _http_error(404)))
+    assert not is_transient(ValueError("bad value"))
+
+
+def test_dead_letters_round_trip(
+    tmp_path: Path, raw_project: RawProject, raw_datafile: RawDatafile
+) -> None:
+    dead_letter_file = tmp_path / "failed.jsonl"
+
+    with DeadLetterLog(dead_letter_file, tmp_path) as dead_letters:
+        dead_letters.write("project", raw_project, "ForgeError: failed")
+        dead_letters.write("datafile", raw_datafile, "Unable to find the dataset")
+    manifest = read_dead_letters(dead_letter_file, tmp_path)
+
+    assert dead_letters.num_written == 2
+    assert manifest.get_data_root() == tmp_path
+    assert [project.model_dump(mode="json") for project in manifest.get_projects()] == [
+        raw_project.model_dump(mode="json")
+    ]
+    assert manifest.get_datafiles() == [raw_datafile]
+    assert not manifest.get_experiments() and not manifest.get_datasets()
+
+
+def test_dead_letters_are_scoped_to_source_data(
+    tmp_path: Path, raw_project: RawProject
+) -> None:
+    dead_letter_file = tmp_path / "failed.jsonl"
+    first_root, second_root = tmp_path / "first", tmp_path / "second"
+
+    with DeadLetterLog(dead_letter_file, first_root) as dead_letters:
+        dead_letters.write("project", raw_project, "ForgeError: first")
+    with DeadLetterLog(dead_letter_file, second_root) as dead_letters:
+        dead_letters.write("project", raw_project, "ForgeError: second")
+
+    # A run of other source data keeps the dead letters of the first
+    assert len(read_dead_letters(dead_letter_file, first_root).get_projects()) == 1
+    assert len(read_dead_letters(dead_letter_file, second_root).get_projects()) == 1
+
+    # Another run of the same source data replaces its dead letters
+    with DeadLetterLog(dead_letter_file, first_root):
+        pass
+    assert not read_dead_letters(dead_letter_file, first_root).get_projects()
+    assert "ForgeError: second" in dead_letter_file.read_text(encoding="utf-8")
+
+
+def test_failed_and_deferred_objects_are_sampled(
+    tmp_path: Path, raw_project: RawProject
+) -> None:
+    dead_letter_file = tmp_path / "failed.jsonl"
+    num_objects = RESULT_SAMPLE_SIZE + 5
+
+    with DeadLetterLog(dead_letter_file, tmp_path) as dead_letters, ResultLog(
+        tmp_path / "result.jsonl", dead_letters
+    ) as result_log:
+        result = IngestionResult.logged_to(result_log, "project")
+        for _ in range(num_objects):
+            result.fail(raw_project, "ForgeError: failed")
+            result.defer(raw_project, "ConnectionError: reset")
+        deferred = result_log.take_deferred()
+
+    # Only a sample is kept in memory, and every object is in the logs
+    assert len(result.failed) == len(result.deferred) == RESULT_SAMPLE_SIZE
+    assert result.num_error == result.num_deferred == num_objects
+    assert dead_letters.num_written == num_objects
+    assert len(deferred) == num_objects
+    assert deferred[0].raw_object().display_name == raw_project.display_name
+
+
+def test_ingest_projects_isolates_failures(raw_project: RawProject) -> None:
+    smelter = MagicMock()
+    transient = _raised_from(
+        RuntimeError("lookup failed"), RequestsConnectionError("reset")
+    )
+    permanent = ValueError("bad metadata")
+    smelter.smelt_project.side_effect = [transient, permanent, None]
+
+    factory = IngestionFactory(
+        config=MagicMock(),
+        mt_rest=MagicMock(),
+        overseer=MagicMock(),
+        smelter=smelter,
+        crucible=MagicMock(),
+        forge=MagicMock(),
+        conveyor=MagicMock(),
+    )
+    raw_projects = [
+        raw_project.model_copy(update={"name": name})
+        for name in ("deferred", "failed", "unrefined")
+    ]
+
+    result = factory.ingest_projects(raw_projects)
+
+    assert result.deferred == [(raw_projects[0], describe_error(transient))]
+    assert result.error == [
+        ("failed", "ValueError: bad metadata"),
+        ("unrefined", "Unable to refine the project's metadata"),
+    ]
+    assert [raw_object for raw_object, _ in result.failed] == raw_projects[1:]
+    # Only the errors are part of the results written out
+    assert set(result.model_dump()) == {
+        "num_success",
+        "num_skipped",
+        "num_error",
+        "success",
+        "skipped",
+        "error",
+    }
+
+
+def test_retry_deferred_refreshes_datafile_index(
+    tmp_path: Path,
+    raw_project: RawProject,
+    raw_datafile: RawDatafile,
+    dataset_uri: URI,
+) -> None:
+    overseer = MagicMock()
+    overseer.datafile_index = DatafileIndex()
+    crucible = MagicMock()
+    crucible.resolve_dataset.return_value = dataset_uri
+    config = MagicMock()
+    config.scheduler = SchedulerConfig(retry_rounds=2, retry_delay=0)
+
+    factory = IngestionFactory(
+        config=config,
+        mt_rest=MagicMock(),
+        overseer=overseer,
+        smelter=MagicMock(),
+        crucible=crucible,
+        forge=MagicMock(),
+        conveyor=MagicMock(),
+    )
+
+    result_log = ResultLog(tmp_path / "result.jsonl")
+    factory._result_log = result_log  # pylint: disable=protected-access
+    indexed_on_retry: list[bool] = []
+
+    def retry_datafiles(raw_datafiles: list[RawDatafile]) -> IngestionResult:
+        # A datafile created by a request which timed out must be looked up again
+        indexed_on_retry.append(overseer.datafile_index.has_dataset(dataset_uri))
+        result = IngestionResult.logged_to(result_log, "datafile")
+        if len(indexed_on_retry) == 1:
+            result.defer(raw_datafiles[0], "still down")
+        else:
+            result.add_skipped(raw_datafiles[0].display_name, None)
+        overseer.datafile_index.add_dataset(dataset_uri, [])
+        return result
+
+    factory.ingest_datafiles = MagicMock()  # type: ignore[method-assign]
+    factory.ingest_datafiles.side_effect = lambda _, objects, **__: retry_datafiles(
+        objects
+    )
+    factory.ingest_projects = MagicMock()  # type: ignore[method-assign]
+
+    def retry_projects(raw_projects: list[RawProject]) -> IngestionResult:
+        result = IngestionResult.logged_to(result_log, "project")
+        result.defer(raw_projects[0], "still down")
+        return result
+
+    factory.ingest_projects.side_effect = retry_projects
+
+    results = {
+        object_type: IngestionResult.logged_to(result_log, object_type)
+        for object_type in ("project", "experiment", "dataset", "datafile")
+    }
+    results["project"].defer(raw_project, "ConnectionError: reset")
+    results["datafile"].defer(raw_datafile, "ConnectionError: reset")
+    overseer.datafile_index.add_dataset(dataset_uri, [])
+
+    factory._retry_deferred(  # pylint: disable=protected-access
+        IngestionManifest(source_data_root=Path(".")), results
+    )
+
+    assert indexed_on_retry == [False, False]
+    assert results["datafile"].num_skipped == 1
+    assert not results["datafile"].failed
+    assert factory.ingest_projects.call_count == 2
+    assert [
+        (raw_object.display_name, reason)
+        for raw_object, reason in results["project"].failed
+    ] == [(raw_project.display_name, "still down (still failing after retries)")]
+    assert all(not result.num_deferred for result in results.values())
+    result_log.close()
+
+
+@pytest.fixture(name="datafile_factory")
+def fixture_datafile_factory(
+    tmp_path: Path,
+    general: GeneralConfig,
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    default_schema: SchemaConfig,
+    overseer: Overseer,
+    smelter: Smelter,
+    dataset_uri: URI,
+) -> IngestionFactory:
+    overseer.get_uris_by_identifier = MagicMock()  # type: ignore[method-assign]
+    overseer.get_uris_by_identifier.return_value = [dataset_uri]
+
+    # Every datafile is already ingested, so only needs transferring
+    def split_ingested_datafiles(
+        _: URI, datafiles: list[Datafile]
+    ) -> tuple[list[Datafile], list[Datafile]]:
+        return [], datafiles
+
+    overseer.split_ingested_datafiles = MagicMock()  # type: ignore[method-assign]
+    overseer.split_ingested_datafiles.side_effect = split_ingested_datafiles
+
+    config = ConfigFromEnv(
+        general=general,
+        auth=auth,
+        connection=connection,
+        default_schema=default_schema,
+        storage=FilesystemStorageBoxConfig(
+            storage_name="unix_fs", target_root_dir=tmp_path / "store"
+        ),
+        scheduler=SchedulerConfig(
+            max_workers=1,
+            retry_rounds=0,
+            dead_letter_file=tmp_path / "failed.jsonl",
+            result_log_file=tmp_path / "result.jsonl",
+        ),
+    )
+    return IngestionFactory(
+        config=config,
+        mt_rest=MagicMock(),
+        overseer=overseer,
+        smelter=smelter,
+        crucible=Crucible(overseer),
+        forge=MagicMock(),
+        conveyor=MagicMock(),
+    )
+
+
+def test_ingest_writes_failed_transfers_to_dead_letters(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    datafile_factory: IngestionFactory,
+    raw_datafile: RawDatafile,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    manifest = IngestionManifest(source_data_root=tmp_path / "source")
+    manifest.add_datafile(raw_datafile)
+    manifest.serialize(tmp_path / "manifest")
+
+    conveyor = MagicMock()
+    conveyor.transfer.side_effect = OSError("No space left on device")
+    datafile_factory.conveyor = conveyor
+
+    datafile_factory.ingest(manifest)
+
+    dead_letter_file = datafile_factory.config.scheduler.dead_letter_file
+    failed = read_dead_letters(dead_letter_file, tmp_path / "source")
+    assert failed.get_datafiles() == [raw_datafile]
+    assert "Transfer failed: OSError" in dead_letter_file.read_text(encoding="utf-8")
+    assert (tmp_path / "ingestion_result.json").exists()
+
+    # Replaying the dead letters, as 'upload --retry-failed' does, transfers the
+    # datafile again
+    conveyor.transfer.side_effect = None
+    conveyor.transfer.reset_mock()
+
+    datafile_factory.ingest(
+        load_failed_objects(tmp_path / "manifest", dead_letter_file)
+    )
+
+    [(data_root, datafiles)] = [call.args for call in conveyor.transfer.call_args_list]
+    assert data_root == tmp_path / "source"
+    assert [datafile.filename for datafile in datafiles] == [raw_datafile.filename]
+    assert not dead_letter_file.read_text(encoding="utf-8")
+
+
+def test_ingest_counts_failed_transfers_once(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    datafile_factory: IngestionFactory,
+    overseer: Overseer,
+    raw_datafile: RawDatafile,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    manifest = IngestionManifest(source_data_root=tmp_path / "source")
+    for i in range(2):
+        manifest.add_datafile(
+            raw_datafile.model_copy(update={"filename": f"file_{i}.txt"})
+        )
+
+    # One datafile is forged, and the other was already ingested
+    overseer.split_ingested_datafiles.side_effect = (  # type: ignore[attr-defined]
+        lambda _, datafiles: (datafiles[:1], datafiles[1:])
+    )
+    datafile_factory.conveyor.transfer.side_effect = (  # type: ignore[attr-defined]
+        OSError("No space left on device")
+    )
+
+    datafile_factory.ingest(manifest)
+
+    summary = json.loads(
+        (tmp_path / "ingestion_result.json").read_text(encoding="utf-8")
+    )["datafiles"]
+    assert summary["num_success"] == 0
+    assert summary["num_skipped"] == 0
+    assert summary["num_error"] == 2
+    result_log = datafile_factory.config.scheduler.result_log_file
+    records = [
+        json.loads(line) for line in result_log.read_text(encoding="utf-8").splitlines()
+    ]
+    assert [
+        record["status"] for record in records if record["object_type"] == "datafile"
+    ] == ["error", "error"]
+
+
+def test_ingest_logs_a_failed_group_once(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    datafile_factory: IngestionFactory,
+    overseer: Overseer,
+    raw_datafile: RawDatafile,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    manifest = IngestionManifest(source_data_root=tmp_path)
+    for i in range(3):
+        manifest.add_datafile(
+            raw_datafile.model_copy(update={"filename": f"file_{i}.txt"})
+        )
+    overseer.split_ingested_datafiles = MagicMock()  # type: ignore[method-assign]
+    overseer.split_ingested_datafiles.side_effect = ValueError("bad index")
+
+    datafile_factory.ingest(manifest)
+
+    errors = [record for record in caplog.records if record.exc_info]
+    assert [record.getMessage() for record in errors] == [
+        'Failed to ingest 3 objects, including "file_0.txt": ValueError: bad index'
+    ]
+    failed = read_dead_letters(
+        datafile_factory.config.scheduler.dead_letter_file, tmp_path
+    )
+    assert len(failed.get_datafiles()) == 3
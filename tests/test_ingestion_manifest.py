@@ -306,3 +306,18 @@ def test_serialize_deserialize_cycle(
     assert ingestion_manifest.get_experiments() == reloaded_manifest.get_experiments()
     assert ingestion_manifest.get_datasets() == reloaded_manifest.get_datasets()
     assert ingestion_manifest.get_datafiles() == reloaded_manifest.get_datafiles()
+
+
+def test_summarize(ingestion_manifest: IngestionManifest) -> None:
+    summary = ingestion_manifest.summarize(sample_size=1)
+
+    assert "Datafiles: 5\n" in summary
+    assert "Total size of datafiles: 60204 bytes" in summary
+    assert "Datafiles per dataset, for 5 datasets: min 1, median 1" in summary
+    assert "    text/plain: 5\n" in summary
+    assert "Datasets (first 1 of 3)" in summary
+    assert "project1_name" in summary and "project2_name" not in summary
+
+    full_summary = ingestion_manifest.summarize(full=True, skip_datafiles=False)
+    assert "project2_name" in full_summary
+    assert "file_5.txt" in full_summary
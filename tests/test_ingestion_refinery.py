@@ -0,0 +1,76 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the fused smelt and prepare stage for datafiles"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.blueprints.datafile import Datafile, RawDatafile
+from src.crucible.crucible import Crucible
+from src.ingestion_factory.refinery import DatafileRefinery
+from src.mytardis_client.endpoints import URI
+from src.overseers.overseer import Overseer
+from src.smelters.smelter import Smelter
+
+
+def test_refine_matches_smelt_and_prepare(
+    overseer: Overseer,
+    smelter: Smelter,
+    raw_datafile: RawDatafile,
+    datafile: Datafile,
+    dataset_uri: URI,
+) -> None:
+    overseer.get_uris_by_identifier = MagicMock()  # type: ignore[method-assign]
+    overseer.get_uris_by_identifier.return_value = [dataset_uri]
+
+    errors: list[tuple[RawDatafile, str]] = []
+    refined = list(
+        DatafileRefinery(Crucible(overseer), smelter).refine(
+            [raw_datafile], lambda raw, reason: errors.append((raw, reason))
+        )
+    )
+
+    datafile.replicas = []  # Replicas are handled after the refinery stage
+
+    assert refined == [(raw_datafile, datafile)]
+    assert not errors
+
+
+def test_refine_resolves_each_dataset_once(
+    overseer: Overseer,
+    smelter: Smelter,
+    raw_datafile: RawDatafile,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    overseer.get_uris_by_identifier = MagicMock()  # type: ignore[method-assign]
+    overseer.get_uris_by_identifier.side_effect = lambda _, identifier: (
+        [URI("/api/v1/dataset/1/")] if identifier == "good" else []
+    )
+
+    raw_datafiles = [
+        raw_datafile.model_copy(update={"filename": f"file_{i}.txt", "dataset": ds})
+        for i, ds in enumerate(["good", "bad", "good", "bad", "good"])
+    ]
+    raw_datafiles.append(
+        raw_datafile.model_copy(update={"filename": "", "dataset": "good"})
+    )
+
+    errors: list[str] = []
+    refined = list(
+        DatafileRefinery(Crucible(overseer), smelter).refine(
+            raw_datafiles, lambda raw, _: errors.append(raw.display_name)
+        )
+    )
+
+    assert [datafile.filename for _, datafile in refined] == [
+        "file_0.txt",
+        "file_2.txt",
+        "file_4.txt",
+    ]
+    assert errors == ["file_1.txt", "file_3.txt", ""]
+    assert "Malformed datafile dataclass produced by refinery. Datafile is " in (
+        caplog.messages
+    )
+    assert overseer.get_uris_by_identifier.call_count == 2
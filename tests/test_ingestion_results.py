@@ -0,0 +1,83 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the streaming of ingestion results to the result log"""
+
+import json
+from pathlib import Path
+
+from src.blueprints.project import RawProject
+from src.ingestion_factory.results import (
+    RESULT_SAMPLE_SIZE,
+    IngestionResult,
+    ResultLog,
+    summarise_result_log,
+    write_result_summary,
+)
+from src.mytardis_client.endpoints import URI
+
+
+def test_ingestion_result_keeps_counts_and_a_bounded_sample() -> None:
+    result = IngestionResult()
+    other = IngestionResult()
+    for index in range(RESULT_SAMPLE_SIZE):
+        result.add_success(f"object-{index}", None)
+        other.add_success(f"other-{index}", None)
+    other.add_error("broken", "ValueError: bad value")
+
+    result.merge(other)
+
+    assert result.num_success == 2 * RESULT_SAMPLE_SIZE
+    assert len(result.success) == RESULT_SAMPLE_SIZE
+    assert result.success[-1] == (f"object-{RESULT_SAMPLE_SIZE - 1}", None)
+    assert result.num_error == 1
+    assert result.error == [("broken", "ValueError: bad value")]
+
+
+def test_result_log_round_trip(tmp_path: Path, raw_project: RawProject) -> None:
+    log_file = tmp_path / "results.jsonl"
+    project_uri = URI("/api/v1/project/1/")
+
+    with ResultLog(log_file) as log:
+        projects = IngestionResult.logged_to(log, "project")
+        projects.add_success("project", project_uri)
+        projects.fail(raw_project, "ForgeError: failed")
+        datafiles = IngestionResult.logged_to(log, "datafile")
+        datafiles.add_skipped("file.txt", None)
+        # Merged results are not written again
+        IngestionResult.logged_to(log, "project").merge(projects)
+
+    assert len(log_file.read_text(encoding="utf-8").splitlines()) == 3
+
+    summary = summarise_result_log(log_file)
+    assert summary["project"].success == [("project", project_uri)]
+    assert summary["project"].error == [(raw_project.name, "ForgeError: failed")]
+    assert summary["datafile"].num_skipped == 1
+
+    summary_file = tmp_path / "summary.json"
+    write_result_summary(summary_file, summary)
+    with summary_file.open(encoding="utf-8") as file:
+        written = json.load(file)
+    assert set(written) == {"projects", "experiments", "datasets", "datafiles"}
+    assert written["experiments"]["num_success"] == 0
+    assert written["projects"]["num_error"] == 1
+
+
+def test_result_log_appends_runs(tmp_path: Path) -> None:
+    log_file = tmp_path / "results.jsonl"
+
+    with ResultLog(log_file) as log:
+        IngestionResult.logged_to(log, "project").add_error("project", "failed")
+    with ResultLog(log_file) as log, ResultLog(log_file) as other_log:
+        IngestionResult.logged_to(log, "project").add_success("project", None)
+        # Another run, e.g. of another manifest, appending at the same time
+        IngestionResult.logged_to(other_log, "project").add_skipped("other", None)
+        IngestionResult.logged_to(log, "dataset").add_success("dataset", None)
+
+    # The other runs' results are kept, but only this run's are summarised
+    assert len(log_file.read_text(encoding="utf-8").splitlines()) == 4
+    summary = summarise_result_log(log_file, log.run, log.start)
+    assert summary["project"].num_success == 1
+    assert summary["project"].num_skipped == 0
+    assert summary["project"].num_error == 0
+    assert summary["dataset"].num_success == 1
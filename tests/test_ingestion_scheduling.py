@@ -0,0 +1,216 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the scheduling of the objects of a manifest as a graph of tasks"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.blueprints.datafile import RawDatafile
+from src.blueprints.dataset import RawDataset
+from src.blueprints.experiment import RawExperiment
+from src.blueprints.project import RawProject
+from src.config.config import SchedulerConfig
+from src.extraction.manifest import IngestionManifest
+from src.ingestion_factory.factory import IngestionFactory
+from src.ingestion_factory.results import IngestionResult, ResultLog
+
+_OBJECT_TYPES = {
+    RawProject: "project",
+    RawExperiment: "experiment",
+    RawDataset: "dataset",
+    RawDatafile: "datafile",
+}
+
+
+class _Recorder:
+    """Stands in for the ingestion of each object type, recording the order in which
+    objects are ingested"""
+
+    def __init__(self) -> None:
+        self.ingested: list[str] = []
+        self.deferred: set[str] = set()
+        self.delays: dict[str, float] = {}
+        self.log: Optional[ResultLog] = None
+        self._lock = threading.Lock()
+
+    def ingest(self, objects: list[Any]) -> IngestionResult:
+        result = IngestionResult.logged_to(self.log, _OBJECT_TYPES[type(objects[0])])
+        for raw_object in objects:
+            name = raw_object.display_name
+            time.sleep(self.delays.get(name, 0.0))
+            with self._lock:
+                self.ingested.append(name)
+            if name in self.deferred:
+                result.defer(raw_object, "MyTardis is down")
+            else:
+                result.add_success(name, None)
+        return result
+
+    def ingest_datafiles(
+        self, _: Path, objects: list[Any], staging_root: Optional[Path] = None
+    ) -> IngestionResult:
+        assert staging_root is None
+        return self.ingest(objects)
+
+
+@pytest.fixture(name="run_manifest")
+def fixture_run_manifest(
+    tmp_path: Path,
+) -> Callable[[IngestionManifest, _Recorder], dict[str, IngestionResult]]:
+    def run_manifest(
+        manifest: IngestionManifest, recorder: _Recorder
+    ) -> dict[str, IngestionResult]:
+        config = MagicMock()
+        config.scheduler = SchedulerConfig(max_workers=4, retry_rounds=0)
+        factory = IngestionFactory(
+            config=config,
+            mt_rest=MagicMock(),
+            overseer=MagicMock(),
+            smelter=MagicMock(),
+            crucible=MagicMock(),
+            forge=MagicMock(),
+            conveyor=MagicMock(),
+        )
+        for method in ("ingest_projects", "ingest_experiments", "ingest_datasets"):
+            setattr(factory, method, recorder.ingest)
+        setattr(factory, "ingest_datafiles", recorder.ingest_datafiles)
+        with ResultLog(tmp_path / "result.jsonl") as result_log:
+            recorder.log = result_log
+            factory._result_log = result_log  # pylint: disable=protected-access
+            return factory._run(manifest)  # pylint: disable=protected-access
+
+    return run_manifest
+
+
+def _hierarchy(
+    raw_project: RawProject,
+    raw_experiment: RawExperiment,
+    raw_dataset: RawDataset,
+    raw_datafile: RawDatafile,
+) -> IngestionManifest:
+    """A manifest of one project, experiment and dataset, and two datafiles, each
+    referring to the one above it"""
+    manifest = IngestionManifest(source_data_root=Path("."))
+    manifest.add_project(
+        raw_project.model_copy(update={"name": "project", "identifiers": ["p"]})
+    )
+    manifest.add_experiment(
+        raw_experiment.model_copy(
+            update={"title": "experiment", "identifiers": ["e"], "projects": ["p"]}
+        )
+    )
+    manifest.add_dataset(
+        raw_dataset.model_copy(
+            update={
+                "description": "dataset",
+                "identifiers": ["d"],
+                "experiments": ["e"],
+            }
+        )
+    )
+    for name in ("file_1.txt", "file_2.txt"):
+        manifest.add_datafile(
+            raw_datafile.model_copy(update={"filename": name, "dataset": "d"})
+        )
+    return manifest
+
+
+def test_parents_ingested_before_children(
+    raw_project: RawProject,
+    raw_experiment: RawExperiment,
+    raw_dataset: RawDataset,
+    raw_datafile: RawDatafile,
+    run_manifest: Callable[[IngestionManifest, _Recorder], dict[str, IngestionResult]],
+) -> None:
+    recorder = _Recorder()
+    # Without the dependencies, the slow parents would finish last
+    recorder.delays = {"project": 0.05, "experiment": 0.05, "dataset": 0.05}
+
+    results = run_manifest(
+        _hierarchy(raw_project, raw_experiment, raw_dataset, raw_datafile), recorder
+    )
+
+    assert recorder.ingested[:3] == ["project", "experiment", "dataset"]
+    assert sorted(recorder.ingested[3:]) == ["file_1.txt", "file_2.txt"]
+    assert [results[key].num_success for key in results] == [1, 1, 1, 2]
+
+
+def test_deferred_parent_defers_children(
+    raw_project: RawProject,
+    raw_experiment: RawExperiment,
+    raw_dataset: RawDataset,
+    raw_datafile: RawDatafile,
+    run_manifest: Callable[[IngestionManifest, _Recorder], dict[str, IngestionResult]],
+) -> None:
+    recorder = _Recorder()
+    recorder.deferred = {"experiment"}
+
+    results = run_manifest(
+        _hierarchy(raw_project, raw_experiment, raw_dataset, raw_datafile), recorder
+    )
+
+    # The dataset and datafiles wait for the experiment, rather than failing to find
+    # it, and fail only once it has run out of retries
+    assert recorder.ingested == ["project", "experiment"]
+    assert [raw.display_name for raw, _ in results["dataset"].failed] == ["dataset"]
+    assert [reason for _, reason in results["datafile"].failed] == [
+        "A parent object was deferred (still failing after retries)"
+    ] * 2
+
+
+def test_parent_outside_manifest(
+    raw_experiment: RawExperiment,
+    raw_dataset: RawDataset,
+    run_manifest: Callable[[IngestionManifest, _Recorder], dict[str, IngestionResult]],
+) -> None:
+    manifest = IngestionManifest(source_data_root=Path("."))
+    # The project was ingested by an earlier run, so isn't in the manifest
+    manifest.add_experiment(
+        raw_experiment.model_copy(
+            update={"title": "experiment", "identifiers": ["e"], "projects": ["old"]}
+        )
+    )
+    manifest.add_dataset(
+        raw_dataset.model_copy(
+            update={
+                "description": "dataset",
+                "identifiers": ["d"],
+                "experiments": ["e"],
+            }
+        )
+    )
+    recorder = _Recorder()
+
+    results = run_manifest(manifest, recorder)
+
+    assert recorder.ingested == ["experiment", "dataset"]
+    assert results["experiment"].num_success == 1
+
+
+def test_children_wait_for_every_object_with_shared_identifier(
+    raw_project: RawProject,
+    raw_experiment: RawExperiment,
+    run_manifest: Callable[[IngestionManifest, _Recorder], dict[str, IngestionResult]],
+) -> None:
+    manifest = IngestionManifest(source_data_root=Path("."))
+    for name in ("fast", "slow"):
+        manifest.add_project(
+            raw_project.model_copy(update={"name": name, "identifiers": ["shared"]})
+        )
+    manifest.add_experiment(
+        raw_experiment.model_copy(
+            update={"title": "experiment", "identifiers": ["e"], "projects": ["shared"]}
+        )
+    )
+    recorder = _Recorder()
+    recorder.delays = {"slow": 0.05}
+
+    run_manifest(manifest, recorder)
+
+    assert recorder.ingested == ["fast", "slow", "experiment"]
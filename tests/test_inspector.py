@@ -0,0 +1,135 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the Inspector and of the verification of ingested datafiles"""
+
+import json
+from pathlib import Path
+
+from benchmarks.bench_ingest import make_config
+from benchmarks.fake_mytardis import FakeMyTardisServer, FakeServerOptions
+from src.blueprints.datafile import RawDatafile
+from src.cli.cmd_clean import filter_completed_dfs
+from src.inspector.inspector import Inspector
+
+
+def _raw_datafile(filename: str, directory: str, dataset: str) -> RawDatafile:
+    return RawDatafile(
+        filename=filename,
+        directory=Path(directory),
+        md5sum="0123456789abcdef0123456789abcdef",
+        mimetype="text/plain",
+        size=1,
+        dataset=dataset,
+    )
+
+
+def _add_dataset(server: FakeMyTardisServer, identifier: str) -> str:
+    _, dataset = server.api.handle(
+        "POST",
+        "/api/v1/dataset/",
+        "",
+        json.dumps(
+            {
+                "description": identifier,
+                "identifiers": [identifier],
+                "instrument": "/api/v1/instrument/1/",
+            }
+        ).encode(),
+    )
+    assert dataset is not None
+    uri: str = dataset["resource_uri"]
+    return uri
+
+
+def _add_datafile(
+    server: FakeMyTardisServer,
+    dataset_uri: str,
+    filename: str,
+    directory: str,
+    verified: bool,
+) -> None:
+    server.api.store.add(
+        "dataset_file",
+        {
+            "filename": filename,
+            "directory": directory,
+            "dataset": dataset_uri,
+            "md5sum": "0123456789abcdef0123456789abcdef",
+            "mimetype": "text/plain",
+            "size": 1,
+            "created_time": None,
+            "modification_time": None,
+            "deleted": False,
+            "deleted_time": None,
+            "identifiers": None,
+            "parameter_sets": [],
+            "public_access": False,
+            "replicas": [
+                {
+                    "created_time": "2024-01-01T00:00:00",
+                    "datafile": "/api/v1/dataset_file/1/",
+                    "last_verified_time": "2024-01-01T00:00:00",
+                    "location": "benchmark",
+                    "uri": f"{directory}/{filename}",
+                    "verified": verified,
+                    "id": 1,
+                    "resource_uri": "/api/v1/replica/1/",
+                }
+            ],
+            "version": 1,
+        },
+    )
+
+
+def test_query_datafiles_fetches_each_dataset_once(tmp_path: Path) -> None:
+    with FakeMyTardisServer(FakeServerOptions(max_page_size=2)) as server:
+        dataset_a = _add_dataset(server, "dataset-a")
+        dataset_b = _add_dataset(server, "dataset-b")
+        for i in range(5):
+            _add_datafile(server, dataset_a, f"file-{i}", "dir", verified=i != 3)
+        _add_datafile(server, dataset_b, "file-0", "dir", verified=True)
+
+        raw_dfs = [_raw_datafile(f"file-{i}", "dir", "dataset-a") for i in range(6)]
+        raw_dfs.append(_raw_datafile("file-0", "other", "dataset-b"))
+        raw_dfs.append(_raw_datafile("file-0", "dir", "dataset-b"))
+        raw_dfs.append(_raw_datafile("file-0", "dir", "dataset-missing"))
+
+        results = Inspector(make_config(server.url, tmp_path)).query_datafiles(raw_dfs)
+
+        assert [len(r) if r is not None else None for r in results] == [
+            1,
+            1,
+            1,
+            1,
+            1,
+            0,
+            0,
+            1,
+            None,
+        ]
+        assert results[2] is not None and results[2][0].filename == "file-2"
+
+        # One lookup per dataset, and three pages of datafiles for dataset-a
+        dataset_file_requests = server.api.stats.requests[("GET", "dataset_file")]
+        assert dataset_file_requests == 4
+        assert server.api.stats.requests[("GET", "dataset")] == 3
+
+
+def test_filter_completed_dfs(tmp_path: Path) -> None:
+    with FakeMyTardisServer(FakeServerOptions()) as server:
+        dataset = _add_dataset(server, "dataset-a")
+        _add_datafile(server, dataset, "verified", "", verified=True)
+        _add_datafile(server, dataset, "unverified", "", verified=False)
+
+        raw_dfs = [
+            _raw_datafile("verified", "", "dataset-a"),
+            _raw_datafile("unverified", "", "dataset-a"),
+            _raw_datafile("missing", "", "dataset-a"),
+        ]
+        verified, unverified = filter_completed_dfs(
+            make_config(server.url, tmp_path), raw_dfs, min_file_age=0
+        )
+
+        assert [df.filename for df in verified] == ["verified"]
+        assert [df.filename for df in unverified] == ["unverified", "missing"]
@@ -0,0 +1,137 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the control of the concurrency and rate of requests to MyTardis"""
+
+import threading
+import time
+
+import responses
+
+from src.config.config import AuthConfig, ConnectionConfig, FlowControlConfig
+from src.mytardis_client.flow_control import (
+    AdaptiveConcurrencyLimiter,
+    FlowController,
+    TokenBucket,
+)
+from src.mytardis_client.mt_rest import MyTardisRESTFactory
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_token_bucket_limits_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() > 0.0
+
+    for _ in range(20):
+        bucket.acquire()
+    # 5 tokens were available immediately, the rest arrive at 10 per second
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_limiter_additive_increase_multiplicative_decrease() -> None:
+    clock = FakeClock()
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=8, clock=clock)
+
+    # The limit grows by about one for each limit's worth of successes
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(latency=0.1, congested=False)
+    assert limiter.limit == 5
+
+    limiter.acquire()
+    limiter.release(latency=0.1, congested=True)
+    assert limiter.limit == 2
+
+    # Further failures within a round trip count as the same overload signal
+    limiter.acquire()
+    limiter.release(latency=0.1, congested=True)
+    assert limiter.limit == 2
+
+    clock.now += 1.0
+    limiter.acquire()
+    limiter.release(latency=0.1, congested=True)
+    clock.now += 1.0
+    limiter.acquire()
+    limiter.release(latency=0.1, congested=True)
+    assert limiter.limit == 1
+
+    for _ in range(1000):
+        limiter.acquire()
+        limiter.release(latency=0.1, congested=False)
+    assert limiter.limit == 8
+
+
+def test_limiter_bounds_requests_in_flight() -> None:
+    limiter = AdaptiveConcurrencyLimiter(initial=3, minimum=1, maximum=3)
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def work() -> None:
+        nonlocal in_flight, max_in_flight
+        limiter.acquire()
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        limiter.release(latency=0.01, congested=False)
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max_in_flight == 3
+    assert limiter.in_flight == 0
+
+
+def test_flow_controller_detects_congestion() -> None:
+    controller = FlowController(FlowControlConfig(latency_target=1.0))
+
+    assert controller.is_congestion(None, 0.1)
+    assert controller.is_congestion(503, 0.1)
+    assert controller.is_congestion(200, 2.0)
+    assert not controller.is_congestion(200, 0.1)
+    assert not controller.is_congestion(404, 0.1)
+
+
+@responses.activate
+def test_rest_factory_backs_off_when_overloaded(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(
+        update={"flow_control": FlowControlConfig(initial_concurrency=8)}
+    )
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+
+    responses.add(
+        responses.GET,
+        mt_client.compose_url("/introspection"),
+        status=429,
+    )
+
+    try:
+        mt_client.request("GET", "/introspection")
+    except Exception:  # pylint: disable=broad-exception-caught
+        pass
+
+    assert mt_client.flow_control.snapshot().concurrency_limit == 4
+    assert mt_client.flow_control.snapshot().in_flight == 0
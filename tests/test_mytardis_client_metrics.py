@@ -0,0 +1,124 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the request metrics recorded by the MyTardis REST client"""
+
+from typing import Any
+
+import mock
+import pytest
+import responses
+from mock import MagicMock
+from requests import ConnectTimeout, RequestException, Response
+from tenacity import wait_fixed
+
+from src.config.config import AuthConfig, ConnectionConfig
+from src.mytardis_client.metrics import RequestMetrics
+from src.mytardis_client.mt_rest import MyTardisRESTFactory
+
+
+def test_request_metrics_record_and_snapshot() -> None:
+    metrics = RequestMetrics()
+
+    metrics.record_request("GET", "/project", 0.02, 200, bytes_received=100)
+    metrics.record_request("GET", "/project", 0.2, 200, bytes_received=50)
+    metrics.record_request("GET", "/project", 0.2, 404)
+    metrics.record_request("POST", "/dataset", 1.5, 201, bytes_sent=10)
+    metrics.record_failure("GET", "/project", 30.0, ConnectTimeout())
+    metrics.record_retry("GET", "/project")
+    metrics.record_overseer_cache_lookup("/dataset_file", hit=True)
+    metrics.record_overseer_cache_lookup("/dataset_file", hit=False)
+
+    get_stats = metrics.endpoint_stats("GET", "/project")
+    assert get_stats.requests == 4
+    assert get_stats.errors == 2
+    assert get_stats.retries == 1
+    assert get_stats.bytes_received == 150
+    assert get_stats.status_codes == {200: 2, 404: 1}
+    assert get_stats.error_types == {"ConnectTimeout": 1}
+    assert get_stats.latency.count == 4
+
+    snapshot = metrics.snapshot()
+    assert [(e["method"], e["endpoint"]) for e in snapshot["endpoints"]] == [
+        ("GET", "/project"),
+        ("POST", "/dataset"),
+    ]
+    assert snapshot["endpoints"][0]["latency_p50_s"] == 0.25
+    assert snapshot["overseer_cache"]["/dataset_file"]["hit_ratio"] == 0.5
+
+
+def test_request_metrics_prometheus_format() -> None:
+    metrics = RequestMetrics()
+    metrics.record_request("GET", "/project", 0.02, 200)
+    metrics.record_request("GET", "/project", 0.7, 200)
+
+    text = metrics.to_prometheus()
+
+    assert 'mytardis_requests_total{method="GET",endpoint="/project"} 2' in text
+    assert (
+        'mytardis_request_duration_seconds_bucket{method="GET",endpoint="/project",'
+        'le="0.025"} 1'
+    ) in text
+    assert (
+        'mytardis_request_duration_seconds_bucket{method="GET",endpoint="/project",'
+        'le="+Inf"} 2'
+    ) in text
+    assert (
+        'mytardis_request_duration_seconds_count{method="GET",endpoint="/project"} 2'
+        in text
+    )
+
+
+@responses.activate
+def test_rest_factory_records_requests(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    datafile_get_response_single: dict[str, Any],
+) -> None:
+    mt_client = MyTardisRESTFactory(auth, connection)
+
+    responses.add(
+        responses.GET,
+        mt_client.compose_url("/dataset_file"),
+        status=200,
+        json=datafile_get_response_single,
+    )
+    responses.add(
+        responses.POST,
+        mt_client.compose_url("/dataset_file") + "/",
+        status=201,
+    )
+
+    _ = mt_client.get("/dataset_file")
+    _ = mt_client.request("POST", "/dataset_file", data='{"filename": "a.txt"}')
+
+    get_stats = mt_client.metrics.endpoint_stats("GET", "/dataset_file")
+    assert get_stats.requests == 1
+    assert get_stats.errors == 0
+    assert get_stats.bytes_received > 0
+
+    post_stats = mt_client.metrics.endpoint_stats("POST", "/dataset_file")
+    assert post_stats.requests == 1
+    assert post_stats.bytes_sent == len('{"filename": "a.txt"}')
+
+
+@mock.patch("requests.Session.request")
+def test_rest_factory_records_retries(
+    mock_requests_request: MagicMock, auth: AuthConfig, connection: ConnectionConfig
+) -> None:
+    mock_response = Response()
+    mock_response.status_code = 502
+    mock_response._content = b""  # pylint: disable=protected-access
+    mock_requests_request.return_value = mock_response
+
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+    mt_client.request.retry.wait = wait_fixed(0)  # type: ignore[attr-defined]
+
+    with pytest.raises(RequestException):
+        _ = mt_client.request("GET", "/project")
+
+    stats = mt_client.metrics.endpoint_stats("GET", "/project")
+    assert stats.requests == 8
+    assert stats.retries == 7
+    assert stats.errors == 8
+    assert stats.status_codes == {502: 8}
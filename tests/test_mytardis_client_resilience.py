@@ -0,0 +1,171 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the circuit breaker and retry budget of the MyTardis REST client"""
+
+import threading
+
+import pytest
+import responses
+from requests import HTTPError
+from tenacity import wait_none
+
+from src.config.config import AuthConfig, ConnectionConfig, ResilienceConfig
+from src.mytardis_client.mt_rest import BadGateWayException, MyTardisRESTFactory
+from src.mytardis_client.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    RetryBudget,
+)
+
+
+def test_retry_budget() -> None:
+    budget = RetryBudget(ratio=0.5, minimum=1)
+
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+    for _ in range(4):
+        budget.record_request()
+    assert budget.remaining == 2
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_circuit_breaker_opens_and_recovers() -> None:
+    healthy = threading.Event()
+    probes = 0
+
+    def probe() -> bool:
+        nonlocal probes
+        probes += 1
+        if probes == 2:
+            healthy.set()
+        return healthy.is_set()
+
+    breaker = CircuitBreaker(
+        probe, failure_rate=0.5, window_size=4, min_requests=4, probe_interval=0.01
+    )
+
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.state is CircuitState.CLOSED
+    breaker.record(False)
+    assert breaker.state is CircuitState.OPEN
+
+    # All waiting threads resume once a probe succeeds
+    threads = [threading.Thread(target=breaker.before_request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert breaker.state is CircuitState.CLOSED
+    assert probes == 2
+    assert breaker.times_opened == 1
+
+
+def test_circuit_breaker_gives_up_after_max_outage() -> None:
+    breaker = CircuitBreaker(
+        lambda: False,
+        window_size=1,
+        min_requests=1,
+        probe_interval=0.01,
+        max_outage=0.05,
+    )
+    breaker.record(False)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+@responses.activate
+def test_rest_factory_stops_retrying_when_budget_exhausted(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(
+        update={
+            "resilience": ResilienceConfig(
+                circuit_breaker=False, retry_ratio=0, min_retries=3
+            )
+        }
+    )
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+    mt_client.request.retry.wait = wait_none()  # type: ignore[attr-defined]
+
+    url = mt_client.compose_url("/project")
+    responses.add(responses.GET, url, status=502)
+
+    with pytest.raises(BadGateWayException):
+        mt_client.request("GET", "/project")
+    assert len(responses.calls) == 4
+
+    # No retries are left for later requests
+    with pytest.raises(BadGateWayException):
+        mt_client.request("GET", "/project")
+    assert len(responses.calls) == 5
+
+
+@responses.activate
+def test_rest_factory_pauses_while_server_down(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(
+        update={
+            "resilience": ResilienceConfig(
+                window_size=2, min_requests=2, probe_interval=0.01
+            )
+        }
+    )
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+
+    responses.add(responses.GET, mt_client.compose_url("/project"), status=503)
+    responses.add(responses.GET, mt_client.compose_url("/project"), status=503)
+    responses.add(responses.GET, mt_client.compose_url("/introspection"), status=503)
+    responses.add(responses.GET, mt_client.compose_url("/introspection"), status=200)
+    responses.add(responses.GET, mt_client.compose_url("/project"), status=200)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            mt_client.request("GET", "/project")
+    assert mt_client.circuit_breaker is not None
+    assert mt_client.circuit_breaker.state is CircuitState.OPEN
+
+    response = mt_client.request("GET", "/project")
+
+    assert response.status_code == 200
+    assert mt_client.circuit_breaker.state is CircuitState.CLOSED
+    assert [call.request.url.split("?")[0] for call in responses.calls][2:] == [
+        mt_client.compose_url("/introspection"),
+        mt_client.compose_url("/introspection"),
+        mt_client.compose_url("/project"),
+    ]
+
+
+@responses.activate
+def test_rest_factory_circuit_ignores_server_errors_for_bad_requests(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(
+        update={
+            "resilience": ResilienceConfig(
+                window_size=2, min_requests=2, retry_ratio=0, min_retries=0
+            )
+        }
+    )
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+
+    responses.add(responses.GET, mt_client.compose_url("/project"), status=500)
+
+    for _ in range(4):
+        with pytest.raises(HTTPError):
+            mt_client.request("GET", "/project")
+
+    assert mt_client.circuit_breaker is not None
+    assert mt_client.circuit_breaker.state is CircuitState.CLOSED
@@ -4,7 +4,11 @@
 """Tests to validate the helper functions"""
 
 
+import gzip
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import mock
@@ -15,17 +19,27 @@ from requests import HTTPError, Request, RequestException, Response
 from responses import matchers
 from tenacity import wait_fixed
 
+from benchmarks.bench_validation import (
+    make_datafile_json,
+    make_page,
+    validate_page,
+    validate_per_object,
+)
 from src.blueprints.datafile import Datafile
-from src.config.config import AuthConfig, ConnectionConfig
+from src.config.config import AuthConfig, ConnectionConfig, TransportConfig
 from src.mytardis_client.endpoints import URI, MyTardisEndpoint
 from src.mytardis_client.mt_rest import (
     GetRequestMetaParams,
     GetResponseMeta,
     MyTardisRESTFactory,
     endpoint_is_not,
+    get_page_adapter,
     sanitize_params,
 )
-from src.mytardis_client.response_data import IngestedDatafile
+from src.mytardis_client.response_data import (
+    IngestedDatafile,
+    IngestedDatafileMatchKeys,
+)
 from src.utils.types.type_helpers import is_list_of
 
 logger = logging.getLogger(__name__)
@@ -334,3 +348,152 @@ def test_make_endpoint_filter(
     response.url = url
 
     assert endpoint_is_not(endpoints)(response) == expected_output
+
+
+def test_get_page_adapter_matches_per_object_validation() -> None:
+    content = make_page(5)
+
+    assert get_page_adapter(IngestedDatafile) is get_page_adapter(IngestedDatafile)
+    assert validate_page(content) == validate_per_object(content)
+
+
+@responses.activate
+def test_mytardis_client_rest_get_single_object(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    mt_client = MyTardisRESTFactory(auth, connection)
+
+    responses.add(
+        responses.GET,
+        mt_client.compose_url("/dataset_file"),
+        status=200,
+        json={
+            "meta": {
+                "limit": 20,
+                "offset": 0,
+                "total_count": 1,
+                "next": None,
+                "previous": None,
+            },
+            "objects": make_datafile_json(3),
+        },
+    )
+
+    datafiles, meta = mt_client.get("/dataset_file")
+
+    assert meta.total_count == 1
+    assert is_list_of(datafiles, IngestedDatafile)
+    assert [df.id for df in datafiles] == [3]
+
+
+@responses.activate
+def test_mytardis_client_rest_get_partial(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(update={"fields_param": "fields"})
+    mt_client = MyTardisRESTFactory(auth, connection)
+
+    responses.add(
+        responses.GET,
+        mt_client.compose_url("/dataset_file"),
+        match=[
+            matchers.query_param_matcher(
+                {"dataset": "1", "fields": "id,resource_uri,dataset,directory,filename"}
+            )
+        ],
+        status=200,
+        json={
+            "meta": {
+                "limit": 20,
+                "offset": 0,
+                "total_count": 1,
+                "next": None,
+                "previous": None,
+            },
+            # A server which ignores the projection returns complete objects
+            "objects": [make_datafile_json(3)],
+        },
+    )
+
+    datafiles, _ = mt_client.get(
+        "/dataset_file",
+        {"dataset": URI("/api/v1/dataset/1/")},
+        partial=IngestedDatafileMatchKeys,
+    )
+
+    assert is_list_of(datafiles, IngestedDatafileMatchKeys)
+    assert datafiles[0].filename == "image-00000003.tif"
+
+
+def test_mytardis_client_coalesces_identical_gets(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    datafile_get_response_single: dict[str, Any],
+) -> None:
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+    release = threading.Event()
+
+    def slow_response(
+        _request: Any,
+    ) -> tuple[int, dict[str, str], str]:
+        release.wait(timeout=5)
+        return 200, {}, json.dumps(datafile_get_response_single)
+
+    with responses.RequestsMock() as mock:
+        mock.add_callback(
+            responses.GET,
+            mt_client.compose_url("/dataset_file"),
+            callback=slow_response,
+        )
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(
+                    mt_client.get, "/dataset_file", {"dataset": dataset_uri}
+                )
+                for dataset_uri in ("/api/v1/dataset/1/", URI("/api/v1/dataset/1/")) * 2
+            ]
+            stats = mt_client.metrics.endpoint_stats
+            while stats("GET", "/dataset_file").coalesced < 3:
+                release.wait(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert len(mock.calls) == 1
+
+    assert all(result == results[0] for result in results)
+    assert mt_client.metrics.endpoint_stats("GET", "/dataset_file").coalesced == 3
+
+
+@responses.activate
+def test_mytardis_client_transport_settings(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+) -> None:
+    connection = connection.model_copy(
+        update={
+            "transport": TransportConfig(
+                keep_alive=False, accept_encoding="identity", gzip_min_bytes=100
+            )
+        }
+    )
+    mt_client = MyTardisRESTFactory(auth, connection)
+
+    responses.add(responses.POST, mt_client.compose_url("/project/"), status=201)
+
+    small = json.dumps({"name": "small"})
+    large = json.dumps({"description": "x" * 200})
+    mt_client.request("POST", "/project", data=small)
+    mt_client.request("POST", "/project", data=large)
+
+    small_request, large_request = [call.request for call in responses.calls]
+    for request in (small_request, large_request):
+        assert request.headers["Accept-Encoding"] == "identity"
+        assert request.headers["Connection"] == "close"
+
+    assert "Content-Encoding" not in small_request.headers
+    assert small_request.body == small.encode("utf-8")
+    assert large_request.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(large_request.body) == large.encode("utf-8")
@@ -4,12 +4,21 @@ Tests for caching in the Overseer.
 
 # pylint: disable=missing-function-docstring, missing-class-docstring
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
+from unittest.mock import MagicMock
 
+import pytest
 import responses
+from requests import HTTPError
 from responses import matchers
 
+from src.blueprints.datafile import Datafile
 from src.config.config import AuthConfig, ConnectionConfig
+from src.mytardis_client.endpoints import URI
+from src.mytardis_client.metrics import CacheStats, RequestMetrics
 from src.mytardis_client.mt_rest import (
     GetResponse,
     GetResponseMeta,
@@ -94,3 +103,296 @@ def test_overseer_prefetch(
         matches = overseer.get_matching_objects(MyTardisObject.DATAFILE, match_keys)
         assert len(matches) == 1
         assert matches[0] == df
+
+
+def test_endpoint_cache_keys_are_canonical(
+    ingested_datafile: IngestedDatafile,
+) -> None:
+    cache = MyTardisEndpointCache("/dataset")
+    objects: list[MyTardisObjectData] = [ingested_datafile]
+
+    cache.emplace(
+        {
+            "description": "dataset",
+            "experiments": ["/api/v1/experiment/2/", "/api/v1/experiment/1/"],
+            "instrument": {"resource_uri": "/api/v1/instrument/3/", "name": "inst"},
+        },
+        objects,
+    )
+
+    # Field order, list order and URI representation do not matter
+    assert (
+        cache.get(
+            {
+                "instrument": "/api/v1/instrument/3/",
+                "experiments": [
+                    URI("/api/v1/experiment/1/"),
+                    "/api/v1/experiment/2/",
+                ],
+                "description": "dataset",
+            }
+        )
+        == objects
+    )
+    assert cache.get({"identifier": "dataset"}) is None
+
+    assert cache.stats["description+experiments+instrument"] == CacheStats(
+        hits=1, misses=0
+    )
+    assert cache.stats["identifier"] == CacheStats(hits=0, misses=1)
+
+
+def test_endpoint_cache_merges_first_entry(
+    ingested_datafile: IngestedDatafile,
+) -> None:
+    cache = MyTardisEndpointCache("/dataset_file")
+    other = ingested_datafile.model_copy(update={"filename": "other.txt"})
+
+    cache.emplace({"identifier": "a"}, [ingested_datafile])
+    cache.emplace({"identifier": "a"}, [other])
+
+    assert cache.get({"identifier": "a"}) == [ingested_datafile, other]
+    assert len(cache) == 1
+
+
+@responses.activate
+def test_overseer_prefetch_datafiles(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    ingested_datafile: IngestedDatafile,
+) -> None:
+
+    mt_client = MyTardisRESTFactory(auth, connection)
+    overseer = Overseer(mt_client)
+
+    dataset = URI("/api/v1/dataset/1/")
+    ingested_datafiles = [
+        ingested_datafile.model_copy(
+            update={
+                "id": i + 10,
+                "filename": f"ingested-file-{i}.txt",
+                "directory": Path("dir") if i % 2 else Path(""),
+            }
+        )
+        for i in range(3)
+    ]
+
+    for offset in (0, 2):
+        page = ingested_datafiles[offset : offset + 2]
+        responses.add(
+            responses.GET,
+            mt_client.compose_url("/dataset_file"),
+            match=[
+                matchers.query_param_matcher(
+                    {"dataset": "1", "limit": "500", "offset": str(offset)}
+                ),
+            ],
+            status=200,
+            json=GetResponse(
+                objects=page,
+                meta=GetResponseMeta(
+                    limit=2, offset=offset, total_count=3, next=None, previous=None
+                ),
+            ).model_dump(mode="json"),
+        )
+
+    assert overseer.prefetch_datafiles(dataset) == 3
+    assert len(overseer.datafile_index) == 3
+
+    assert overseer.get_datafile_uri(
+        dataset, Path("dir"), "ingested-file-1.txt"
+    ) == URI("/api/v1/dataset_file/11/")
+    assert overseer.get_datafile_uri(dataset, None, "ingested-file-2.txt") == URI(
+        "/api/v1/dataset_file/12/"
+    )
+    # Missing from a prefetched dataset means not ingested, without another request
+    assert overseer.get_datafile_uri(dataset, None, "ingested-file-1.txt") is None
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_overseer_prefetch_datafiles_failed_page(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    ingested_datafile: IngestedDatafile,
+) -> None:
+
+    mt_client = MyTardisRESTFactory(auth, connection, use_cache=False)
+    overseer = Overseer(mt_client)
+
+    dataset = URI("/api/v1/dataset/1/")
+    ingested_datafiles = [
+        ingested_datafile.model_copy(
+            update={
+                "id": i + 10,
+                "filename": f"ingested-file-{i}.txt",
+                "directory": Path(""),
+            }
+        )
+        for i in range(3)
+    ]
+
+    def add_page(offset: int, status: int = 200) -> None:
+        page = ingested_datafiles[offset : offset + 2]
+        responses.add(
+            responses.GET,
+            mt_client.compose_url("/dataset_file"),
+            match=[
+                matchers.query_param_matcher(
+                    {"dataset": "1", "limit": "500", "offset": str(offset)}
+                ),
+            ],
+            status=status,
+            json=GetResponse(
+                objects=page,
+                meta=GetResponseMeta(
+                    limit=2, offset=offset, total_count=3, next=None, previous=None
+                ),
+            ).model_dump(mode="json"),
+        )
+
+    add_page(0)
+    add_page(2, status=500)
+    add_page(0)
+    add_page(2)
+
+    with pytest.raises(HTTPError):
+        overseer.prefetch_datafiles(dataset)
+
+    # The datafiles fetched before the failure are not taken to be all of them
+    assert not overseer.datafile_index.has_dataset(dataset)
+
+    assert overseer.prefetch_datafiles(dataset) == 3
+    assert overseer.get_datafile_uri(dataset, None, "ingested-file-2.txt") == URI(
+        "/api/v1/dataset_file/12/"
+    )
+    assert len(responses.calls) == 4
+
+
+def test_overseer_split_ingested_datafiles(
+    overseer: Overseer,
+    datafile: Datafile,
+) -> None:
+    dataset = URI("/api/v1/dataset/1/")
+    overseer.datafile_index.add_dataset(
+        dataset,
+        [
+            {"id": 10, "directory": "dir", "filename": "a.txt"},
+            {"id": 11, "directory": None, "filename": "b.txt"},
+        ],
+    )
+    datafiles = [
+        datafile.model_copy(update={"directory": directory, "filename": filename})
+        for directory, filename in [
+            (Path("dir"), "a.txt"),
+            (None, "a.txt"),
+            (Path("."), "b.txt"),
+            (Path("dir"), "c.txt"),
+        ]
+    ]
+
+    new_datafiles, ingested_datafiles = overseer.split_ingested_datafiles(
+        dataset, datafiles
+    )
+
+    assert new_datafiles == [datafiles[1], datafiles[3]]
+    assert ingested_datafiles == [datafiles[0], datafiles[2]]
+    assert overseer.rest_factory.metrics.overseer_cache_stats(
+        "/dataset_file"
+    ) == CacheStats(hits=2, misses=2)
+
+
+def test_overseer_caches_found_objects(ingested_datafile: IngestedDatafile) -> None:
+    rest_factory = MagicMock()
+    rest_factory.metrics = RequestMetrics()
+    found: list[MyTardisObjectData] = [ingested_datafile]
+    rest_factory.get.side_effect = lambda _, params: (
+        (found, None) if params == {"identifier": "found"} else ([], None)
+    )
+    overseer = Overseer(rest_factory)
+
+    for _ in range(2):
+        assert overseer.get_uris(MyTardisObject.PROJECT, {"identifier": "found"}) == [
+            ingested_datafile.resource_uri
+        ]
+        assert not overseer.get_uris(MyTardisObject.PROJECT, {"identifier": "missing"})
+
+    # Objects found are only fetched once, but lookups which found nothing are
+    # repeated, as the object may have been created since
+    assert rest_factory.get.call_count == 3
+    assert rest_factory.metrics.overseer_cache_stats("/project") == CacheStats(
+        hits=1, misses=3
+    )
+
+
+@responses.activate
+def test_overseer_shared_by_workers(
+    auth: AuthConfig,
+    connection: ConnectionConfig,
+    ingested_datafile: IngestedDatafile,
+    datafile: Datafile,
+    introspection_response: dict[str, Any],
+) -> None:
+    mt_client = MyTardisRESTFactory(auth, connection)
+    overseer = Overseer(mt_client)
+    num_workers = 8
+
+    responses.add(
+        responses.GET,
+        mt_client.compose_url("/introspection"),
+        status=200,
+        json=introspection_response,
+    )
+    for i in range(num_workers):
+        responses.add(
+            responses.GET,
+            mt_client.compose_url("/dataset_file"),
+            match=[
+                matchers.query_param_matcher({"dataset": str(i)}, strict_match=False)
+            ],
+            status=200,
+            json=GetResponse(
+                objects=[
+                    ingested_datafile.model_copy(
+                        update={
+                            "id": i,
+                            "directory": Path(""),
+                            "filename": f"ingested-{i}.txt",
+                        }
+                    )
+                ],
+                meta=GetResponseMeta(
+                    limit=500, offset=0, total_count=1, next=None, previous=None
+                ),
+            ).model_dump(mode="json"),
+        )
+
+    barrier = threading.Barrier(num_workers)
+
+    def work(i: int) -> tuple[list[Datafile], list[Datafile]]:
+        barrier.wait()
+        assert overseer.mytardis_setup.objects_with_ids
+        overseer.datafile_index.add_dataset(1000 + i, [])
+        return overseer.split_ingested_datafiles(
+            URI(f"/api/v1/dataset/{i}/"),
+            [
+                datafile.model_copy(update={"directory": None, "filename": filename})
+                for filename in (f"ingested-{i}.txt", f"new-{i}.txt")
+            ],
+        )
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = list(executor.map(work, range(num_workers)))
+
+    for i, (new_datafiles, ingested_datafiles) in enumerate(results):
+        assert [df.filename for df in new_datafiles] == [f"new-{i}.txt"]
+        assert [df.filename for df in ingested_datafiles] == [f"ingested-{i}.txt"]
+
+    # The introspection is fetched once, however many workers ask for it at once
+    assert [call.request.url for call in responses.calls].count(
+        mt_client.compose_url("/introspection")
+    ) == 1
+    assert len(overseer.datafile_index) == num_workers
+    assert overseer.rest_factory.metrics.overseer_cache_stats(
+        "/dataset_file"
+    ) == CacheStats(hits=num_workers, misses=num_workers)
@@ -0,0 +1,195 @@
+# pylint: disable=missing-function-docstring,redefined-outer-name
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the checks and conversion of metadata against MyTardis schemas"""
+
+from typing import Any
+
+import pytest
+import responses
+
+from src.blueprints.common_models import Parameter
+from src.blueprints.project import RawProject
+from src.config.config import GeneralConfig, SchemaConfig
+from src.mytardis_client.response_data import ParameterName
+from src.overseers.overseer import Overseer
+from src.smelters.parameter_compiler import (
+    CompiledSchema,
+    ParameterCompiler,
+    ParameterDataType,
+)
+from src.smelters.smelter import Smelter
+
+SCHEMA = "https://test-mytardis.nectar.acukland.ac.nz/Test/v1/Project"
+
+
+def make_parameter_name(
+    name: str, data_type: ParameterDataType, units: str = ""
+) -> dict[str, Any]:
+    return {
+        "id": 1,
+        "resource_uri": "/api/v1/parametername/1/",
+        "data_type": int(data_type),
+        "full_name": name.replace("_", " ").title(),
+        "immutable": False,
+        "is_searchable": True,
+        "name": name,
+        "schema": "/api/v1/schema/1/",
+        "sensitive": False,
+        "units": units,
+    }
+
+
+@pytest.fixture
+def schema_json() -> dict[str, Any]:
+    return {
+        "id": 1,
+        "resource_uri": "/api/v1/schema/1/",
+        "hidden": False,
+        "immutable": False,
+        "name": "Test project schema",
+        "namespace": SCHEMA,
+        "parameter_names": [
+            make_parameter_name("exposure", ParameterDataType.NUMERIC, "ms"),
+            make_parameter_name("sample_name", ParameterDataType.STRING),
+            make_parameter_name("acquired", ParameterDataType.DATETIME),
+        ],
+    }
+
+
+def test_compiled_schema_converts_metadata(schema_json: dict[str, Any]) -> None:
+    compiled = CompiledSchema(
+        SCHEMA,
+        [
+            ParameterName.model_validate(parameter_name)
+            for parameter_name in schema_json["parameter_names"]
+        ],
+    )
+
+    parameters, rejected = compiled.compile(
+        {
+            "exposure": "12.5 ms",
+            "Sample Name": 42,
+            "acquired": "2024-03-01T10:00:00",
+        }
+    )
+
+    assert sorted(parameters) == sorted(
+        [
+            Parameter(name="exposure", value=12.5),
+            Parameter(name="sample_name", value="42"),
+            Parameter(name="acquired", value="2024-03-01T10:00:00"),
+        ]
+    )
+    assert not rejected
+
+    parameters, rejected = compiled.compile(
+        {"exposure": "12.5 s", "acquired": "yesterday", "unknown": "value"}
+    )
+
+    assert not parameters
+    assert sorted(rejected) == ["acquired", "exposure", "unknown"]
+
+
+@responses.activate
+def test_smelter_checks_parameters_against_schema(
+    overseer: Overseer,
+    general: GeneralConfig,
+    default_schema: SchemaConfig,
+    raw_project: RawProject,
+    schema_json: dict[str, Any],
+) -> None:
+    default_schema = default_schema.model_copy(update={"validate_parameters": True})
+    smelter = Smelter(overseer, general, default_schema)
+
+    responses.add(
+        responses.GET,
+        overseer.rest_factory.compose_url("/schema"),
+        json={
+            "meta": {
+                "limit": 20,
+                "offset": 0,
+                "total_count": 1,
+                "next": None,
+                "previous": None,
+            },
+            "objects": [schema_json],
+        },
+    )
+
+    raw_project.metadata = {"exposure": 10, "colour": "red"}
+    first = smelter.extract_parameters(SCHEMA, raw_project)
+    raw_project.metadata = {"exposure": "20"}
+    second = smelter.extract_parameters(SCHEMA, raw_project)
+
+    assert first is not None and second is not None
+    assert first.parameters == [Parameter(name="exposure", value=10)]
+    assert second.parameters == [Parameter(name="exposure", value=20)]
+    # The schema is fetched once, and reused
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_smelter_fetches_schema_again_after_failure(
+    overseer: Overseer,
+    general: GeneralConfig,
+    default_schema: SchemaConfig,
+    raw_project: RawProject,
+    schema_json: dict[str, Any],
+) -> None:
+    default_schema = default_schema.model_copy(update={"validate_parameters": True})
+    smelter = Smelter(overseer, general, default_schema)
+    smelter.parameter_compiler = ParameterCompiler(overseer, retry_interval=0.0)
+
+    url = overseer.rest_factory.compose_url("/schema")
+    responses.add(responses.GET, url, status=404)
+    responses.add(
+        responses.GET,
+        url,
+        json={
+            "meta": {
+                "limit": 20,
+                "offset": 0,
+                "total_count": 1,
+                "next": None,
+                "previous": None,
+            },
+            "objects": [schema_json],
+        },
+    )
+
+    raw_project.metadata = {"exposure": 10, "colour": "red"}
+    unchecked = smelter.extract_parameters(SCHEMA, raw_project)
+    checked = smelter.extract_parameters(SCHEMA, raw_project)
+
+    assert unchecked is not None and checked is not None
+    assert sorted(unchecked.parameters) == [
+        Parameter(name="colour", value="red"),
+        Parameter(name="exposure", value=10),
+    ]
+    assert checked.parameters == [Parameter(name="exposure", value=10)]
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_smelter_remembers_failed_schema_fetch(
+    overseer: Overseer,
+    general: GeneralConfig,
+    default_schema: SchemaConfig,
+    raw_project: RawProject,
+) -> None:
+    default_schema = default_schema.model_copy(update={"validate_parameters": True})
+    smelter = Smelter(overseer, general, default_schema)
+
+    responses.add(
+        responses.GET, overseer.rest_factory.compose_url("/schema"), status=404
+    )
+
+    raw_project.metadata = {"exposure": 10}
+    for _ in range(3):
+        parameter_set = smelter.extract_parameters(SCHEMA, raw_project)
+        assert parameter_set is not None
+        assert parameter_set.parameters == [Parameter(name="exposure", value=10)]
+
+    # Within the retry interval, the failed fetch is not repeated for every object
+    assert len(responses.calls) == 1
@@ -57,6 +57,22 @@ def test_extract_parameters_object_schema_none(
     )
 
 
+def test_extract_parameters_skips_invalid_parameter(
+    caplog: pytest.LogCaptureFixture,
+    smelter: Smelter,
+    raw_project: RawProject,
+    project_schema: AnyUrl,
+) -> None:
+    caplog.set_level(logging.WARNING)
+    raw_project.metadata = {"exposure": 10, "channels": [1, 2]}  # type: ignore[dict-item]
+
+    parameter_set = smelter.extract_parameters(project_schema, raw_project)
+
+    assert parameter_set is not None and parameter_set.parameters is not None
+    assert [parameter.name for parameter in parameter_set.parameters] == ["exposure"]
+    assert "Unable to parse parameter channels: [1, 2] into Parameter" in caplog.text
+
+
 def test_smelt_project(
     smelter: Smelter,
     raw_project: RawProject,
@@ -0,0 +1,119 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the helpers for code called from several threads at once"""
+
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.utils.concurrency import SingleFlight, TaskGraph
+
+
+def test_single_flight_shares_concurrent_calls() -> None:
+    waiting: list[str] = []
+    single_flight: SingleFlight[str, int] = SingleFlight(on_shared=waiting.append)
+    release = threading.Event()
+    calls = 0
+
+    def slow_call() -> int:
+        nonlocal calls
+        calls += 1
+        release.wait(timeout=5)
+        return 42
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(single_flight.do, "key", slow_call) for _ in range(4)
+        ]
+        while len(waiting) < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == 1
+    assert waiting == ["key"] * 3
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert all(result == 42 for result, _ in results)
+
+    # Finished calls are not cached
+    assert single_flight.do("key", lambda: 7) == (7, False)
+
+
+def test_single_flight_shares_errors() -> None:
+    waiting: list[str] = []
+    single_flight: SingleFlight[str, int] = SingleFlight(on_shared=waiting.append)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_call() -> int:
+        started.set()
+        release.wait(timeout=5)
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "key", failing_call)
+        started.wait(timeout=5)
+        follower = executor.submit(single_flight.do, "key", failing_call)
+        while not waiting:
+            threading.Event().wait(0.001)
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_task_graph_runs_tasks_after_their_parents() -> None:
+    graph: TaskGraph[str] = TaskGraph()
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def task(name: str) -> Callable[[], None]:
+        def run() -> None:
+            with lock:
+                order.append(name)
+
+        return run
+
+    graph.add("project", task("project"))
+    graph.add("experiment", task("experiment"), ["project"])
+    graph.add("dataset-1", task("dataset-1"), ["experiment", "not-in-graph"])
+    graph.add("dataset-2", task("dataset-2"), ["experiment"])
+    graph.add("datafiles-1", task("datafiles-1"), ["dataset-1"])
+
+    graph.run(max_workers=4)
+
+    assert sorted(order) == sorted(
+        ["project", "experiment", "dataset-1", "dataset-2", "datafiles-1"]
+    )
+    assert order.index("project") < order.index("experiment")
+    assert order.index("experiment") < order.index("dataset-1")
+    assert order.index("experiment") < order.index("dataset-2")
+    assert order.index("dataset-1") < order.index("datafiles-1")
+
+
+def test_task_graph_stops_on_error() -> None:
+    graph: TaskGraph[str] = TaskGraph()
+    ran: list[str] = []
+
+    def fail() -> None:
+        raise RuntimeError("failed")
+
+    graph.add("parent", fail)
+    graph.add("child", lambda: ran.append("child"), ["parent"])
+
+    with pytest.raises(RuntimeError, match="failed"):
+        graph.run(max_workers=2)
+    assert not ran
+
+
+def test_task_graph_detects_cycles() -> None:
+    graph: TaskGraph[str] = TaskGraph()
+    graph.add("a", lambda: None, ["b"])
+    graph.add("b", lambda: None, ["a"])
+
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run(max_workers=2)
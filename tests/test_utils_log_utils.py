@@ -0,0 +1,82 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the rate limiting of log messages"""
+
+import logging
+from typing import Iterator
+
+import pytest
+
+from src.utils.log_utils import RateLimitFilter
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(level=logging.DEBUG)
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(name="handler")
+def fixture_handler() -> Iterator[_ListHandler]:
+    handler = _ListHandler()
+    handler.addFilter(RateLimitFilter(limit=2, interval=3600))
+    log = logging.getLogger("rate_limited")
+    log.setLevel(logging.DEBUG)
+    log.addHandler(handler)
+    yield handler
+    log.removeHandler(handler)
+
+
+def _rate_limit_filter(handler: logging.Handler) -> RateLimitFilter:
+    rate_limit_filter = handler.filters[0]
+    assert isinstance(rate_limit_filter, RateLimitFilter)
+    return rate_limit_filter
+
+
+def test_rate_limit_filter_drops_messages_over_the_limit(
+    handler: _ListHandler,
+) -> None:
+    log = logging.getLogger("rate_limited")
+
+    for index in range(5):
+        log.info("Created object %d", index)
+        log.debug("Skipped object %d", index)
+    for index in range(3):
+        log.warning("Failed object %d", index)
+
+    assert handler.messages == [
+        "Created object 0",
+        "Skipped object 0",
+        "Created object 1",
+        "Skipped object 1",
+        "Failed object 0",
+        "Failed object 1",
+        "Failed object 2",
+    ]
+
+    handler.messages.clear()
+    _rate_limit_filter(handler).log_suppressed(log)
+    assert sorted(handler.messages) == [
+        "Suppressed 3 messages from rate_limited like: Created object %d",
+        "Suppressed 3 messages from rate_limited like: Skipped object %d",
+    ]
+
+
+def test_rate_limit_filter_reports_drops_in_the_next_interval(
+    handler: _ListHandler,
+) -> None:
+    log = logging.getLogger("rate_limited")
+
+    for index in range(4):
+        log.info("Created object %d", index)
+    _rate_limit_filter(handler).interval = 0
+    log.info("Created object %d", 4)
+
+    assert handler.messages[:2] == ["Created object 0", "Created object 1"]
+    assert handler.messages[2].startswith(
+        "Created object 4 [2 similar messages suppressed in the last"
+    )
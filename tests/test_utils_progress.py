@@ -0,0 +1,60 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the progress reporting of the pipeline stages"""
+
+import io
+import json
+from pathlib import Path
+
+from src.utils.progress import Progress, ProgressReporter, format_status
+
+
+def test_progress_disabled_counts_nothing() -> None:
+    progress = Progress()
+    progress.add_total("forge", 10)
+    progress.advance("forge")
+
+    assert progress.status()["stages"] == {}
+
+
+def test_progress_counts_stages_in_pipeline_order() -> None:
+    progress = Progress(enabled=True)
+    progress.add_total("transfer", 2, num_bytes=1000)
+    progress.add_total("forge", 4)
+    for _ in range(3):
+        progress.advance("forge")
+    progress.advance("transfer", num_bytes=250)
+    progress.advance("walk", objects=7)
+
+    stages = progress.status()["stages"]
+
+    assert list(stages) == ["walk", "forge", "transfer"]
+    assert stages["forge"]["objects"] == 3
+    assert stages["forge"]["fraction"] == 0.75
+    # The fraction of a stage with bytes is by bytes
+    assert stages["transfer"]["fraction"] == 0.25
+    assert stages["transfer"]["eta_s"] is not None
+    assert stages["walk"]["fraction"] is None and stages["walk"]["eta_s"] is None
+
+    line = format_status(progress.status())
+    assert line.startswith("walk 7 ")
+    assert "forge 3/4 75%" in line
+
+
+def test_progress_reporter_writes_final_status(tmp_path: Path) -> None:
+    progress = Progress(enabled=True)
+    progress.add_total("refine", 2)
+    status_file = tmp_path / "status.json"
+
+    with ProgressReporter(progress, status_file=status_file, display=io.StringIO()):
+        progress.advance("refine", objects=2)
+
+    with status_file.open(encoding="utf-8") as file:
+        status = json.load(file)
+    assert status["finished"]
+    assert status["stages"]["refine"]["fraction"] == 1.0
+    assert status["stages"]["refine"]["eta_s"] == 0.0
+    assert not list(tmp_path.glob(".*.tmp"))
+    # Nothing is counted once the run is over
+    assert not progress.enabled
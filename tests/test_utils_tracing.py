@@ -0,0 +1,120 @@
+# pylint: disable=missing-function-docstring
+# nosec assert_used
+# flake8: noqa S101
+"""Tests of the pipeline stage tracer"""
+
+import json
+import random
+import threading
+from pathlib import Path
+
+from src.utils.tracing import SAMPLE_SIZE, SpanStats, Tracer
+
+
+def test_tracer_disabled_records_nothing() -> None:
+    tracer = Tracer()
+
+    with tracer.span("smelt"):
+        pass
+
+    assert tracer.summary() == {}
+
+
+def test_tracer_nested_spans() -> None:
+    tracer = Tracer(enabled=True)
+
+    with tracer.span("ingest_datasets"):
+        for _ in range(3):
+            with tracer.span("smelt"):
+                pass
+            with tracer.span("forge"):
+                with tracer.span("http", method="POST"):
+                    pass
+
+    summary = tracer.summary()
+
+    assert list(summary) == [
+        "ingest_datasets",
+        "ingest_datasets/forge",
+        "ingest_datasets/forge/http",
+        "ingest_datasets/smelt",
+    ]
+    assert summary["ingest_datasets"]["count"] == 1
+    assert summary["ingest_datasets/smelt"]["count"] == 3
+    assert (
+        summary["ingest_datasets"]["total_s"]
+        >= summary["ingest_datasets/forge"]["total_s"]
+    )
+    stats = summary["ingest_datasets/forge/http"]
+    assert stats["p50_s"] <= stats["p99_s"] <= stats["max_s"]
+
+
+def test_tracer_span_recorded_on_exception() -> None:
+    tracer = Tracer(enabled=True)
+
+    try:
+        with tracer.span("crucible"):
+            raise ValueError("bad")
+    except ValueError:
+        pass
+
+    with tracer.span("forge"):
+        pass
+
+    assert list(tracer.summary()) == ["crucible", "forge"]
+
+
+def test_tracer_threads_have_separate_stacks() -> None:
+    tracer = Tracer(enabled=True)
+
+    def work() -> None:
+        with tracer.span("transfer"):
+            pass
+
+    with tracer.span("ingest_datafiles"):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert list(tracer.summary()) == ["ingest_datafiles", "transfer"]
+
+
+def test_span_stats_bounded() -> None:
+    stats = SpanStats()
+    rng = random.Random(1)
+
+    for i in range(1, 10 * SAMPLE_SIZE + 1):
+        stats.add(i / 1000, rng)
+
+    assert stats.count == 10 * SAMPLE_SIZE
+    assert stats.minimum == 0.001
+    assert stats.maximum == 10 * SAMPLE_SIZE / 1000
+    assert len(stats.sample) == SAMPLE_SIZE
+    # A uniform sample has roughly the median of all the durations
+    median = sorted(stats.sample)[SAMPLE_SIZE // 2]
+    assert 0.4 * stats.maximum < median < 0.6 * stats.maximum
+
+
+def test_tracer_outputs(tmp_path: Path) -> None:
+    tracer = Tracer(max_events=2)
+    tracer.enable(record_events=True)
+
+    with tracer.span("extract"):
+        with tracer.span("checksum", file="a.txt"):
+            pass
+        with tracer.span("checksum", file="b.txt"):
+            pass
+
+    json_path = tmp_path / "trace.json"
+    tracer.write_json(json_path)
+    spans = json.loads(json_path.read_text(encoding="utf-8"))["spans"]
+    assert spans["extract/checksum"]["count"] == 2
+
+    chrome_path = tmp_path / "trace.chrome.json"
+    tracer.write_chrome_trace(chrome_path)
+    trace = json.loads(chrome_path.read_text(encoding="utf-8"))
+    events = trace["traceEvents"]
+    assert [event["name"] for event in events] == ["checksum", "checksum"]
+    assert events[0]["ph"] == "X"
+    assert events[0]["args"] == {"file": "a.txt"}
+    assert trace["otherData"]["dropped_events"] == 1